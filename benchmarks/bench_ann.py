@@ -0,0 +1,124 @@
+"""Recall vs. latency of the IVF-flat ANN index against exact search.
+
+Builds a synthetic clustered corpus of unit vectors (bge-small shaped,
+384 dimensions), memory-maps it the way NumpyVectorStore does, and
+compares exact top-k with IVF-flat search at several `nprobe` values.
+
+Usage:
+    python benchmarks/bench_ann.py --rows 200000 --queries 200 --k 3
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add rag_agent to path for both PyCharm and command line
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+rag_agent_path = os.path.join(project_root, 'rag_agent')
+if rag_agent_path not in sys.path:
+    sys.path.insert(0, rag_agent_path)
+
+try:
+    from rag_agent.src.ann import IVFFlatIndex
+except ImportError:
+    from src.ann import IVFFlatIndex
+
+
+def synthetic_corpus(rows: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors drawn around `clusters` random topic directions."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=rows)
+    matrix = centers[labels] + 0.6 * rng.standard_normal((rows, dim)).astype(np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix
+
+
+def exact_top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = matrix @ query
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="IVF-flat recall vs. exact search benchmark")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=1000, help="Topic clusters in the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--nlist", type=int, default=0, help="0 = ~4*sqrt(rows)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32, 64])
+    parser.add_argument("--json", type=str, help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    print(f"\n{'='*60}")
+    print("IVF-flat ANN Benchmark")
+    print(f"Rows: {args.rows}  Dim: {args.dim}  Queries: {args.queries}  k: {args.k}")
+    print(f"{'='*60}\n")
+
+    corpus = synthetic_corpus(args.rows, args.dim, args.clusters)
+    rng = np.random.default_rng(1)
+    queries = corpus[rng.choice(args.rows, size=args.queries, replace=False)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vectors.npy")
+        np.save(path, corpus)
+        del corpus
+        matrix = np.load(path, mmap_mode="r")
+
+        start = time.perf_counter()
+        ivf = IVFFlatIndex(nlist=args.nlist)
+        ivf.build(matrix)
+        build_seconds = time.perf_counter() - start
+        print(f"Built IVF index: {ivf.nlist} lists in {build_seconds:.2f}s\n")
+
+        truth = []
+        exact_latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            truth.append(set(exact_top_k(matrix, query, args.k).tolist()))
+            exact_latencies.append(time.perf_counter() - start)
+        exact_ms = np.percentile(exact_latencies, [50, 95]) * 1000
+
+        results = {
+            "rows": args.rows,
+            "dim": args.dim,
+            "k": args.k,
+            "nlist": ivf.nlist,
+            "build_seconds": build_seconds,
+            "exact": {"p50_ms": exact_ms[0], "p95_ms": exact_ms[1]},
+            "ivf": [],
+        }
+
+        print(f"{'mode':<14}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}{'speedup':>10}")
+        print(f"{'exact':<14}{1.0:>10.3f}{exact_ms[0]:>10.2f}{exact_ms[1]:>10.2f}{1.0:>10.1f}")
+        for nprobe in args.nprobe:
+            latencies = []
+            hits = 0
+            for query, expected in zip(queries, truth):
+                start = time.perf_counter()
+                rows, _ = ivf.search(matrix, query, args.k, nprobe=nprobe)
+                latencies.append(time.perf_counter() - start)
+                hits += len(expected & set(rows.tolist()))
+            recall = hits / (len(truth) * args.k)
+            ms = np.percentile(latencies, [50, 95]) * 1000
+            speedup = exact_ms[0] / ms[0] if ms[0] > 0 else float("inf")
+            print(f"{'ivf nprobe=' + str(nprobe):<14}{recall:>10.3f}{ms[0]:>10.2f}{ms[1]:>10.2f}{speedup:>10.1f}")
+            results["ivf"].append({"nprobe": nprobe, "recall": recall, "p50_ms": ms[0], "p95_ms": ms[1]})
+        del matrix
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
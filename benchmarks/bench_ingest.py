@@ -0,0 +1,351 @@
+"""Ingestion throughput of `KnowledgeGraphIndexer`, offline.
+
+Generates a deterministic synthetic corpus (no Wikipedia, Wiki.js or
+Ollama needed) and builds an index from it once per configuration,
+reporting docs/sec, chunks/sec, per-stage time (from `tracing`), peak
+memory and the size of the index on disk. Corpus shapes:
+
+    wiki     Wiki.js pages in a path hierarchy, seeded with `populate_wiki.hierarchy`
+             and topped up with generated sub-pages (short markdown sections)
+    article  Long Wikipedia-style articles with sections, infobox-like lead and
+             categories (many chunks per document)
+    mixed    Half of each
+
+A configuration is a comma-separated list of settings, either the
+environment variables from `config.py` or these short names:
+
+    batch=EMBED_BATCH_SIZE  workers=EMBED_WORKERS  store=VECTOR_STORE
+    graph=GRAPH_ENABLED     graph_workers=GRAPH_WORKERS  ann=ANN_INDEX
+
+Configuration values are read at import time, so every configuration is
+built in a fresh subprocess; this also keeps their peak memory apart.
+The embedding cache is disabled unless --embed-cache is given, so the
+embedding stage is always measured. The embedding model is the
+configured one (EMBED_MODEL).
+
+Usage:
+    python benchmarks/bench_ingest.py --shape wiki article --docs 200 1000 \\
+        --config batch=32,workers=1 batch=64,workers=2 store=numpy,workers=2
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Iterator, List
+
+# Add rag_agent and the project root (populate_wiki) to path for both PyCharm and command line
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(project_root, 'rag_agent'), project_root):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+SHORT_NAMES = {
+    "batch": "EMBED_BATCH_SIZE",
+    "workers": "EMBED_WORKERS",
+    "store": "VECTOR_STORE",
+    "graph": "GRAPH_ENABLED",
+    "graph_workers": "GRAPH_WORKERS",
+    "ann": "ANN_INDEX",
+}
+SYLLABLES = ["ka", "lor", "ven", "tis", "mar", "eth", "quo", "rin", "sal", "dor", "fen", "ul", "bri", "zan", "ost"]
+SUBSYSTEMS = [
+    "Propulsion", "Life Support", "Navigation", "Telemetry", "Thermal Control", "Power Grid",
+    "Hydroponics", "Shielding", "Docking", "Communications", "Sensors", "Crew Quarters",
+]
+SECTIONS = ["History", "Geography", "Economy", "Culture", "Research", "Infrastructure", "Legacy"]
+TOPICS = [
+    "water reclamation", "orbital mechanics", "crystal lattices", "signal processing", "soil chemistry",
+    "navigation charts", "power distribution", "weather models", "textile looms", "seed banks",
+]
+
+
+def _name(rng: random.Random, words: int) -> str:
+    return " ".join(
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        for _ in range(words)
+    )
+
+
+def _slug(title: str) -> str:
+    return title.lower().replace(" ", "-")
+
+
+def _seed_pages() -> List[Dict]:
+    """`populate_wiki.hierarchy`, flattened to pages with an id."""
+    import populate_wiki
+
+    pages = []
+
+    def walk(nodes):
+        for node in nodes:
+            pages.append({"path": node["path"], "title": node["title"], "content": node["content"]})
+            walk(node.get("children", []))
+
+    walk(populate_wiki.hierarchy)
+    return pages
+
+
+def wiki_pages(num_docs: int, seed: int = 0) -> Iterator[Dict]:
+    """
+    Wiki.js pages under a mission/vehicle/subsystem/... path hierarchy.
+
+    Starts with the pages of `populate_wiki.hierarchy`; generated pages
+    nest up to four levels deep, link their parent and siblings, and are a
+    few short markdown sections each.
+
+    Yields:
+        Pages as dicts with id, path, title and content (markdown)
+    """
+    rng = random.Random(seed)
+    pages = _seed_pages()[:num_docs]
+    for page in pages:
+        yield page
+    parents = [page for page in pages if page["path"].count("/") < 3] or [{"path": "", "title": "Home"}]
+    for _ in range(num_docs - len(pages)):
+        parent = rng.choice(parents)
+        title = f"{rng.choice(SUBSYSTEMS)} {_name(rng, 1)}"
+        path = f"{parent['path']}/{_slug(title)}".lstrip("/")
+        lines = [f"# {title}", "", f"Part of [{parent['title']}](/{parent['path']}). "
+                 f"Maintained by {_name(rng, 2)} since {rng.randint(2100, 2400)}."]
+        for _ in range(rng.randint(1, 4)):
+            topic = rng.choice(TOPICS)
+            lines += ["", f"## {topic.title()}", ""]
+            lines += [
+                f"- {title} depends on {rng.choice(TOPICS)} and {rng.choice(SUBSYSTEMS).lower()} checks."
+                for _ in range(rng.randint(2, 6))
+            ]
+            lines.append(f"Operators log {topic} readings every {rng.randint(2, 90)} minutes.")
+        page = {"path": path, "title": title, "content": "\n".join(lines)}
+        if path.count("/") < 3:
+            parents.append(page)
+        yield page
+
+
+def long_articles(num_docs: int, seed: int = 0, words: int = 3000) -> Iterator[Dict]:
+    """
+    Wikipedia-style articles of about `words` words each.
+
+    Each has a lead paragraph, several `== Section ==` blocks of
+    paragraphs that mention other articles, and categories.
+
+    Yields:
+        Articles as dicts with title, text and categories
+    """
+    rng = random.Random(seed)
+    titles = [_name(rng, 2) for _ in range(num_docs)]
+    for title in titles:
+        founder = _name(rng, 2)
+        year = rng.randint(1200, 2300)
+        paragraphs = [f"{title} is a settlement founded in {year} by {founder}, "
+                      f"known for {rng.choice(TOPICS)} and {rng.choice(TOPICS)}."]
+        count = len(paragraphs[0].split())
+        while count < words:
+            paragraphs.append(f"\n== {rng.choice(SECTIONS)} ==\n")
+            for _ in range(rng.randint(2, 5)):
+                other = rng.choice(titles)
+                topic = rng.choice(TOPICS)
+                sentences = [rng.choice([
+                    f"In {rng.randint(year, 2400)} {title} expanded its {topic} programme with help from {other}.",
+                    f"Scholars at {other} describe the {topic} archive of {title} as the largest of its era.",
+                    f"{founder} argued that {topic} mattered more than trade, a view later disputed in {other}.",
+                    f"The council of {title} funded {rng.randint(2, 40)} new surveys of {topic}.",
+                ]) for _ in range(rng.randint(4, 9))]
+                paragraph = " ".join(sentences)
+                paragraphs.append(paragraph)
+                count += len(paragraph.split())
+        yield {
+            "title": title,
+            "text": "\n".join(paragraphs),
+            "categories": sorted({f"{rng.choice(TOPICS).capitalize()} settlements" for _ in range(3)}),
+        }
+
+
+def documents(shape: str, num_docs: int, seed: int = 0, words: int = 3000):
+    """Yield `num_docs` Documents of `shape`, with the metadata the real readers attach."""
+    from llama_index.core import Document
+
+    wiki, article = {"wiki": (num_docs, 0), "article": (0, num_docs),
+                     "mixed": (num_docs - num_docs // 2, num_docs // 2)}[shape]
+    for i, page in enumerate(wiki_pages(wiki, seed)):
+        yield Document(
+            id_=f"wikijs:en:{i + 1}",
+            text=page["content"],
+            metadata={"id": i + 1, "path": page["path"], "title": page["title"], "description": ""}
+        )
+    for entry in long_articles(article, seed, words):
+        yield Document(
+            id_=f"wikipedia:en:{entry['title']}",
+            text=entry["text"],
+            metadata={
+                "title": entry["title"],
+                "url": f"https://en.wikipedia.org/wiki/{entry['title'].replace(' ', '_')}",
+                "summary": entry["text"].split("\n", 1)[0],
+                "categories": entry["categories"],
+                "source": "wikipedia",
+                "language": "en"
+            }
+        )
+
+
+def parse_config(spec: str) -> Dict[str, str]:
+    """"batch=64,workers=2" -> {"EMBED_BATCH_SIZE": "64", "EMBED_WORKERS": "2"}."""
+    env = {}
+    for item in filter(None, spec.split(",")):
+        key, _, value = item.partition("=")
+        env[SHORT_NAMES.get(key.strip(), key.strip())] = value.strip()
+    return env
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """High-water resident memory of this process and of its largest (embedding/graph worker) child."""
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    unit = 1 << 20 if sys.platform == "darwin" else 1 << 10
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit,
+    }
+
+
+def run_build(args) -> Dict:
+    """One build in this process (the --child side); returns the measurements."""
+    from src.indexer import KnowledgeGraphIndexer
+    from src.tracing import tracer
+
+    docs = documents(args.shape[0], args.docs[0], args.seed, args.article_words)
+    if args.mode == "batch":
+        # build_index takes a list; materialize it before the baseline is taken
+        docs = list(docs)
+    with contextlib.redirect_stdout(io.StringIO()):
+        indexer = KnowledgeGraphIndexer()
+    baseline = peak_rss_mb()["self"]
+
+    tracer.enable()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if args.mode == "batch":
+            indexer.build_index(docs)
+        else:
+            indexer.build_index_streaming(docs)
+    seconds = time.perf_counter() - start
+    indexer.embedding_pipeline.close()
+
+    stages = tracer.snapshot()
+    chunks = len(indexer.index.docstore.docs)
+    peak = peak_rss_mb()
+    return {
+        "docs": args.docs[0],
+        "chunks": chunks,
+        "seconds": seconds,
+        "docs_per_sec": args.docs[0] / seconds if seconds > 0 else 0.0,
+        "chunks_per_sec": chunks / seconds if seconds > 0 else 0.0,
+        "stages_ms": {
+            name: stats.get("total_ms", 0.0) for name, stats in stages.items()
+            if name.startswith("index.") and stats["calls"]
+        },
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak["self"],
+        "peak_child_rss_mb": peak["children"],
+        "disk_mb": directory_size(indexer.storage_dir) / (1 << 20),
+    }
+
+
+def run_config(shape: str, num_docs: int, config: str, args) -> Dict:
+    """Build in a subprocess with `config` applied to the environment."""
+    env = dict(os.environ)
+    env.update(parse_config(config))
+    if not args.embed_cache:
+        env["EMBED_CACHE_ENABLED"] = "false"
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child",
+        "--shape", shape, "--docs", str(num_docs), "--mode", args.mode,
+        "--seed", str(args.seed), "--article-words", str(args.article_words)
+    ]
+    with tempfile.TemporaryDirectory(prefix="bench_ingest_") as tmp:
+        # ./storage and ./cache are relative to the working directory
+        completed = subprocess.run(command, cwd=tmp, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Build failed for {shape}/{num_docs}/{config or 'default'}:\n{completed.stderr}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result.update(shape=shape, config=config or "default", mode=args.mode)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ingestion throughput benchmark")
+    parser.add_argument("--shape", nargs="+", default=["wiki", "article"], choices=["wiki", "article", "mixed"])
+    parser.add_argument("--docs", type=int, nargs="+", default=[200, 1000], help="Corpus sizes (documents)")
+    parser.add_argument("--config", nargs="+", default=[""],
+                        help="Configurations to compare, e.g. batch=64,workers=2 store=numpy")
+    parser.add_argument("--mode", choices=["batch", "streaming"], default="batch",
+                        help="build_index or build_index_streaming")
+    parser.add_argument("--article-words", type=int, default=3000, help="Approximate length of 'article' documents")
+    parser.add_argument("--embed-cache", action="store_true", help="Keep the embedding cache enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=str, help="Also write results to this JSON file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_build(args)))
+        return
+
+    print(f"\n{'='*60}")
+    print("Ingestion Benchmark")
+    print(f"Shapes: {args.shape}  Docs: {args.docs}  Mode: {args.mode}")
+    print(f"{'='*60}\n")
+
+    results = []
+    print(f"{'scenario':<40}{'chunks':>8}{'seconds':>9}{'docs/s':>9}{'chunks/s':>10}{'peak MB':>9}{'disk MB':>9}")
+    for shape in args.shape:
+        for num_docs in args.docs:
+            for config in args.config:
+                result = run_config(shape, num_docs, config, args)
+                results.append(result)
+                label = f"{shape}/{num_docs}/{result['config']}"
+                peak = max(result["peak_rss_mb"], result["peak_child_rss_mb"])
+                print(f"{label:<40}{result['chunks']:>8}{result['seconds']:>9.2f}{result['docs_per_sec']:>9.1f}"
+                      f"{result['chunks_per_sec']:>10.1f}{peak:>9.0f}{result['disk_mb']:>9.1f}")
+                stages = ", ".join(
+                    f"{name.split('.', 1)[1]} {ms / 1000:.2f}s" for name, ms in sorted(result["stages_ms"].items())
+                )
+                print(f"{'':<40}{stages}")
+
+    report = {
+        "benchmark": "ingest",
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "seed": args.seed,
+            "mode": args.mode,
+            "article_words": args.article_words,
+            "embed_cache": args.embed_cache,
+            "embed_model": os.getenv("EMBED_MODEL", "BAAI/bge-small-en-v1.5"),
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
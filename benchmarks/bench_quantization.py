@@ -0,0 +1,117 @@
+"""Recall, latency and memory of int8/binary codes with exact re-scoring.
+
+Uses the same synthetic clustered corpus as bench_ann.py (bge-small
+shaped unit vectors, memory-mapped the way NumpyVectorStore maps them)
+and compares exact float32 top-k with each quantization at several
+re-scoring factors. Memory is the size of what a loaded store keeps in
+RAM for scoring: the float32 matrix for exact search, the codes otherwise.
+
+Usage:
+    python benchmarks/bench_quantization.py --rows 200000 --queries 200 --k 3 --rescore 2 4 16
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add rag_agent and benchmarks to path for both PyCharm and command line
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(project_root, 'rag_agent'), os.path.join(project_root, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from bench_ann import exact_top_k, synthetic_corpus
+
+try:
+    from rag_agent.src.quantization import get_quantizer
+except ImportError:
+    from src.quantization import get_quantizer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized vector recall and memory benchmark")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=1000, help="Topic clusters in the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--kind", nargs="+", default=["int8", "binary"])
+    parser.add_argument("--rescore", type=int, nargs="+", default=[1, 4, 16, 64],
+                        help="Candidates re-scored per result")
+    parser.add_argument("--json", type=str, help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    print(f"\n{'='*60}")
+    print("Vector Quantization Benchmark")
+    print(f"Rows: {args.rows}  Dim: {args.dim}  Queries: {args.queries}  k: {args.k}")
+    print(f"{'='*60}\n")
+
+    corpus = synthetic_corpus(args.rows, args.dim, args.clusters)
+    rng = np.random.default_rng(1)
+    queries = corpus[rng.choice(args.rows, size=args.queries, replace=False)]
+    queries = queries + 0.3 * rng.standard_normal(queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "vectors.npy")
+        np.save(path, corpus)
+        del corpus
+        matrix = np.load(path, mmap_mode="r")
+        float_mb = matrix.nbytes / 2**20
+
+        truth = []
+        exact_latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            truth.append(set(exact_top_k(matrix, query, args.k).tolist()))
+            exact_latencies.append(time.perf_counter() - start)
+        exact_ms = np.percentile(exact_latencies, [50, 95]) * 1000
+
+        results = {
+            "rows": args.rows,
+            "dim": args.dim,
+            "k": args.k,
+            "exact": {"memory_mb": float_mb, "p50_ms": exact_ms[0], "p95_ms": exact_ms[1]},
+            "quantized": [],
+        }
+
+        print(f"{'mode':<20}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}{'memory MB':>11}{'saved':>8}")
+        print(f"{'exact float32':<20}{1.0:>10.3f}{exact_ms[0]:>10.2f}{exact_ms[1]:>10.2f}{float_mb:>11.1f}{'-':>8}")
+        for kind in args.kind:
+            quantizer = get_quantizer(kind)
+            start = time.perf_counter()
+            quantizer.build(matrix)
+            build_seconds = time.perf_counter() - start
+            memory_mb = quantizer.nbytes / 2**20
+            saved = 1 - memory_mb / float_mb
+            for rescore in args.rescore:
+                quantizer.rescore_factor = rescore
+                latencies = []
+                hits = 0
+                for query, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    rows, _ = quantizer.search(matrix, query, args.k)
+                    latencies.append(time.perf_counter() - start)
+                    hits += len(expected & set(rows.tolist()))
+                recall = hits / (len(truth) * args.k)
+                ms = np.percentile(latencies, [50, 95]) * 1000
+                label = f"{kind} rescore={rescore}"
+                print(f"{label:<20}{recall:>10.3f}{ms[0]:>10.2f}{ms[1]:>10.2f}{memory_mb:>11.1f}{saved:>8.0%}")
+                results["quantized"].append({
+                    "kind": kind, "rescore": rescore, "recall": recall, "p50_ms": ms[0], "p95_ms": ms[1],
+                    "memory_mb": memory_mb, "memory_saved": saved, "build_seconds": build_seconds,
+                })
+        del matrix
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""End-to-end query latency of `QueryEngine` against a local fake Ollama.
+
+Builds indexes of several sizes from a deterministic synthetic corpus,
+points the LLM at `fake_ollama.FakeOllama` (configurable prefill delay and
+token rate, so results do not depend on a GPU or a model download) and
+measures, per index size and synthesis mode:
+
+    query       QueryEngine.query, one question at a time
+    stream      QueryEngine.query_stream, one at a time; time to first token
+    concurrent  query_stream from --concurrency threads; queries/sec
+
+Every question is asked in a fresh session, and the answer cache is
+disabled, so each query runs retrieval and synthesis. The embedding model
+is the configured one (EMBED_MODEL).
+
+Results can be written as JSON and compared with an earlier run:
+
+    python benchmarks/bench_query.py --docs 100 1000 --json after.json --compare before.json
+
+Usage:
+    python benchmarks/bench_query.py --docs 100 1000 --queries 50 --tokens-per-sec 100 --prefill-ms 50
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Repeated questions would be answered from the cache
+os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+
+# Add rag_agent and benchmarks to path for both PyCharm and command line
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(project_root, 'rag_agent'), os.path.join(project_root, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from fake_ollama import FakeOllama
+
+
+SYLLABLES = ["ka", "lor", "ven", "tis", "mar", "eth", "quo", "rin", "sal", "dor", "fen", "ul", "bri", "zan", "ost"]
+KINDS = ["research station", "river port", "mining colony", "observatory", "trade guild", "shipyard", "archive"]
+TOPICS = [
+    "water reclamation", "orbital mechanics", "crystal lattices", "signal processing", "soil chemistry",
+    "navigation charts", "power distribution", "weather models", "textile looms", "seed banks",
+]
+
+
+def _name(rng: random.Random, words: int) -> str:
+    return " ".join(
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        for _ in range(words)
+    )
+
+
+def synthetic_corpus(num_docs: int, seed: int = 0) -> Tuple[List[Dict], List[str]]:
+    """
+    Wiki-like articles that mention each other, and questions about them.
+
+    The same `num_docs` and `seed` always give the same corpus.
+
+    Returns:
+        (articles as dicts with id, title and text, questions)
+    """
+    rng = random.Random(seed)
+    titles: List[str] = []
+    while len(titles) < num_docs:
+        title = _name(rng, 2)
+        if title not in titles:
+            titles.append(title)
+
+    articles, questions = [], []
+    for i, title in enumerate(titles):
+        kind = rng.choice(KINDS)
+        founder = _name(rng, 2)
+        year = rng.randint(1200, 2300)
+        neighbours = rng.sample(titles, k=min(3, num_docs))
+        sentences = [
+            f"{title} is a {kind} founded in {year} by {founder}.",
+            f"It is known for its work on {rng.choice(TOPICS)} and {rng.choice(TOPICS)}.",
+        ]
+        for _ in range(rng.randint(15, 40)):
+            other = rng.choice(neighbours)
+            topic = rng.choice(TOPICS)
+            sentences.append(rng.choice([
+                f"Engineers from {title} worked with {other} on {topic}.",
+                f"In {rng.randint(year, 2400)} {title} expanded its {topic} programme.",
+                f"The {topic} archive of {title} was later copied to {other}.",
+                f"{founder} wrote that {topic} mattered more than trade with {other}.",
+            ]))
+        articles.append({"id": f"doc-{i}", "title": title, "text": " ".join(sentences)})
+        questions.extend([
+            f"What is {title} known for?",
+            f"Who founded {title} and when?",
+            f"How is {title} connected to {neighbours[0]}?",
+        ])
+    rng.shuffle(questions)
+    return articles, questions
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 in milliseconds."""
+    if not samples:
+        return {}
+    p50, p95, p99 = np.percentile(np.array(samples) * 1000, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def timed_stream(engine, question: str) -> Tuple[float, float]:
+    """(seconds to the first token, seconds to the last) for one streamed answer."""
+    from src.sessions import ConversationSession
+    start = time.perf_counter()
+    first = None
+    for token in engine.query_stream(question, ConversationSession()):
+        if first is None and token:
+            first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return (first if first is not None else total), total
+
+
+def run_scenarios(engine, questions: List[str], args) -> List[Dict]:
+    from src.sessions import ConversationSession
+
+    # One untimed query loads the models and warms the connection pool
+    engine.query(questions[-1], ConversationSession())
+    results = []
+
+    latencies = []
+    for question in questions[:args.queries]:
+        start = time.perf_counter()
+        engine.query(question, ConversationSession())
+        latencies.append(time.perf_counter() - start)
+    results.append({"mode": "query", "queries": len(latencies),
+                    "qps": len(latencies) / sum(latencies), **percentiles(latencies)})
+
+    first_tokens, latencies = [], []
+    for question in questions[:args.queries]:
+        first, total = timed_stream(engine, question)
+        first_tokens.append(first)
+        latencies.append(total)
+    ttft = {f"ttft_{key}": value for key, value in percentiles(first_tokens).items()}
+    results.append({"mode": "stream", "queries": len(latencies),
+                    "qps": len(latencies) / sum(latencies), **percentiles(latencies), **ttft})
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        timings = list(pool.map(lambda q: timed_stream(engine, q), questions[:args.queries]))
+    wall = time.perf_counter() - start
+    ttft = {f"ttft_{key}": value for key, value in percentiles([t[0] for t in timings]).items()}
+    results.append({"mode": "concurrent", "concurrency": args.concurrency, "queries": len(timings),
+                    "qps": len(timings) / wall, **percentiles([t[1] for t in timings]), **ttft})
+    return results
+
+
+def compare(results: List[Dict], baseline_path: str, tolerance: float) -> int:
+    """Print changes against an earlier run; returns the number of regressions beyond `tolerance`."""
+    with open(baseline_path) as f:
+        baseline = {(r["docs"], r["synthesis"], r["mode"]): r for r in json.load(f)["results"]}
+
+    print(f"\nCompared with {baseline_path} (regression = more than {tolerance:.0%} worse)")
+    print(f"{'scenario':<36}{'p50':>10}{'p95':>10}{'p99':>10}{'qps':>10}")
+    regressions = 0
+    for result in results:
+        key = (result["docs"], result["synthesis"], result["mode"])
+        before = baseline.get(key)
+        if before is None:
+            continue
+        cells = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "qps"):
+            change = result[metric] / before[metric] - 1 if before.get(metric) else 0.0
+            worse = -change if metric == "qps" else change
+            regressed = worse > tolerance
+            regressions += regressed
+            cells.append(f"{change:+.0%}{'!' if regressed else ' '}")
+        print(f"{'/'.join(map(str, key)):<36}" + "".join(f"{cell:>10}" for cell in cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end query latency benchmark")
+    parser.add_argument("--docs", type=int, nargs="+", default=[100, 1000], help="Index sizes (articles)")
+    parser.add_argument("--queries", type=int, default=50, help="Timed queries per scenario")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--synthesis", nargs="+", default=["tree_summarize", "packed"])
+    parser.add_argument("--tokens-per-sec", type=float, default=100.0, help="Fake LLM generation speed")
+    parser.add_argument("--prefill-ms", type=float, default=50.0, help="Fake LLM delay before the first token")
+    parser.add_argument("--prefill-ms-per-1k-words", type=float, default=20.0)
+    parser.add_argument("--answer-tokens", type=int, default=48)
+    parser.add_argument("--ollama-parallel", type=int, default=4, help="Generations the fake LLM runs at once")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=str, help="Also write results to this JSON file")
+    parser.add_argument("--compare", type=str, help="Earlier --json output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown before --compare fails")
+    args = parser.parse_args()
+
+    fake = FakeOllama(
+        tokens_per_sec=args.tokens_per_sec,
+        prefill_ms=args.prefill_ms,
+        prefill_ms_per_1k_words=args.prefill_ms_per_1k_words,
+        answer_tokens=args.answer_tokens,
+        parallel=args.ollama_parallel
+    ).start()
+    os.environ["OLLAMA_BASE_URL"] = fake.url
+    os.environ["OLLAMA_MODEL"] = "fake"
+
+    from llama_index.core import Document
+    from src import config
+    from src.indexer import KnowledgeGraphIndexer
+    from src.query import QueryEngine
+
+    print(f"\n{'='*60}")
+    print("Query Latency Benchmark")
+    print(f"Docs: {args.docs}  Queries: {args.queries}  Concurrency: {args.concurrency}")
+    print(f"Fake LLM: {args.tokens_per_sec} tokens/s, {args.prefill_ms} ms prefill, {args.answer_tokens} tokens")
+    print(f"{'='*60}\n")
+
+    results = []
+    workdir = os.getcwd()
+    print(f"{'scenario':<36}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ttft p50':>10}{'qps':>8}")
+    try:
+        for num_docs in args.docs:
+            articles, questions = synthetic_corpus(num_docs, args.seed)
+            documents = [
+                Document(text=a["text"], id_=a["id"], metadata={"title": a["title"]}) for a in articles
+            ]
+            with tempfile.TemporaryDirectory(prefix="bench_query_") as tmp:
+                # ./storage and ./cache are relative to the working directory
+                os.chdir(tmp)
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    indexer = KnowledgeGraphIndexer()
+                    indexer.build_index(documents)
+                build_seconds = time.perf_counter() - start
+
+                for synthesis in args.synthesis:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        engine = QueryEngine(indexer=indexer, synthesis_mode=synthesis, verbose=False)
+                        engine.initialize()
+                    for result in run_scenarios(engine, questions, args):
+                        result.update(docs=num_docs, synthesis=synthesis, build_seconds=build_seconds)
+                        results.append(result)
+                        label = f"{num_docs}/{synthesis}/{result['mode']}"
+                        ttft = f"{result['ttft_p50_ms']:.1f}" if "ttft_p50_ms" in result else "-"
+                        print(f"{label:<36}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+                              f"{result['p99_ms']:>10.1f}{ttft:>10}{result['qps']:>8.2f}")
+                os.chdir(workdir)
+    finally:
+        os.chdir(workdir)
+        fake.stop()
+
+    report = {
+        "benchmark": "query",
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "settings": {
+            "seed": args.seed,
+            "tokens_per_sec": args.tokens_per_sec,
+            "prefill_ms": args.prefill_ms,
+            "prefill_ms_per_1k_words": args.prefill_ms_per_1k_words,
+            "answer_tokens": args.answer_tokens,
+            "ollama_parallel": args.ollama_parallel,
+            "embed_model": config.EMBED_MODEL,
+            "retrieval_mode": config.RETRIEVAL_MODE,
+            "vector_store": config.VECTOR_STORE,
+            "llm_transport": config.LLM_TRANSPORT,
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
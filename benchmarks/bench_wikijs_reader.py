@@ -0,0 +1,153 @@
+"""Pages/sec of the Wiki.js reader against a local fake GraphQL server.
+
+Seeds the fake server the way a real wiki is seeded (`populate_wiki.py`
+and `seed_data.py` through the create mutation) plus synthetic pages,
+then compares the old one-request-per-page fetch with batched, concurrent
+fetching, and measures an incremental sync after a few edits.
+
+Usage:
+    python benchmarks/bench_wikijs_reader.py --pages 20000 --latency-ms 5
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+import requests
+
+# Add rag_agent to path for both PyCharm and command line
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+rag_agent_path = os.path.join(project_root, 'rag_agent')
+for path in (rag_agent_path, project_root):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+try:
+    from rag_agent.src.reader import WikiReader, LIST_QUERY
+except ImportError:
+    from src.reader import WikiReader, LIST_QUERY
+
+from fake_wiki import FakeWikiServer
+import populate_wiki
+import seed_data
+
+
+PAGE_QUERY = """
+query ($id: Int!) {
+  pages {
+    single(id: $id) {
+      id
+      path
+      title
+      description
+      content
+    }
+  }
+}
+"""
+
+UPDATE_MUTATION = """
+mutation ($id: Int!, $content: String!) {
+  pages {
+    update(id: $id, content: $content) {
+      responseResult { succeeded message }
+    }
+  }
+}
+"""
+
+
+def seed(server: FakeWikiServer, pages: int):
+    """Seed through the real seeding scripts, then top up with synthetic pages."""
+    api_url = f"{server.url}/graphql"
+    with contextlib.redirect_stdout(io.StringIO()):
+        populate_wiki.API_URL = api_url
+        populate_wiki.process_hierarchy(populate_wiki.hierarchy)
+        seed_data.seed_content(api_url, "benchmark-token")
+    server.store.seed_synthetic(max(0, pages - len(server.store.pages)))
+
+
+def fetch_one_per_page(api_url: str) -> int:
+    """The previous reader: list, then one un-pooled POST per page, in sequence."""
+    headers = {"Authorization": "Bearer benchmark-token", "Content-Type": "application/json"}
+    page_list = requests.post(api_url, json={"query": LIST_QUERY}, headers=headers).json()["data"]["pages"]["list"]
+    count = 0
+    for page_info in page_list:
+        response = requests.post(
+            api_url,
+            json={"query": PAGE_QUERY, "variables": {"id": page_info["id"]}},
+            headers=headers
+        )
+        if response.json()["data"]["pages"]["single"]:
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Wiki.js reader throughput benchmark")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="Fake server latency per request")
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1, 25, 100])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--edits", type=int, default=50, help="Pages edited before the incremental sync")
+    parser.add_argument("--skip-baseline", action="store_true", help="Skip the one-request-per-page run")
+    parser.add_argument("--json", type=str, help="Also write results to this JSON file")
+    args = parser.parse_args()
+
+    server = FakeWikiServer(latency_ms=args.latency_ms).start()
+    seed(server, args.pages)
+    api_url = f"{server.url}/graphql"
+    total = len(server.store.pages)
+
+    print(f"\n{'='*60}")
+    print("Wiki.js Reader Benchmark")
+    print(f"Pages: {total}  Latency: {args.latency_ms} ms/request")
+    print(f"{'='*60}\n")
+
+    results = {"pages": total, "latency_ms": args.latency_ms, "runs": []}
+    print(f"{'mode':<24}{'pages':>8}{'requests':>10}{'seconds':>10}{'pages/s':>10}")
+
+    def report(mode: str, pages: int, api_requests: int, seconds: float):
+        rate = pages / seconds if seconds > 0 else 0.0
+        print(f"{mode:<24}{pages:>8}{api_requests:>10}{seconds:>10.2f}{rate:>10.1f}")
+        results["runs"].append({"mode": mode, "pages": pages, "requests": api_requests,
+                                "seconds": seconds, "pages_per_second": rate})
+
+    if not args.skip_baseline:
+        before = server.request_count
+        start = time.perf_counter()
+        pages = fetch_one_per_page(api_url)
+        report("one request per page", pages, server.request_count - before, time.perf_counter() - start)
+
+    reader = None
+    for batch_size in args.batch_size:
+        for workers in args.workers:
+            # Without the page cache: it would turn repeat runs into cache hits
+            reader = WikiReader(use_cache=False, batch_size=batch_size, max_workers=workers, wiki_url=server.url)
+            with contextlib.redirect_stdout(io.StringIO()):
+                pages = sum(1 for _ in reader.iter_pages())
+            stats = reader.last_fetch_stats
+            report(f"batch={batch_size} workers={workers}", pages, int(stats["api_requests"]), stats["seconds"])
+
+    # Incremental sync: edit a few pages, then fetch only what changed
+    since = reader.last_sync
+    for page_id in list(server.store.pages)[:args.edits]:
+        requests.post(api_url, json={"query": UPDATE_MUTATION,
+                                     "variables": {"id": page_id, "content": f"# Edited {page_id}"}})
+    with contextlib.redirect_stdout(io.StringIO()):
+        pages = sum(1 for _ in reader.iter_pages(updated_since=since))
+    stats = reader.last_fetch_stats
+    report(f"incremental ({args.edits} edits)", pages, int(stats["api_requests"]), stats["seconds"])
+
+    server.stop()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
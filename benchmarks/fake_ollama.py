@@ -0,0 +1,230 @@
+"""Local stand-in for the Ollama HTTP API, for tests and benchmarks.
+
+Serves /api/chat, /api/generate (streamed NDJSON or single JSON),
+/api/show, /api/tags and /api/version with deterministic output and
+configurable speed:
+
+    prefill_ms      delay before the first token (plus prefill_ms_per_1k_words)
+    tokens_per_sec  generation speed (0 = as fast as possible)
+    answer_tokens   tokens per answer
+    parallel        generations served at once; more requests queue, as
+                    with OLLAMA_NUM_PARALLEL
+
+Condense-question prompts ("... Standalone question:") are answered with
+the follow-up question itself, so multi-turn flows stay meaningful.
+
+Usage:
+    python benchmarks/fake_ollama.py --port 11434 --tokens-per-sec 50 --prefill-ms 200
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional
+
+
+_FOLLOW_UP = re.compile(r"Follow Up Input:\s*(.*?)\s*\n", re.S)
+_WORD = re.compile(r"[A-Za-z]{4,}")
+
+
+class FakeOllama:
+    """Threaded HTTP server imitating the subset of Ollama that LlamaIndex uses."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        tokens_per_sec: float = 0.0,
+        prefill_ms: float = 0.0,
+        prefill_ms_per_1k_words: float = 0.0,
+        answer_tokens: int = 32,
+        parallel: int = 4,
+        context_length: int = 8192
+    ):
+        self.tokens_per_sec = tokens_per_sec
+        self.prefill_ms = prefill_ms
+        self.prefill_ms_per_1k_words = prefill_ms_per_1k_words
+        self.answer_tokens = answer_tokens
+        self.context_length = context_length
+        self.slots = threading.Semaphore(parallel)
+        self.stats = {"connections": 0, "requests": 0, "generations": 0, "prompt_words": 0, "active": 0, "peak_active": 0}
+        self.prompts: List[str] = []
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def answer_for(self, prompt: str) -> List[str]:
+        """Deterministic answer tokens for a prompt."""
+        if "Standalone question:" in prompt:
+            match = _FOLLOW_UP.search(prompt)
+            if match:
+                return [match.group(1)]
+        words = _WORD.findall(prompt) or ["answer"]
+        seed = int.from_bytes(hashlib.blake2b(prompt.encode(), digest_size=8).digest(), "big")
+        return [("" if i == 0 else " ") + words[(seed + i * 7919) % len(words)]
+                for i in range(self.answer_tokens)]
+
+    def generate(self, prompt: str) -> Iterator[str]:
+        """Yield tokens at the configured pace, holding one of the parallel slots."""
+        with self._lock:
+            self.stats["generations"] += 1
+            self.stats["prompt_words"] += len(prompt.split())
+            self.prompts.append(prompt)
+        with self.slots:
+            with self._lock:
+                self.stats["active"] += 1
+                self.stats["peak_active"] = max(self.stats["peak_active"], self.stats["active"])
+            try:
+                prefill = self.prefill_ms + self.prefill_ms_per_1k_words * len(prompt.split()) / 1000
+                if prefill:
+                    time.sleep(prefill / 1000)
+                for token in self.answer_for(prompt):
+                    if self.tokens_per_sec:
+                        time.sleep(1.0 / self.tokens_per_sec)
+                    yield token
+            finally:
+                with self._lock:
+                    self.stats["active"] -= 1
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def setup(self):
+                super().setup()
+                with fake._lock:
+                    fake.stats["connections"] += 1
+
+            def _send_json(self, status: int, payload: Dict):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _write_line(self, payload: Dict):
+                data = json.dumps(payload).encode() + b"\n"
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                with fake._lock:
+                    fake.stats["requests"] += 1
+                if self.path == "/api/tags":
+                    self._send_json(200, {"models": [{"name": "fake:latest", "model": "fake:latest"}]})
+                elif self.path == "/api/version":
+                    self._send_json(200, {"version": "0.0.0-fake"})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                with fake._lock:
+                    fake.stats["requests"] += 1
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path == "/api/show":
+                    self._send_json(200, {
+                        "modelfile": "", "parameters": "", "template": "",
+                        "details": {"family": "fake", "format": "gguf"},
+                        "model_info": {"general.architecture": "fake",
+                                      "fake.context_length": fake.context_length}
+                    })
+                elif self.path == "/api/chat":
+                    prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+                    self._generate(body, prompt, chat=True)
+                elif self.path == "/api/generate":
+                    self._generate(body, body.get("prompt", ""), chat=False)
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def _chunk(self, body: Dict, text: str, chat: bool, done: bool, **extra) -> Dict:
+                payload = {
+                    "model": body.get("model", "fake"),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "done": done,
+                }
+                if chat:
+                    payload["message"] = {"role": "assistant", "content": text}
+                else:
+                    payload["response"] = text
+                payload.update(extra)
+                return payload
+
+            def _generate(self, body: Dict, prompt: str, chat: bool):
+                start = time.perf_counter_ns()
+                stream = body.get("stream", True)
+                if not stream:
+                    tokens = list(fake.generate(prompt))
+                    self._send_json(200, self._chunk(
+                        body, "".join(tokens), chat, True, done_reason="stop",
+                        total_duration=time.perf_counter_ns() - start,
+                        prompt_eval_count=len(prompt.split()), eval_count=len(tokens)
+                    ))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                count = 0
+                try:
+                    for token in fake.generate(prompt):
+                        count += 1
+                        self._write_line(self._chunk(body, token, chat, False))
+                    self._write_line(self._chunk(
+                        body, "", chat, True, done_reason="stop",
+                        total_duration=time.perf_counter_ns() - start,
+                        prompt_eval_count=len(prompt.split()), eval_count=count
+                    ))
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+        return Handler
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--prefill-ms", type=float, default=100.0)
+    parser.add_argument("--answer-tokens", type=int, default=64)
+    parser.add_argument("--parallel", type=int, default=4)
+    args = parser.parse_args()
+
+    fake = FakeOllama(args.host, args.port, tokens_per_sec=args.tokens_per_sec, prefill_ms=args.prefill_ms,
+                      answer_tokens=args.answer_tokens, parallel=args.parallel)
+    print(f"Fake Ollama at {fake.url} ({args.tokens_per_sec} tokens/s, {args.prefill_ms} ms prefill)")
+    try:
+        fake.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""Local stand-in for the Wiki.js GraphQL API, for benchmarks.
+
+Implements the subset of the Wiki.js 2.x schema this project uses:
+
+    query    { pages { list { ... } } }
+    query    { pages { a: single(id: 1) { ... } b: single(id: 2) { ... } } }
+    mutation { pages { create(...) { responseResult { ... } page { ... } } } }
+    mutation { pages { update(id: ..., content: ...) { responseResult { ... } } } }
+
+Aliases, arguments, variables and nested selections are parsed, so the
+unmodified `populate_wiki.py` and `seed_data.py` can seed it exactly as
+they seed a real wiki. Pages live in memory.
+
+Usage:
+    python benchmarks/fake_wiki.py --port 3000 --pages 20000 --latency-ms 5
+    python populate_wiki.py   # seeds the hierarchy through the create mutation
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+_TOKEN = re.compile(r'''
+    (?P<ws>[\s,]+|\#[^\n]*)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<name>[_A-Za-z][_0-9A-Za-z]*)
+  | (?P<punct>\.\.\.|[{}()\[\]:!$=@])
+''', re.VERBOSE)
+
+
+def _tokenize(source: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    while pos < len(source):
+        match = _TOKEN.match(source, pos)
+        if not match:
+            raise ValueError(f"Syntax Error: unexpected character {source[pos]!r}")
+        pos = match.end()
+        kind = match.lastgroup
+        if kind != "ws":
+            tokens.append((kind, match.group()))
+    return tokens
+
+
+class _Parser:
+    """Just enough of a GraphQL parser for single-operation documents."""
+
+    def __init__(self, source: str, variables: Dict[str, Any]):
+        self.tokens = _tokenize(source)
+        self.pos = 0
+        self.variables = variables
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos][1] if self.pos < len(self.tokens) else None
+
+    def take(self, expected: Optional[str] = None) -> Tuple[str, str]:
+        if self.pos >= len(self.tokens):
+            raise ValueError("Syntax Error: unexpected end of document")
+        token = self.tokens[self.pos]
+        if expected is not None and token[1] != expected:
+            raise ValueError(f"Syntax Error: expected {expected!r}, got {token[1]!r}")
+        self.pos += 1
+        return token
+
+    def operation(self) -> Tuple[str, List[Dict]]:
+        kind = "query"
+        if self.peek() in ("query", "mutation"):
+            kind = self.take()[1]
+            if self.tokens[self.pos][0] == "name":
+                self.take()
+            if self.peek() == "(":
+                self._skip_group("(", ")")
+        return kind, self.selection_set()
+
+    def _skip_group(self, open_: str, close: str):
+        depth = 0
+        while True:
+            value = self.take()[1]
+            depth += value == open_
+            depth -= value == close
+            if depth == 0:
+                return
+
+    def selection_set(self) -> List[Dict]:
+        self.take("{")
+        selections = []
+        while self.peek() != "}":
+            name = self.take()[1]
+            alias = name
+            if self.peek() == ":":
+                self.take(":")
+                name = self.take()[1]
+            args = self.arguments() if self.peek() == "(" else {}
+            children = self.selection_set() if self.peek() == "{" else None
+            selections.append({"alias": alias, "name": name, "args": args, "children": children})
+        self.take("}")
+        return selections
+
+    def arguments(self) -> Dict[str, Any]:
+        self.take("(")
+        args = {}
+        while self.peek() != ")":
+            name = self.take()[1]
+            self.take(":")
+            args[name] = self.value()
+        self.take(")")
+        return args
+
+    def value(self) -> Any:
+        kind, token = self.take()
+        if token == "$":
+            return self.variables.get(self.take()[1])
+        if token == "[":
+            items = []
+            while self.peek() != "]":
+                items.append(self.value())
+            self.take("]")
+            return items
+        if token == "{":
+            obj = {}
+            while self.peek() != "}":
+                key = self.take()[1]
+                self.take(":")
+                obj[key] = self.value()
+            self.take("}")
+            return obj
+        if kind == "string":
+            return json.loads(token)
+        if kind == "number":
+            return float(token) if any(c in token for c in ".eE") else int(token)
+        return {"true": True, "false": False, "null": None}.get(token, token)
+
+
+class WikiStore:
+    """In-memory pages keyed by id, with Wiki.js-style timestamps."""
+
+    def __init__(self):
+        self.pages: Dict[int, Dict] = {}
+        self.paths: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._clock = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def _tick(self) -> str:
+        # Strictly increasing, so `updatedAt` orders every change
+        now = max(datetime.now(timezone.utc), self._clock + timedelta(milliseconds=1))
+        self._clock = now
+        return now.strftime("%Y-%m-%dT%H:%M:%S.") + f"{now.microsecond // 1000:03d}Z"
+
+    def create(self, path: str, title: str, content: str, description: str = "",
+               locale: str = "en", tags: Optional[List[str]] = None, **extra) -> Optional[Dict]:
+        """Add a page; returns None if the path is taken."""
+        with self._lock:
+            if (locale, path) in self.paths:
+                return None
+            stamp = self._tick()
+            page = {
+                "id": self._next_id,
+                "path": path,
+                "locale": locale,
+                "title": title,
+                "description": description,
+                "content": content,
+                "tags": [{"tag": tag, "title": tag} for tag in tags or []],
+                "isPublished": extra.get("isPublished", True),
+                "isPrivate": extra.get("isPrivate", False),
+                "editor": extra.get("editor", "markdown"),
+                "createdAt": stamp,
+                "updatedAt": stamp,
+            }
+            self.pages[page["id"]] = page
+            self.paths[(locale, path)] = page["id"]
+            self._next_id += 1
+            return page
+
+    def update(self, page_id: int, **fields) -> Optional[Dict]:
+        with self._lock:
+            page = self.pages.get(page_id)
+            if page is None:
+                return None
+            for key in ("title", "description", "content", "isPublished", "isPrivate", "editor"):
+                if fields.get(key) is not None:
+                    page[key] = fields[key]
+            page["updatedAt"] = self._tick()
+            return page
+
+    def seed_synthetic(self, count: int, words_per_page: int = 400):
+        """Add `count` generated pages under a mission/section hierarchy like populate_wiki.py."""
+        vocabulary = ("warp core dilithium crystal antimatter injector reactor chamber hull shield "
+                      "crew commander science officer navigation sensor array propulsion impulse "
+                      "engine life support atmosphere gravity orbit telemetry mission vehicle").split()
+        start = len(self.pages)
+        for n in range(start, start + count):
+            mission, section = divmod(n, 100)
+            words = " ".join(vocabulary[(n * 7 + i * 13) % len(vocabulary)] for i in range(words_per_page))
+            self.create(
+                path=f"mission-{mission}/section-{section}",
+                title=f"Mission {mission} Section {section}",
+                content=f"# Mission {mission} Section {section}\n\n{words}",
+                description=f"Generated page {n}",
+                tags=["synthetic"],
+            )
+
+
+class _Resolver:
+    def __init__(self, store: WikiStore):
+        self.store = store
+        self.errors: List[Dict] = []
+
+    def execute(self, kind: str, selections: List[Dict]) -> Dict:
+        data = {}
+        for field in selections:
+            if field["name"] != "pages":
+                raise ValueError(f'Cannot query field "{field["name"]}" on type "{kind.title()}".')
+            data[field["alias"]] = self._pages(kind, field["children"] or [])
+        return data
+
+    def _pages(self, kind: str, selections: List[Dict]) -> Dict:
+        result = {}
+        for field in selections:
+            name, args, alias = field["name"], field["args"], field["alias"]
+            if kind == "query" and name == "list":
+                pages = sorted(self.store.pages.values(), key=lambda p: p["id"])
+                if args.get("locale"):
+                    pages = [p for p in pages if p["locale"] == args["locale"]]
+                if args.get("limit"):
+                    pages = pages[:args["limit"]]
+                result[alias] = [self._select(p, field["children"]) for p in pages]
+            elif kind == "query" and name == "single":
+                page = self.store.pages.get(args.get("id"))
+                if page is None:
+                    self.errors.append({"message": "This page does not exist.", "path": ["pages", alias]})
+                    result[alias] = None
+                else:
+                    result[alias] = self._select(page, field["children"])
+            elif kind == "mutation" and name == "create":
+                page = self.store.create(**args)
+                result[alias] = self._select(self._response(page, "create"), field["children"])
+            elif kind == "mutation" and name == "update":
+                page_id = args.pop("id", None)
+                page = self.store.update(page_id, **args)
+                result[alias] = self._select(self._response(page, "update"), field["children"])
+            else:
+                raise ValueError(f'Cannot query field "{name}" on type "Page{kind.title()}".')
+        return result
+
+    @staticmethod
+    def _response(page: Optional[Dict], action: str) -> Dict:
+        if page is None:
+            message = ("Cannot create this page because an entry already exists at the same path."
+                       if action == "create" else "This page does not exist.")
+            return {"responseResult": {"succeeded": False, "errorCode": 6002, "slug": "PageError",
+                                       "message": message}, "page": None}
+        return {"responseResult": {"succeeded": True, "errorCode": 0, "slug": "ok",
+                                   "message": f"Page has been {action}d."}, "page": page}
+
+    def _select(self, value: Any, selections: Optional[List[Dict]]) -> Any:
+        if selections is None or value is None:
+            return value
+        if isinstance(value, list):
+            return [self._select(item, selections) for item in value]
+        return {field["alias"]: self._select(value.get(field["name"]), field["children"]) for field in selections}
+
+
+class FakeWikiServer:
+    """Threaded HTTP server answering GraphQL POSTs at /graphql."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0,
+                 store: Optional[WikiStore] = None):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            latency_ms: Added to every request, standing in for network and database time
+            store: Pages to serve (default: empty)
+        """
+        self.store = store or WikiStore()
+        self.latency = latency_ms / 1000.0
+        self.request_count = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True  # keep-alive clients otherwise stall on delayed ACKs
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, payload = server.handle(body)
+                encoded = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle(self, body: bytes) -> Tuple[int, Dict]:
+        self.request_count += 1
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            request = json.loads(body)
+            kind, selections = _Parser(request["query"], request.get("variables") or {}).operation()
+        except (ValueError, KeyError) as e:
+            return 400, {"errors": [{"message": str(e)}]}
+        resolver = _Resolver(self.store)
+        try:
+            data = resolver.execute(kind, selections)
+        except (ValueError, TypeError) as e:
+            return 200, {"errors": [{"message": str(e)}], "data": None}
+        payload = {"data": data}
+        if resolver.errors:
+            payload["errors"] = resolver.errors
+        return 200, payload
+
+    def start(self) -> "FakeWikiServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Wiki.js GraphQL server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--pages", type=int, default=0, help="Synthetic pages to pre-seed")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request")
+    args = parser.parse_args()
+
+    server = FakeWikiServer(args.host, args.port, latency_ms=args.latency_ms)
+    server.store.seed_synthetic(args.pages)
+    print(f"Fake Wiki.js serving {len(server.store.pages)} pages at {server.url}/graphql")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
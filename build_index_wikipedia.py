@@ -1,6 +1,7 @@
 """Build Knowledge Graph Index from Wikipedia articles."""
 import sys
 import os
+import itertools
 
 # Add parent directory to path for both PyCharm and command line
 project_root = os.path.dirname(os.path.abspath(__file__))
@@ -20,13 +21,22 @@ except ImportError:
 
 
 
-def build_index(topic: str, max_articles: int = None):
+def build_index(
+    topic: str,
+    max_articles: int = None,
+    incremental: bool = False,
+    prune: bool = False,
+    shard: str = None
+):
     """
     Build a knowledge graph index from Wikipedia articles on a given topic.
     
     Args:
         topic: Topic to search for on Wikipedia
         max_articles: Maximum number of articles to fetch (uses config default if not specified)
+        incremental: Update the existing index in place instead of rebuilding it
+        prune: With incremental, delete indexed articles not fetched in this run
+        shard: Build this named shard (storage/shards/<shard>) instead of the main index
     """
     max_articles = max_articles or MAX_ARTICLES
     
@@ -35,41 +45,48 @@ def build_index(topic: str, max_articles: int = None):
     print(f"Topic: {topic}")
     print(f"Max Articles: {max_articles}")
     print(f"Language: {WIKIPEDIA_LANGUAGE}")
+    print(f"Mode: {'incremental' if incremental else 'full rebuild'}")
+    if shard:
+        print(f"Shard: {shard}")
     print(f"{'='*60}\n")
     
     # Initialize Wikipedia reader
     reader = WikipediaReader(language=WIKIPEDIA_LANGUAGE, max_articles=max_articles)
     
-    # Fetch articles
+    # Fetch articles lazily; they are indexed as they arrive
     print("Fetching Wikipedia articles...")
-    documents = reader.fetch_articles_by_topic(topic, limit=max_articles)
+    documents = reader.iter_articles_by_topic(topic, limit=max_articles)
     
-    if not documents:
+    first = next(documents, None)
+    if first is None:
         print("No articles fetched. Exiting.")
         return
     
-    print(f"\nFetched {len(documents)} articles:")
-    for doc in documents:
-        print(f"  - {doc.metadata['title']}")
-    
     # Build index
     print("\nBuilding knowledge graph index...")
-    indexer = KnowledgeGraphIndexer()
-    indexer.build_index(documents)
+    indexer = KnowledgeGraphIndexer(shard=shard)
+    indexer.build_index_streaming(itertools.chain([first], documents), incremental=incremental, prune=prune)
     
     print("\n" + "="*60)
     print("Knowledge graph built successfully!")
     print(f"Index saved to: {indexer.storage_dir}")
+    if reader.cache:
+        print(reader.cache.summary())
     print("="*60)
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python build_index_wikipedia.py <topic> [max_articles]")
+    flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+    shard = next((flag.split("=", 1)[1] for flag in flags if flag.startswith("--shard=")), None)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    
+    if len(args) < 1:
+        print("Usage: python build_index_wikipedia.py <topic> [max_articles] [--incremental [--prune]] [--shard=<name>]")
         print("Example: python build_index_wikipedia.py 'Machine Learning' 15")
+        print("Example: python build_index_wikipedia.py 'Quantum Physics' 10 --shard=physics")
         sys.exit(1)
     
-    topic = sys.argv[1]
-    max_articles = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    topic = args[0]
+    max_articles = int(args[1]) if len(args) > 1 else None
     
-    build_index(topic, max_articles)
+    build_index(topic, max_articles, incremental="--incremental" in flags, prune="--prune" in flags, shard=shard)
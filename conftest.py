@@ -0,0 +1,51 @@
+"""Fixtures shared by the tests.
+
+Settings come from the environment only once per process, when the
+config is first imported, so the fixtures pass what the tests need
+directly instead: a scratch working directory for ./storage and ./cache,
+and a fake Ollama installed as the process-wide LLM. Both are per test
+module, so modules can run in one process in any order.
+"""
+import os
+import sys
+
+import pytest
+
+# Add rag_agent and benchmarks to path for both PyCharm and command line
+project_root = os.path.dirname(os.path.abspath(__file__))
+for path in (os.path.join(project_root, 'rag_agent'), os.path.join(project_root, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from fake_ollama import FakeOllama
+
+# Try absolute import first (PyCharm), then relative (command line)
+try:
+    from rag_agent.src.llm_transport import PooledOllama
+    from rag_agent.src.models import set_llm
+except ImportError:
+    from src.llm_transport import PooledOllama
+    from src.models import set_llm
+
+
+@pytest.fixture(scope="module")
+def workdir(tmp_path_factory, request):
+    """A fresh working directory for the test module (./storage and ./cache are relative to it)."""
+    path = tmp_path_factory.mktemp(request.module.__name__)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.chdir(path)
+        yield path
+
+
+@pytest.fixture(scope="module")
+def fake_ollama():
+    """A fake Ollama on a free port, used as the LLM by the test module."""
+    fake = FakeOllama(answer_tokens=8, parallel=4).start()
+    llm = PooledOllama(model="fake", base_url=fake.url)
+    set_llm(llm)
+    try:
+        yield fake
+    finally:
+        set_llm(None)
+        llm.transport.close()
+        fake.stop()
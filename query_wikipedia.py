@@ -1,6 +1,8 @@
 """Interactive Query Interface for Wikipedia-based Knowledge Graph."""
 import sys
 import os
+import threading
+from concurrent.futures import Future
 
 # Add parent directory to path for both PyCharm and command line
 project_root = os.path.dirname(os.path.abspath(__file__))
@@ -8,26 +10,52 @@ rag_agent_path = os.path.join(project_root, 'rag_agent')
 if rag_agent_path not in sys.path:
     sys.path.insert(0, rag_agent_path)
 
-# Try absolute import first (PyCharm), then relative (command line)
+# Try absolute import first (PyCharm), then relative (command line).
+# Only the lightweight timer is imported here; LlamaIndex and the models
+# load in the background while the prompt is shown.
 try:
-    from rag_agent.src.query import QueryEngine
+    from rag_agent.src.startup import startup_timer
 except ImportError:
-    from src.query import QueryEngine
+    from src.startup import startup_timer
 
 
+def load_query_engine():
+    """Import the query stack and start warming up the index and embedding model."""
+    with startup_timer.measure("imports"):
+        try:
+            from rag_agent.src.query import QueryEngine
+        except ImportError:
+            from src.query import QueryEngine
+    with startup_timer.measure("engine setup"):
+        query_engine = QueryEngine()
+    query_engine.warm_up()
+    return query_engine
+
+
+def load_query_engine_in_background() -> Future:
+    future = Future()
+    
+    def run():
+        try:
+            future.set_result(load_query_engine())
+        except BaseException as e:
+            future.set_exception(e)
+    
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
 
 def main():
     """Run interactive query interface."""
     print("\n" + "="*60)
     print("Wikipedia Knowledge Graph - Interactive Query Interface")
     print("="*60)
-    print("\nInitializing query engine...")
+    print("\nInitializing query engine in the background...")
+    show_timings = "--timings" in sys.argv[1:]
     
     try:
-        query_engine = QueryEngine()
-        query_engine.initialize()
+        pending = load_query_engine_in_background()
         
-        print("\nQuery engine ready!")
         print("Type 'exit' or 'quit' to stop.\n")
         
         while True:
@@ -38,10 +66,17 @@ def main():
                 break
             
             if query.lower() in ['clear', 'reset']:
-                query_engine.chat_history = []
+                pending.result().chat_history = []
                 print("\n[Chat history cleared]")
                 continue
             
+            if query.lower() == 'stats':
+                answer_cache = pending.result().answer_cache
+                print(f"\n{answer_cache.summary() if answer_cache else 'Answer cache disabled'}")
+                print(pending.result().usage_summary())
+                print(pending.result().transport_summary())
+                continue
+            
             if not query:
                 continue
             
@@ -49,10 +84,15 @@ def main():
             print("Answer: ", end="", flush=True)
             
             # Use streaming query
+            query_engine = pending.result()
             for token in query_engine.query_stream(query):
                 print(token, end="", flush=True)
                 
             print(f"\n{'-'*60}")
+            if "first answer" not in startup_timer.stages:
+                startup_timer.mark("first answer")
+                if show_timings:
+                    print(startup_timer.report())
     
     except FileNotFoundError:
         print("\n[X] No index found!")
@@ -1,47 +1,91 @@
 """Main CLI entry point for RAG Agent."""
 import argparse
-from src.wikipedia_reader import WikipediaReader
-from src.indexer import KnowledgeGraphIndexer
-from src.query import QueryEngine
-from src.config import MAX_ARTICLES
+import itertools
+import threading
+from concurrent.futures import Future
+from src.config import MAX_ARTICLES, SERVER_HOST, SERVER_PORT, TRACE_SINK
+from src.startup import startup_timer
+from src.tracing import tracer
 
+# LlamaIndex and the models are imported inside the functions that need
+# them, so `--help` and the interactive prompt come up without waiting.
 
-def index_wikipedia(topic: str, limit: int = MAX_ARTICLES):
-    """Fetch pages from Wikipedia and build the index."""
+
+def index_wikipedia(
+    topic: str,
+    limit: int = MAX_ARTICLES,
+    incremental: bool = False,
+    prune: bool = False,
+    shard: str = None
+):
+    """Fetch pages from Wikipedia and build the index (or one named shard of it)."""
+    from src.wikipedia_reader import WikipediaReader
+    from src.indexer import KnowledgeGraphIndexer
+    
     print(f"=== Indexing Wikipedia Content: {topic} ===")
     
-    # Fetch pages
+    # Stream pages straight into the index as they are fetched
     reader = WikipediaReader()
-    documents = reader.fetch_articles_by_topic(topic, limit=limit)
+    documents = reader.iter_articles_by_topic(topic, limit=limit)
     
-    if not documents:
+    first = next(documents, None)
+    if first is None:
         print("No documents found. Exiting.")
         return
     
     # Build index
-    indexer = KnowledgeGraphIndexer()
-    indexer.build_index(documents)
+    indexer = KnowledgeGraphIndexer(shard=shard)
+    indexer.build_index_streaming(itertools.chain([first], documents), incremental=incremental, prune=prune)
     
+    if reader.cache:
+        print(reader.cache.summary())
     print("\n[SUCCESS] Indexing complete!")
 
 
-def query_knowledge_graph(question: str):
+def create_query_engine():
+    """Import the query stack and start loading the index and embedding model."""
+    with startup_timer.measure("imports"):
+        from src.query import QueryEngine
+    with startup_timer.measure("engine setup"):
+        engine = QueryEngine()
+    engine.warm_up()
+    return engine
+
+
+def create_query_engine_in_background() -> Future:
+    """Run `create_query_engine` on a daemon thread; the Future resolves to the engine."""
+    future = Future()
+    
+    def run():
+        try:
+            future.set_result(create_query_engine())
+        except BaseException as e:
+            future.set_exception(e)
+    
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def query_knowledge_graph(question: str, timings: bool = False):
     """Query the indexed knowledge."""
     print("=== Querying Knowledge Graph ===")
     
-    engine = QueryEngine()
+    engine = create_query_engine()
     answer = engine.query(question)
+    startup_timer.mark("first answer")
     
     print(f"\nAnswer:\n{answer}\n")
+    if timings:
+        print(startup_timer.report())
 
 
-def interactive_mode():
+def interactive_mode(timings: bool = False):
     """Interactive query mode."""
     print("=== Interactive Query Mode ===")
     print("Type 'exit' to quit\n")
     
-    engine = QueryEngine()
-    engine.initialize()
+    # Imports, index and model load while the user types the first question
+    pending = create_query_engine_in_background()
     
     while True:
         question = input("Question: ").strip()
@@ -51,8 +95,37 @@ def interactive_mode():
         if not question:
             continue
         
-        answer = engine.query(question)
+        try:
+            engine = pending.result()
+            answer = engine.query(question)
+        except Exception as e:
+            # e.g. Ollama not up yet: report it and try again with the next question
+            print(f"\nError: {e}\n")
+            if pending.exception() is not None:
+                pending = create_query_engine_in_background()
+            continue
         print(f"\nAnswer:\n{answer}\n")
+        if "first answer" not in startup_timer.stages:
+            startup_timer.mark("first answer")
+            if timings:
+                print(startup_timer.report() + "\n")
+
+
+def serve(host: str, port: int):
+    """Run the HTTP server with the index and embedding model kept warm."""
+    from src.query import QueryEngine
+    from src.server import RAGServer
+    
+    engine = QueryEngine(verbose=False)
+    engine.warm_up().result()
+    server = RAGServer(engine, host=host, port=port)
+    print(f"=== Serving on {server.url} (POST /query, GET /health) ===")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
 
 
 def main():
@@ -63,22 +136,49 @@ def main():
     group.add_argument("--index", action="store_true", help="Index content from Wikipedia")
     group.add_argument("--query", type=str, help="Query the knowledge graph")
     group.add_argument("--interactive", action="store_true", help="Interactive query mode")
+    group.add_argument("--serve", action="store_true", help="Serve queries over HTTP")
 
     # Arguments for indexing
     parser.add_argument("--topic", type=str, help="Topic to search on Wikipedia (required for --index)")
     parser.add_argument("--limit", type=int, default=MAX_ARTICLES, help="Max articles to fetch")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Update the existing index in place instead of rebuilding it")
+    parser.add_argument("--prune", action="store_true",
+                        help="With --incremental, delete indexed documents not fetched in this run")
+    parser.add_argument("--shard", type=str,
+                        help="With --index, build this named shard (storage/shards/<name>) and leave the others alone")
+    parser.add_argument("--timings", action="store_true",
+                        help="Print a startup timing breakdown after the first answer")
+    parser.add_argument("--profile", action="store_true",
+                        help="Trace fetching, indexing and query stages and print a per-stage breakdown at the end")
+    parser.add_argument("--metrics-file", type=str, default=TRACE_SINK or None,
+                        help="With --profile, append per-stage metrics to this JSON-lines file")
+    
+    # Arguments for serving
+    parser.add_argument("--host", type=str, default=SERVER_HOST, help="Interface for --serve")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="Port for --serve")
     
     args = parser.parse_args()
+    if args.profile:
+        tracer.enable(args.metrics_file)
     
-    if args.index:
-        if not args.topic:
-            print("Error: --topic is required when using --index")
-            return
-        index_wikipedia(args.topic, args.limit)
-    elif args.query:
-        query_knowledge_graph(args.query)
-    elif args.interactive:
-        interactive_mode()
+    try:
+        if args.index:
+            if not args.topic:
+                print("Error: --topic is required when using --index")
+                return
+            index_wikipedia(args.topic, args.limit, args.incremental, args.prune, args.shard)
+        elif args.query:
+            query_knowledge_graph(args.query, args.timings)
+        elif args.interactive:
+            interactive_mode(args.timings)
+        elif args.serve:
+            serve(args.host, args.port)
+    finally:
+        if args.profile:
+            print("\n" + tracer.report())
+            if tracer.sink_path:
+                print(f"Metrics appended to {tracer.sink_path}")
 
 
 if __name__ == "__main__":
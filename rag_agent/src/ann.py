@@ -0,0 +1,138 @@
+"""IVF-flat approximate nearest-neighbour index over a NumPy embedding matrix."""
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+# Rows scored per chunk when assigning vectors to lists, bounding scratch memory
+ASSIGN_CHUNK_ROWS = 65536
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class IVFFlatIndex:
+    """
+    Inverted-file index with exact scoring inside the probed lists.
+
+    Rows are partitioned into `nlist` clusters with spherical k-means. A
+    query scores the centroids, probes the `nprobe` closest lists and
+    scores only the rows in them against the original float32 matrix.
+    Larger `nprobe` trades latency for recall; `nprobe == nlist` is an
+    exact search.
+
+    The index stores only centroids and row numbers (4 bytes per row), so
+    it is persisted next to the vector store's matrix and scores against
+    that matrix rather than keeping a copy of the vectors.
+    """
+
+    def __init__(self, nlist: int = 0, nprobe: int = 8, iterations: int = 10, seed: int = 0):
+        """
+        Initialize an empty index.
+
+        Args:
+            nlist: Number of lists; 0 picks about 4 * sqrt(rows) at build time
+            nprobe: Lists scanned per query
+            iterations: k-means iterations
+            seed: Random seed for centroid initialization and sampling
+        """
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.order: Optional[np.ndarray] = None
+        self.offsets: Optional[np.ndarray] = None
+
+    @property
+    def is_built(self) -> bool:
+        return self.centroids is not None
+
+    def _assign(self, matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        labels = np.empty(len(matrix), dtype=np.int32)
+        for start in range(0, len(matrix), ASSIGN_CHUNK_ROWS):
+            block = np.asarray(matrix[start:start + ASSIGN_CHUNK_ROWS], dtype=np.float32)
+            labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return labels
+
+    def build(self, matrix: np.ndarray):
+        """Cluster the rows of an L2-normalized matrix into inverted lists."""
+        rows = len(matrix)
+        nlist = self.nlist or max(1, int(4 * np.sqrt(rows)))
+        nlist = min(nlist, rows)
+        rng = np.random.default_rng(self.seed)
+
+        # Train on a sample; 64 points per list is plenty for k-means
+        sample_size = min(rows, nlist * 64)
+        sample_rows = np.sort(rng.choice(rows, size=sample_size, replace=False))
+        sample = np.asarray(matrix[sample_rows], dtype=np.float32)
+        centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+
+        for _ in range(self.iterations):
+            labels = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(sample_size, size=int(empty.sum()))]
+            centroids = _normalize(sums)
+
+        labels = self._assign(matrix, centroids)
+        self.centroids = centroids.astype(np.float32)
+        self.order = np.argsort(labels, kind="stable").astype(np.int32)
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=nlist)))).astype(np.int64)
+        self.nlist = nlist
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Row numbers in the `nprobe` lists closest to `query`."""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        centroid_scores = self.centroids @ query
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        return np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probe])
+
+    def search(
+        self,
+        matrix: np.ndarray,
+        query: np.ndarray,
+        k: int,
+        live: Optional[np.ndarray] = None,
+        nprobe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k by cosine similarity.
+
+        Returns:
+            (rows, scores) sorted by descending score
+        """
+        rows = self.candidates(query, nprobe)
+        if live is not None:
+            rows = rows[live[rows]]
+        if len(rows) == 0:
+            return rows, np.zeros(0, dtype=np.float32)
+        rows.sort()  # sequential reads from the memory-mapped matrix
+        scores = np.asarray(matrix[rows] @ query, dtype=np.float32)
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return rows[top], scores[top]
+
+    def save(self, path: str):
+        """Write centroids and inverted lists to a single `.npz` file."""
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, order=self.order, offsets=self.offsets)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, nprobe: int = 8) -> "IVFFlatIndex":
+        index = cls(nprobe=nprobe)
+        with np.load(path) as data:
+            index.centroids = data["centroids"]
+            index.order = data["order"]
+            index.offsets = data["offsets"]
+        index.nlist = len(index.centroids)
+        return index
@@ -0,0 +1,250 @@
+"""Compact BM25 inverted index over index nodes, persisted next to the vector store."""
+import os
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from llama_index.core.schema import BaseNode, MetadataMode
+
+from .text_utils import tokenize
+
+
+BM25_STEM = "bm25"
+K1 = 1.2
+B = 0.75
+
+
+def bm25_paths(persist_dir: str) -> Tuple[str, str]:
+    """Paths of the postings arrays and the row id map."""
+    stem = os.path.join(persist_dir, BM25_STEM)
+    return f"{stem}.npz", f"{stem}.ids.tsv"
+
+
+class BM25Index:
+    """
+    BM25 over node text, stored as CSR postings.
+
+    The persisted form is one `.npz` with the sorted vocabulary, per-term
+    offsets into two flat posting arrays (uint32 row, uint16 term
+    frequency) and per-row lengths, plus a TSV id map like the NumPy vector
+    store's. Scoring a query touches only the postings of its terms and
+    accumulates into one score array.
+
+    Like `NumpyVectorStore`, rows added after loading are kept in memory
+    and deleted rows are masked until the next `persist`, which compacts
+    everything into new arrays.
+    """
+
+    def __init__(self):
+        self._vocab: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._rows = np.zeros(0, dtype=np.uint32)
+        self._tfs = np.zeros(0, dtype=np.uint16)
+        self._lengths = np.zeros(0, dtype=np.uint32)
+        self._ids: List[str] = []
+        self._ref_doc_ids: List[str] = []
+        self._live = np.zeros(0, dtype=bool)
+        self._rows_by_ref: Dict[str, List[int]] = {}
+        # Rows added since the last persist: term counts per row
+        self._pending: List[Counter] = []
+        self._pending_ids: List[str] = []
+        self._pending_ref_doc_ids: List[str] = []
+        self._pending_live: List[bool] = []
+
+    @staticmethod
+    def exists(persist_dir: str) -> bool:
+        return os.path.exists(bm25_paths(persist_dir)[0])
+
+    @classmethod
+    def load(cls, persist_dir: str) -> "BM25Index":
+        index = cls()
+        postings_path, ids_path = bm25_paths(persist_dir)
+        with np.load(postings_path) as data:
+            vocab = data["vocab"]
+            index._offsets = data["offsets"]
+            index._rows = data["rows"]
+            index._tfs = data["tfs"]
+            index._lengths = data["lengths"]
+        index._vocab = {term: i for i, term in enumerate(vocab.tolist())}
+        with open(ids_path, "r", encoding="utf-8") as f:
+            for line in f:
+                node_id, ref_doc_id = line.rstrip("\n").split("\t")
+                index._ids.append(node_id)
+                index._ref_doc_ids.append(ref_doc_id)
+        index._live = np.ones(len(index._ids), dtype=bool)
+        for row, ref_doc_id in enumerate(index._ref_doc_ids):
+            index._rows_by_ref.setdefault(ref_doc_id, []).append(row)
+        return index
+
+    @classmethod
+    def from_nodes(cls, nodes: Iterable[BaseNode]) -> "BM25Index":
+        index = cls()
+        index.add(nodes)
+        return index
+
+    @property
+    def num_rows(self) -> int:
+        return int(self._live.sum()) + sum(self._pending_live)
+
+    def add(self, nodes: Iterable[BaseNode]):
+        """Index node text (with the metadata the embedding also sees, e.g. the title)."""
+        for node in nodes:
+            self._pending.append(Counter(tokenize(node.get_content(metadata_mode=MetadataMode.EMBED))))
+            self._pending_ids.append(node.node_id)
+            self._pending_ref_doc_ids.append(node.ref_doc_id or "None")
+            self._pending_live.append(True)
+
+    def delete(self, ref_doc_id: str):
+        """Mask every row that belongs to `ref_doc_id`."""
+        for row in self._rows_by_ref.pop(ref_doc_id, []):
+            self._live[row] = False
+        for row, row_ref in enumerate(self._pending_ref_doc_ids):
+            if row_ref == ref_doc_id:
+                self._pending_live[row] = False
+
+    def _total_length(self, pending_lengths: np.ndarray) -> float:
+        pending_live = np.asarray(self._pending_live, dtype=bool)
+        return float(self._lengths[self._live].sum()) + float(pending_lengths[pending_live].sum())
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray, List[int]]:
+        """Live mapped rows containing `term` with their term frequencies, and live pending rows containing it."""
+        term_id = self._vocab.get(term)
+        if term_id is not None:
+            start, end = self._offsets[term_id], self._offsets[term_id + 1]
+            rows, tfs = self._rows[start:end], self._tfs[start:end].astype(np.float32)
+            rows_live = self._live[rows]
+            rows, tfs = rows[rows_live], tfs[rows_live]
+        else:
+            rows, tfs = self._rows[:0], np.zeros(0, dtype=np.float32)
+        pending_rows = [i for i, c in enumerate(self._pending) if term in c and self._pending_live[i]]
+        return rows, tfs, pending_rows
+
+    def term_stats(self, query: str) -> Tuple[int, float, Dict[str, int]]:
+        """
+        Collection statistics for scoring `query`.
+
+        Summed over several indexes and passed to `search`, they make each
+        index score its rows as if all of them were one index.
+
+        Returns:
+            (live rows, their total length, document frequency of each query term)
+        """
+        pending_lengths = np.array([sum(c.values()) for c in self._pending], dtype=np.float32)
+        dfs = {}
+        for term in dict.fromkeys(tokenize(query)):
+            rows, _, pending_rows = self._postings(term)
+            dfs[term] = len(rows) + len(pending_rows)
+        return self.num_rows, self._total_length(pending_lengths), dfs
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        stats: Optional[Tuple[int, float, Dict[str, int]]] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Rank rows for a query.
+
+        Args:
+            query: Query text
+            top_k: Rows returned
+            stats: Collection statistics (see `term_stats`) to score with
+                instead of this index's own
+
+        Returns:
+            Up to `top_k` (node id, BM25 score) pairs with a positive score, best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or self.num_rows == 0:
+            return []
+
+        pending_lengths = np.array([sum(c.values()) for c in self._pending], dtype=np.float32)
+        postings = {term: self._postings(term) for term in terms}
+        if stats is None:
+            n_rows, total_length = self.num_rows, self._total_length(pending_lengths)
+            dfs = {term: len(rows) + len(pending_rows) for term, (rows, _, pending_rows) in postings.items()}
+        else:
+            n_rows, total_length, dfs = stats
+        avg_length = total_length / n_rows or 1.0
+
+        base_norm = K1 * (1 - B + B * self._lengths.astype(np.float32) / avg_length)
+        pending_norm = K1 * (1 - B + B * pending_lengths / avg_length)
+        base_scores = np.zeros(len(self._ids), dtype=np.float32)
+        pending_scores = np.zeros(len(self._pending), dtype=np.float32)
+
+        for term, (rows, tfs, pending_rows) in postings.items():
+            df = dfs.get(term, 0)
+            if df == 0 or (len(rows) == 0 and not pending_rows):
+                continue
+            idf = np.float32(np.log(1 + (n_rows - df + 0.5) / (df + 0.5)))
+            base_scores[rows] += idf * tfs * (K1 + 1) / (tfs + base_norm[rows])
+            for i in pending_rows:
+                tf = self._pending[i][term]
+                pending_scores[i] += idf * tf * (K1 + 1) / (tf + pending_norm[i])
+
+        scores = np.concatenate([base_scores, pending_scores])
+        ids = self._ids + self._pending_ids
+        k = min(top_k, int((scores > 0).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(ids[i], float(scores[i])) for i in top]
+
+    def persist(self, persist_dir: str):
+        """Compact live rows (mapped and pending) into new postings arrays and write them."""
+        os.makedirs(persist_dir, exist_ok=True)
+        postings_path, ids_path = bm25_paths(persist_dir)
+
+        # New row numbers: live base rows first, then live pending rows
+        base_keep = np.flatnonzero(self._live)
+        remap = np.full(len(self._ids), -1, dtype=np.int64)
+        remap[base_keep] = np.arange(len(base_keep))
+        pending_keep = [i for i, live in enumerate(self._pending_live) if live]
+
+        # (term, row, tf) triples from the existing postings...
+        vocab = sorted(set(self._vocab).union(*(self._pending[i] for i in pending_keep)))
+        term_ids = {term: i for i, term in enumerate(vocab)}
+        old_to_new = np.zeros(len(self._vocab), dtype=np.int64)
+        for term, old in self._vocab.items():
+            old_to_new[old] = term_ids[term]
+        terms = np.repeat(old_to_new, np.diff(self._offsets)) if len(self._vocab) else np.zeros(0, dtype=np.int64)
+        rows = remap[self._rows]
+        keep = rows >= 0
+        terms, rows, tfs = [terms[keep]], [rows[keep]], [self._tfs[keep]]
+
+        # ...and from the pending rows
+        lengths = [self._lengths[base_keep]]
+        for offset, i in enumerate(pending_keep, start=len(base_keep)):
+            counts = self._pending[i]
+            terms.append(np.fromiter((term_ids[t] for t in counts), dtype=np.int64, count=len(counts)))
+            rows.append(np.full(len(counts), offset, dtype=np.int64))
+            tfs.append(np.fromiter((min(tf, 65535) for tf in counts.values()), dtype=np.uint16, count=len(counts)))
+            lengths.append(np.array([sum(counts.values())], dtype=np.uint32))
+
+        terms, rows, tfs = np.concatenate(terms), np.concatenate(rows), np.concatenate(tfs)
+        order = np.lexsort((rows, terms))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(vocab)), out=offsets[1:])
+
+        node_ids = [self._ids[i] for i in base_keep] + [self._pending_ids[i] for i in pending_keep]
+        ref_doc_ids = [self._ref_doc_ids[i] for i in base_keep] + [self._pending_ref_doc_ids[i] for i in pending_keep]
+
+        tmp_postings = f"{postings_path}.tmp.npz"
+        tmp_ids = f"{ids_path}.tmp"
+        np.savez(
+            tmp_postings,
+            vocab=np.array(vocab, dtype=str),
+            offsets=offsets,
+            rows=rows[order].astype(np.uint32),
+            tfs=tfs[order].astype(np.uint16),
+            lengths=np.concatenate(lengths).astype(np.uint32),
+        )
+        with open(tmp_ids, "w", encoding="utf-8") as f:
+            for node_id, ref_doc_id in zip(node_ids, ref_doc_ids):
+                f.write(f"{node_id}\t{ref_doc_id}\n")
+        os.replace(tmp_postings, postings_path)
+        os.replace(tmp_ids, ids_path)
+
+        loaded = BM25Index.load(persist_dir)
+        self.__dict__.update(loaded.__dict__)
@@ -0,0 +1,81 @@
+"""Cheap checks and caching around the condense-question LLM call."""
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+
+# Words that usually point back at something said earlier in the conversation
+REFERRING_WORDS = {
+    "it", "its", "itself", "they", "them", "their", "theirs", "themselves",
+    "this", "that", "these", "those", "he", "him", "his", "she", "her", "hers",
+    "there", "former", "latter", "above", "same", "such", "one", "ones", "else",
+    "another", "other", "others", "previous", "earlier", "aforementioned",
+}
+
+# Openings that only make sense as a continuation
+FOLLOW_UP_PREFIXES = (
+    "and ", "also ", "but ", "so ", "then ", "what about", "how about",
+    "what else", "tell me more", "more ", "elaborate", "explain further",
+    "go on", "continue", "why not", "same ", "compare",
+)
+
+# Questions this short ("Why?", "Any examples?") are rarely self-contained
+MIN_STANDALONE_WORDS = 4
+
+_WORD = re.compile(r"[a-z']+")
+
+
+def needs_rewrite(question: str) -> bool:
+    """
+    Whether a follow-up question probably refers back to the conversation.
+
+    A False answer lets the caller skip the LLM rewrite and use the
+    question as is. The check errs towards True: a needless rewrite only
+    costs the old latency, a missed one retrieves for the wrong subject.
+    """
+    text = question.strip().lower()
+    words = _WORD.findall(text)
+    if len(words) < MIN_STANDALONE_WORDS:
+        return True
+    if text.startswith(FOLLOW_UP_PREFIXES):
+        return True
+    # "it's" -> "it", "that's" -> "that"
+    return any(word.split("'")[0] in REFERRING_WORDS for word in words)
+
+
+class RewriteCache:
+    """LRU map from (recent history, follow-up question) to its standalone rewrite."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(history: List[str], question: str) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        for text in history:
+            digest.update(text.encode("utf-8") + b"\0")
+        digest.update(b"\1" + " ".join(question.lower().split()).encode("utf-8"))
+        return digest.digest()
+
+    def get(self, key: bytes) -> Optional[str]:
+        with self._lock:
+            rewrite = self._entries.get(key)
+            if rewrite is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return rewrite
+
+    def put(self, key: bytes, rewrite: str):
+        with self._lock:
+            self._entries[key] = rewrite
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
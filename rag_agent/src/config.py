@@ -8,6 +8,151 @@ OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
 STORAGE_DIR = "./storage"
 
+# Named shards (built with --shard) live in STORAGE_DIR/shards/<name>; the
+# index in STORAGE_DIR itself is the "default" shard. When shards exist,
+# queries go to all of them (SHARDS limits which) in parallel, SHARD_WORKERS
+# at a time, or with SHARD_ROUTING="centroid" only to the SHARD_ROUTE_TOP
+# shards whose embedding centroids are closest to the question.
+SHARDS = [name.strip() for name in os.getenv("SHARDS", "").split(",") if name.strip()]
+SHARD_ROUTING = os.getenv("SHARD_ROUTING", "all")
+SHARD_ROUTE_TOP = int(os.getenv("SHARD_ROUTE_TOP", "2"))
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "4"))
+
+# Vector store backend for new indexes: "simple" (LlamaIndex JSON) or
+# "numpy" (memory-mapped float32 matrix). Existing indexes are loaded
+# with whichever backend they were built with.
+VECTOR_STORE = os.getenv("VECTOR_STORE", "simple")
+
+# Approximate nearest-neighbour search for the "numpy" vector store:
+# "none" (exact scan) or "ivf" (IVF-flat, built at index time). ANN_NLIST
+# of 0 picks ~4*sqrt(rows); raise ANN_NPROBE for recall, lower it for speed.
+ANN_INDEX = os.getenv("ANN_INDEX", "none")
+ANN_NLIST = int(os.getenv("ANN_NLIST", "0"))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))
+ANN_MIN_ROWS = int(os.getenv("ANN_MIN_ROWS", "10000"))
+
+# Compact codes for the "numpy" vector store, built at index time: "none",
+# "int8" (4x smaller) or "binary" (32x smaller). Exact searches score the
+# codes, then re-score VECTOR_RESCORE x top-k candidates against the float
+# matrix (0 = 4 for int8, 16 for binary); raise it for recall.
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")
+VECTOR_RESCORE = int(os.getenv("VECTOR_RESCORE", "0"))
+
+# Retrieval: "hybrid" fuses vector and BM25 rankings (each HYBRID_CANDIDATES
+# deep) with reciprocal rank fusion; "vector" is dense retrieval only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Entity graph built with the index (GRAPH_WORKERS extraction processes);
+# retrieval appends up to GRAPH_EXPAND_NODES chunks found within GRAPH_HOPS
+# of the hits' entities, spending at most GRAPH_BUDGET_MS on the walk.
+# Opt-in: the extra chunks lengthen every prompt
+GRAPH_ENABLED = os.getenv("GRAPH_ENABLED", "false").lower() == "true"
+GRAPH_WORKERS = int(os.getenv("GRAPH_WORKERS", str(min(4, os.cpu_count() or 1))))
+GRAPH_MAX_DEGREE = int(os.getenv("GRAPH_MAX_DEGREE", "32"))
+GRAPH_HOPS = int(os.getenv("GRAPH_HOPS", "1"))
+GRAPH_EXPAND_NODES = int(os.getenv("GRAPH_EXPAND_NODES", "2"))
+GRAPH_BUDGET_MS = float(os.getenv("GRAPH_BUDGET_MS", "20"))
+
+# Wiki.js configuration
+WIKI_URL = os.getenv("WIKI_URL", "http://localhost:3000")
+WIKI_API_KEY = os.getenv("WIKI_API_KEY", "")
+
+# Pages fetched per aliased GraphQL query, and batch queries in flight at once
+WIKI_BATCH_SIZE = int(os.getenv("WIKI_BATCH_SIZE", "25"))
+WIKI_FETCH_WORKERS = int(os.getenv("WIKI_FETCH_WORKERS", "4"))
+
 # Wikipedia configuration
 WIKIPEDIA_LANGUAGE = os.getenv("WIKIPEDIA_LANGUAGE", "en")
 MAX_ARTICLES = int(os.getenv("MAX_ARTICLES", "10"))
+
+# Concurrent fetching (1 worker falls back to sequential wikipedia.page() calls)
+WIKIPEDIA_FETCH_WORKERS = int(os.getenv("WIKIPEDIA_FETCH_WORKERS", "8"))
+WIKIPEDIA_RATE_LIMIT = float(os.getenv("WIKIPEDIA_RATE_LIMIT", "10"))
+
+# On-disk cache of fetched pages, revalidated by revision id after the TTL
+FETCH_CACHE_ENABLED = os.getenv("FETCH_CACHE_ENABLED", "true").lower() == "true"
+FETCH_CACHE_PATH = os.getenv("FETCH_CACHE_PATH", "./cache/fetch_cache.sqlite")
+FETCH_CACHE_TTL = float(os.getenv("FETCH_CACHE_TTL", "86400"))
+FETCH_CACHE_MAX_MB = int(os.getenv("FETCH_CACHE_MAX_MB", "512"))
+
+# Answers reused for questions whose embeddings are at least this similar;
+# an entry only matches queries against the same index version and scope
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_PATH = os.getenv("SEMANTIC_CACHE_PATH", "./cache/answer_cache.sqlite")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+
+# Follow-up question rewriting: cached rewrites, and retrieval on the raw
+# question while the rewrite runs (kept if the rewrite is this similar)
+REWRITE_CACHE_SIZE = int(os.getenv("REWRITE_CACHE_SIZE", "256"))
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() == "true"
+SPECULATIVE_MIN_SIMILARITY = float(os.getenv("SPECULATIVE_MIN_SIMILARITY", "0.9"))
+
+# LLM transport: "pooled" shares one keep-alive connection pool across all
+# query paths, sends at most LLM_PARALLEL requests at once (match Ollama's
+# OLLAMA_NUM_PARALLEL) and coalesces identical in-flight requests;
+# "ollama" is LlamaIndex's stock client
+LLM_TRANSPORT = os.getenv("LLM_TRANSPORT", "pooled")
+LLM_PARALLEL = int(os.getenv("LLM_PARALLEL", "4"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+LLM_COALESCE = os.getenv("LLM_COALESCE", "true").lower() == "true"
+
+# Async query API: requests talking to the LLM at once, and conversation
+# sessions kept in memory (idle ones expire)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "1000"))
+
+# Answer synthesis: "tree_summarize" (LlamaIndex, possibly several sequential
+# LLM calls) or "packed" (one call over the best chunks that fit the token
+# budget; chunks that do not fit are condensed into notes concurrently)
+SYNTHESIS_MODE = os.getenv("SYNTHESIS_MODE", "tree_summarize")
+SYNTHESIS_TOKEN_BUDGET = int(os.getenv("SYNTHESIS_TOKEN_BUDGET", "3000"))
+SYNTHESIS_NOTES_TOKENS = int(os.getenv("SYNTHESIS_NOTES_TOKENS", "512"))
+
+# Conversation memory: turns kept verbatim, older ones folded into a summary
+# of at most MEMORY_SUMMARY_TOKENS; follow-up rewrites see at most
+# MEMORY_TOKEN_BUDGET tokens of history
+MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "8"))
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "512"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "256"))
+
+# HTTP serving mode (main.py --serve): requests allowed to wait for an LLM
+# slot before new ones get 503, and the per-request time limit
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_MAX_QUEUE = int(os.getenv("SERVER_MAX_QUEUE", "16"))
+SERVER_REQUEST_TIMEOUT = float(os.getenv("SERVER_REQUEST_TIMEOUT", "120"))
+
+# Per-stage tracing of index builds and queries (main.py --profile turns it
+# on); TRACE_SINK appends stage aggregates there as JSON lines
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "false").lower() == "true"
+TRACE_SINK = os.getenv("TRACE_SINK", "")
+
+# Embedding model and its persistent chunk-level cache
+EMBED_MODEL = os.getenv("EMBED_MODEL", "BAAI/bge-small-en-v1.5")
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "./cache/embeddings")
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+
+# Embedding stage for index builds (EMBED_WORKERS > 1 uses a process pool)
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+
+# Near-duplicate detection before embedding (MinHash over DEDUP_SHINGLE_SIZE
+# word shingles, LSH-bucketed): documents, then chunks, at least
+# DEDUP_THRESHOLD similar to indexed ones are skipped. Signatures are kept
+# with the index, so incremental runs skip duplicates of earlier runs.
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))
+DEDUP_SHINGLE_SIZE = int(os.getenv("DEDUP_SHINGLE_SIZE", "5"))
+
+# Streaming ingestion: items buffered between stages, and persist interval
+# (documents; only the numpy vector store is persisted before the end, and
+# each persist rewrites the whole index)
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "16"))
+INGEST_FLUSH_EVERY = int(os.getenv("INGEST_FLUSH_EVERY", "500"))
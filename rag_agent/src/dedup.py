@@ -0,0 +1,287 @@
+"""MinHash/LSH near-duplicate detection for documents and chunks, persisted with the index."""
+import os
+import threading
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .text_utils import tokenize
+
+
+DEDUP_FILE = "dedup.npz"
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+
+def dedup_path(persist_dir: str) -> str:
+    return os.path.join(persist_dir, DEDUP_FILE)
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles.
+
+    Text is tokenized like the BM25 index, cut into overlapping
+    `shingle_size`-word shingles (CRC32 of each), and every one of
+    `num_perm` hash functions keeps its minimum over the shingles. The
+    fraction of positions where two signatures agree estimates the
+    Jaccard similarity of the two shingle sets.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Fixed seed, so signatures persisted by one run compare with the next
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """uint32 signature of `text`, or None if it is shorter than one shingle."""
+        words = tokenize(text)
+        if len(words) < self.shingle_size:
+            return None
+        shingles = {
+            zlib.crc32(" ".join(words[i:i + self.shingle_size]).encode("utf-8"))
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+        values = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+        # (a * x + b) >> 32 per hash function, wrapping in 64 bits
+        hashed = (self._a[:, None] * values[None, :] + self._b[:, None]) >> np.uint64(32)
+        return (hashed.min(axis=1) & _MASK32).astype(np.uint32)
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    (bands, rows per band) with bands * rows == num_perm whose LSH
+    S-curve midpoint, (1 / bands) ** (1 / rows), is closest to `threshold`.
+    """
+    options = [(b, num_perm // b) for b in range(1, num_perm + 1) if num_perm % b == 0]
+    return min(options, key=lambda option: abs((1 / option[0]) ** (1 / option[1]) - threshold))
+
+
+class LSHIndex:
+    """
+    Signatures by key, bucketed by LSH band for sub-linear candidate lookup.
+
+    A query only compares against keys sharing at least one band with it,
+    and reports a match if their estimated Jaccard similarity reaches the
+    threshold. Each key belongs to an owner (the document a chunk came
+    from), so a document's own signatures can be ignored while it is
+    re-indexed and all of them dropped when it is deleted.
+    """
+
+    def __init__(self, num_perm: int, threshold: float):
+        self.threshold = threshold
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.owners: Dict[str, str] = {}
+        self._by_owner: Dict[str, List[str]] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def query(self, signature: np.ndarray, exclude_owner: Optional[str] = None) -> Optional[Tuple[str, float]]:
+        """Most similar key at or above the threshold (ignoring `exclude_owner`'s keys), or None."""
+        candidates = set()
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band, ()))
+        best = None
+        for key in candidates:
+            if exclude_owner is not None and self.owners[key] == exclude_owner:
+                continue
+            similarity = float(np.mean(self.signatures[key] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        return best
+
+    def add(self, key: str, signature: np.ndarray, owner: str):
+        if key in self.signatures:
+            self._remove_key(key)
+        self.signatures[key] = signature
+        self.owners[key] = owner
+        self._by_owner.setdefault(owner, []).append(key)
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band, []).append(key)
+
+    def _remove_key(self, key: str):
+        signature = self.signatures.pop(key)
+        owner = self.owners.pop(key)
+        self._by_owner[owner].remove(key)
+        if not self._by_owner[owner]:
+            del self._by_owner[owner]
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            keys = bucket[band]
+            keys.remove(key)
+            if not keys:
+                del bucket[band]
+
+    def remove_owner(self, owner: str):
+        for key in list(self._by_owner.get(owner, ())):
+            self._remove_key(key)
+
+    def count_owned(self, owner: str) -> int:
+        return len(self._by_owner.get(owner, ()))
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        keys = list(self.signatures)
+        matrix = (np.stack([self.signatures[key] for key in keys]) if keys
+                  else np.zeros((0, self.bands * self.rows), dtype=np.uint32))
+        return np.array(keys, dtype=str), np.array([self.owners[key] for key in keys], dtype=str), matrix
+
+
+class NearDuplicateDetector:
+    """
+    Document- and chunk-level near-duplicate filter run before embedding.
+
+    Documents whose text is at least `threshold` similar (estimated
+    Jaccard over word shingles) to an indexed document with another id
+    are skipped before chunking; chunks similar to an indexed chunk of
+    another document, or to an earlier chunk of the same one, are
+    dropped before embedding. Signatures of everything kept are added,
+    so later documents in the run and, once persisted next to the index,
+    later runs are checked against them.
+
+    `skipped_documents`, `skipped_chunks` and `saved_chunks` (the chunks
+    of the documents matched at document level, standing in for the
+    chunks the skipped ones would have had) count what the current run
+    did not embed. The streaming pipeline checks chunks on one thread
+    while another persists, so every method takes the detector's lock.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 64, shingle_size: int = 5):
+        """
+        Args:
+            threshold: Estimated Jaccard similarity at which text counts as a duplicate
+            num_perm: MinHash functions per signature (4 bytes each per stored key)
+            shingle_size: Words per shingle
+        """
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size)
+        self.documents = LSHIndex(num_perm, threshold)
+        self.chunks = LSHIndex(num_perm, threshold)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.skipped_documents = 0
+        self.skipped_chunks = 0
+        self._matched: List[str] = []
+
+    @property
+    def saved_chunks(self) -> int:
+        # Counted when asked, as a match from the same run may not be chunked yet when it is found
+        with self._lock:
+            return sum(self.chunks.count_owned(doc_id) for doc_id in self._matched)
+
+    def check_document(self, doc_id: str, text: str) -> Optional[str]:
+        """
+        Id of an indexed near-duplicate of the document, or None (and the document is recorded).
+
+        A document is never a duplicate of its own earlier version.
+        """
+        signature = self.hasher.signature(text)
+        if signature is None:
+            return None
+        with self._lock:
+            match = self.documents.query(signature, exclude_owner=doc_id)
+            if match is not None:
+                self.skipped_documents += 1
+                self._matched.append(match[0])
+                return match[0]
+            self.documents.add(doc_id, signature, owner=doc_id)
+        return None
+
+    def filter_chunks(self, doc_id: str, nodes: Sequence) -> List:
+        """
+        `nodes` of one document without near-duplicate chunks.
+
+        The kept chunks replace the document's previously recorded ones.
+        """
+        kept, signatures = [], []
+        with self._lock:
+            for node in nodes:
+                signature = self.hasher.signature(node.get_content())
+                if signature is not None:
+                    duplicate = self.chunks.query(signature, exclude_owner=doc_id) is not None or any(
+                        float(np.mean(signature == previous)) >= self.threshold for previous in signatures
+                    )
+                    if duplicate:
+                        self.skipped_chunks += 1
+                        continue
+                    signatures.append(signature)
+                kept.append((node, signature))
+            self.chunks.remove_owner(doc_id)
+            for node, signature in kept:
+                if signature is not None:
+                    self.chunks.add(node.node_id, signature, owner=doc_id)
+        return [node for node, _ in kept]
+
+    def add_nodes(self, nodes: Sequence):
+        """Record already indexed chunks, e.g. of an index built before detection was enabled."""
+        with self._lock:
+            for node in nodes:
+                signature = self.hasher.signature(node.get_content())
+                if signature is not None:
+                    self.chunks.add(node.node_id, signature, owner=node.ref_doc_id or "None")
+
+    def remove_document(self, doc_id: str):
+        """Forget a deleted document's signatures."""
+        with self._lock:
+            self.documents.remove_owner(doc_id)
+            self.chunks.remove_owner(doc_id)
+
+    def summary(self, seconds_per_chunk: float) -> Optional[str]:
+        """One line on what this run skipped, or None if nothing was skipped."""
+        if not (self.skipped_documents or self.skipped_chunks):
+            return None
+        saved_chunks = self.saved_chunks
+        chunks = self.skipped_chunks + saved_chunks
+        return (
+            f"Near-duplicates skipped before embedding: {self.skipped_documents} documents "
+            f"(~{saved_chunks} chunks) and {self.skipped_chunks} chunks; "
+            f"~{chunks} chunks and ~{chunks * seconds_per_chunk:.2f}s of embedding saved"
+        )
+
+    @staticmethod
+    def exists(persist_dir: str) -> bool:
+        return os.path.exists(dedup_path(persist_dir))
+
+    def persist(self, persist_dir: str):
+        os.makedirs(persist_dir, exist_ok=True)
+        with self._lock:
+            doc_keys, _, doc_signatures = self.documents.arrays()
+            chunk_keys, chunk_owners, chunk_signatures = self.chunks.arrays()
+        path = dedup_path(persist_dir)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            settings=np.array([self.threshold, self.hasher.num_perm, self.hasher.shingle_size]),
+            doc_keys=doc_keys, doc_signatures=doc_signatures,
+            chunk_keys=chunk_keys, chunk_owners=chunk_owners, chunk_signatures=chunk_signatures
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, persist_dir: str, threshold: float = 0.85, num_perm: int = 64, shingle_size: int = 5):
+        """
+        Load persisted signatures; None if they were made with another
+        `num_perm` or `shingle_size` and cannot be compared.
+        """
+        detector = cls(threshold=threshold, num_perm=num_perm, shingle_size=shingle_size)
+        with np.load(dedup_path(persist_dir)) as data:
+            _, stored_perm, stored_shingle = data["settings"].tolist()
+            if (int(stored_perm), int(stored_shingle)) != (num_perm, shingle_size):
+                return None
+            for key, signature in zip(data["doc_keys"].tolist(), data["doc_signatures"]):
+                detector.documents.add(key, signature, owner=key)
+            for key, owner, signature in zip(
+                data["chunk_keys"].tolist(), data["chunk_owners"].tolist(), data["chunk_signatures"]
+            ):
+                detector.chunks.add(key, signature, owner=owner)
+        return detector
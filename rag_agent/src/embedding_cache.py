@@ -0,0 +1,187 @@
+"""Persistent chunk-level embedding cache."""
+import atexit
+import hashlib
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+
+class EmbeddingCache:
+    """
+    Embeddings for one model, keyed by a 16-byte hash of the chunk text.
+
+    Stored as three NumPy files per model directory: `keys.npy` (N x 16
+    uint8 hashes), `vectors.npy` (N x dim float32) and `last_used.npy`
+    (N int64 access ticks used for LRU eviction once `max_entries` is
+    exceeded).
+    """
+
+    def __init__(self, directory: str, model_name: str, max_entries: int = 200000):
+        """
+        Initialize the cache and load any entries already on disk.
+
+        Args:
+            directory: Root cache directory; each model gets a subdirectory
+            model_name: Embedding model the vectors belong to
+            max_entries: Upper bound on cached vectors
+        """
+        self.path = os.path.join(directory, model_name.replace("/", "__"))
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._slots: Dict[bytes, int] = {}
+        self._keys: List[bytes] = []
+        self._vectors: List[np.ndarray] = []
+        self._last_used: List[int] = []
+        self._tick = 0
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def key(kind: str, text: str) -> bytes:
+        """Hash of the chunk text; `kind` separates query and document embeddings."""
+        return hashlib.blake2b(f"{kind}\0{text}".encode("utf-8"), digest_size=16).digest()
+
+    def _load(self):
+        keys_path = os.path.join(self.path, "keys.npy")
+        if not os.path.exists(keys_path):
+            return
+        keys = np.load(keys_path)
+        vectors = np.load(os.path.join(self.path, "vectors.npy"))
+        last_used = np.load(os.path.join(self.path, "last_used.npy"))
+        self._keys = [bytes(k) for k in keys]
+        self._slots = {k: i for i, k in enumerate(self._keys)}
+        self._vectors = list(vectors)
+        self._last_used = last_used.tolist()
+        self._tick = int(last_used.max()) + 1 if len(last_used) else 0
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[List[float]]]:
+        """Return cached vectors for `keys`, None where missing."""
+        results: List[Optional[List[float]]] = []
+        with self._lock:
+            for key in keys:
+                slot = self._slots.get(key)
+                if slot is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    self._last_used[slot] = self._tick
+                    self._tick += 1
+                    results.append(self._vectors[slot].tolist())
+        return results
+
+    def put_many(self, keys: List[bytes], vectors: List[List[float]]):
+        """Add vectors, evicting the least recently used if over capacity."""
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                array = np.asarray(vector, dtype=np.float32)
+                slot = self._slots.get(key)
+                if slot is None:
+                    self._slots[key] = len(self._vectors)
+                    self._keys.append(key)
+                    self._vectors.append(array)
+                    self._last_used.append(self._tick)
+                else:
+                    self._vectors[slot] = array
+                    self._last_used[slot] = self._tick
+                self._tick += 1
+            self._dirty = True
+            if len(self._vectors) > self.max_entries:
+                self._evict()
+
+    def _evict(self):
+        keep = np.argsort(np.asarray(self._last_used))[-self.max_entries:]
+        keep.sort()
+        self._keys = [self._keys[old] for old in keep]
+        self._slots = {key: slot for slot, key in enumerate(self._keys)}
+        self._vectors = [self._vectors[old] for old in keep]
+        self._last_used = [self._last_used[old] for old in keep]
+
+    def flush(self):
+        """Write the cache to disk if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            keys = np.frombuffer(b"".join(self._keys), dtype=np.uint8).reshape(-1, 16)
+            if self._vectors:
+                vectors = np.stack(self._vectors).astype(np.float32, copy=False)
+            else:
+                vectors = np.zeros((0, 0), dtype=np.float32)
+            arrays = {
+                "keys.npy": keys,
+                "vectors.npy": vectors,
+                "last_used.npy": np.asarray(self._last_used, dtype=np.int64),
+            }
+            for name, array in arrays.items():
+                tmp_path = os.path.join(self.path, f"{name}.tmp")
+                with open(tmp_path, "wb") as f:
+                    np.save(f, array)
+                os.replace(tmp_path, os.path.join(self.path, name))
+            self._dirty = False
+
+    def summary(self) -> str:
+        """One-line hit/miss summary for build reports."""
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return (f"Embedding cache: {self.hits} hits, {self.misses} misses, "
+                f"{rate:.0f}% hit rate ({len(self._slots)} vectors stored)")
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Embedding model wrapper that consults an EmbeddingCache before the model."""
+
+    _inner: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+
+    def __init__(self, inner: BaseEmbedding, cache: EmbeddingCache, **kwargs):
+        super().__init__(
+            model_name=inner.model_name,
+            embed_batch_size=inner.embed_batch_size,
+            **kwargs
+        )
+        self._inner = inner
+        self._cache = cache
+        atexit.register(cache.flush)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def cache(self) -> EmbeddingCache:
+        return self._cache
+
+    @property
+    def inner(self) -> BaseEmbedding:
+        return self._inner
+
+    def _cached(self, kind: str, texts: List[str], embed: Callable[[List[str]], List[Embedding]]) -> List[Embedding]:
+        keys = [EmbeddingCache.key(kind, text) for text in texts]
+        results = self._cache.get_many(keys)
+        missing = [i for i, vector in enumerate(results) if vector is None]
+        if missing:
+            vectors = embed([texts[i] for i in missing])
+            self._cache.put_many([keys[i] for i in missing], vectors)
+            for i, vector in zip(missing, vectors):
+                results[i] = vector
+        return results
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self._cached("query", [query], lambda q: [self._inner.get_query_embedding(q[0])])[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self._cached("text", texts, self._inner.get_text_embedding_batch)
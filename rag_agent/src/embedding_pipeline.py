@@ -0,0 +1,147 @@
+"""Batched, multi-process embedding stage for index builds."""
+import atexit
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import BaseNode, MetadataMode
+
+from .embedding_cache import CachedEmbedding, EmbeddingCache
+from .tracing import tracer
+
+
+# Per-process model, loaded once by the pool initializer
+_worker_model = None
+
+
+def _init_worker(model_name: str, batch_size: int, threads: int):
+    global _worker_model
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    _worker_model = HuggingFaceEmbedding(model_name=model_name, embed_batch_size=batch_size)
+
+
+def _embed_batch(texts: List[str]) -> List[List[float]]:
+    return _worker_model.get_text_embedding_batch(texts)
+
+
+class EmbeddingPipeline:
+    """
+    Embeds nodes in length-sorted batches, optionally across worker processes.
+
+    Chunks are looked up in the embedding cache first. The remaining texts
+    are sorted by length so each batch pads to a similar size, split into
+    `batch_size` batches, and embedded either in-process or on a pool of
+    `workers` processes that each load the model once.
+    """
+
+    def __init__(self, embed_model: BaseEmbedding, model_name: str, workers: int = 1, batch_size: int = 32):
+        """
+        Initialize the pipeline.
+
+        Args:
+            embed_model: In-process model (optionally a CachedEmbedding)
+            model_name: HuggingFace model each worker process loads
+            workers: Embedding processes; 1 embeds in the calling process
+            batch_size: Texts per model call
+        """
+        self.embed_model = embed_model
+        self.model_name = model_name
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.last_stats: Dict[str, float] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def cache(self) -> Optional[EmbeddingCache]:
+        if isinstance(self.embed_model, CachedEmbedding):
+            return self.embed_model.cache
+        return None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, self.batch_size, threads)
+            )
+            atexit.register(self.close)
+        return self._pool
+
+    def close(self):
+        """Shut down the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def embed_texts(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embed `texts` as documents, returning vectors in input order."""
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batches = [
+            [texts[i] for i in order[start:start + self.batch_size]]
+            for start in range(0, len(order), self.batch_size)
+        ]
+        if self.workers > 1 and len(batches) > 1:
+            results = self._get_pool().map(_embed_batch, batches)
+        else:
+            model = self.embed_model.inner if isinstance(self.embed_model, CachedEmbedding) else self.embed_model
+            results = (model.get_text_embedding_batch(batch) for batch in batches)
+
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        position = 0
+        for batch_vectors in results:
+            for vector in batch_vectors:
+                vectors[order[position]] = vector
+                position += 1
+        return vectors
+
+    def embed_nodes(self, nodes: Sequence[BaseNode], report: bool = True) -> Sequence[BaseNode]:
+        """Fill in `node.embedding` for every node that does not have one yet.
+        
+        Throughput is recorded in `last_stats` and printed unless `report`
+        is False.
+        """
+        start = time.perf_counter()
+        pending = [node for node in nodes if node.embedding is None]
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in pending]
+
+        cached_count = 0
+        cache = self.cache
+        if cache is not None:
+            keys = [EmbeddingCache.key("text", text) for text in texts]
+            for node, vector in zip(pending, cache.get_many(keys)):
+                node.embedding = vector
+            missing = [i for i, node in enumerate(pending) if node.embedding is None]
+            cached_count = len(pending) - len(missing)
+        else:
+            missing = list(range(len(pending)))
+
+        vectors = self.embed_texts([texts[i] for i in missing])
+        for i, vector in zip(missing, vectors):
+            pending[i].embedding = vector
+        if cache is not None and missing:
+            cache.put_many([keys[i] for i in missing], vectors)
+
+        elapsed = time.perf_counter() - start
+        rate = len(pending) / elapsed if elapsed > 0 else 0.0
+        self.last_stats = {
+            "chunks": len(pending),
+            "cached": cached_count,
+            "embedded": len(missing),
+            "seconds": elapsed,
+            "chunks_per_second": rate,
+        }
+        tracer.record("index.embed", elapsed, {"chunks": len(pending), "cached": cached_count})
+        if report and pending:
+            print(f"Embedded {len(pending)} chunks in {elapsed:.2f}s ({rate:.1f} chunks/s; "
+                  f"{cached_count} from cache, {self.workers} workers, batch size {self.batch_size})")
+        return nodes
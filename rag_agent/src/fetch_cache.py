@@ -0,0 +1,188 @@
+"""Persistent on-disk cache for fetched source pages."""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from llama_index.core import Document
+from .config import FETCH_CACHE_ENABLED, FETCH_CACHE_MAX_MB, FETCH_CACHE_PATH, FETCH_CACHE_TTL
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_fetch_cache() -> Optional["FetchCache"]:
+    """Return the process-wide cache from config, or None if disabled."""
+    global _shared_cache
+    if not FETCH_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = FetchCache(
+                FETCH_CACHE_PATH,
+                ttl_seconds=FETCH_CACHE_TTL,
+                max_bytes=FETCH_CACHE_MAX_MB * 1024 * 1024
+            )
+        return _shared_cache
+
+
+class FetchCache:
+    """
+    SQLite-backed page cache keyed by (source, language, page key).
+
+    Every entry remembers the revision it was fetched at. Within the TTL an
+    entry is served without touching the network; after that it is only
+    reused once the caller confirms the revision is unchanged (a cheap
+    revision-id lookup instead of a full fetch). Total payload size is
+    bounded with least-recently-used eviction. Entries written before
+    documents had stable ids are treated as misses and fetched again.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 86400, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            path: SQLite file to store entries in
+            ttl_seconds: How long an entry is trusted without revalidation
+            max_bytes: Upper bound on stored payload size
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                source TEXT NOT NULL,
+                language TEXT NOT NULL,
+                key TEXT NOT NULL,
+                revision TEXT,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (source, language, key)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_lru ON pages (accessed_at)")
+        self._conn.commit()
+
+    def get(
+        self,
+        source: str,
+        language: str,
+        key: str,
+        revision: Optional[str] = None,
+        count_miss: bool = True
+    ) -> Optional[Document]:
+        """
+        Look up a cached page.
+
+        Args:
+            source: Source name, e.g. "wikipedia" or "wikijs"
+            language: Language or locale code
+            key: Title or page id
+            revision: Current revision id if known; the entry must match it.
+                When omitted, the entry must still be within the TTL.
+            count_miss: Set False for a probe that will be followed by a
+                revalidating lookup, so each page counts once
+
+        Returns:
+            The cached Document, or None on a miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT revision, payload, fetched_at FROM pages WHERE source=? AND language=? AND key=?",
+                (source, language, str(key))
+            ).fetchone()
+            now = time.time()
+            if row is None:
+                self.misses += count_miss
+                return None
+            cached_revision, payload, fetched_at = row
+            data = json.loads(payload)
+            if "id" not in data:
+                self.misses += count_miss
+                return None
+            if revision is None:
+                if now - fetched_at > self.ttl_seconds:
+                    self.misses += count_miss
+                    return None
+                self._conn.execute(
+                    "UPDATE pages SET accessed_at=? WHERE source=? AND language=? AND key=?",
+                    (now, source, language, str(key))
+                )
+            else:
+                if cached_revision != str(revision):
+                    self.misses += count_miss
+                    return None
+                self.revalidated += 1
+                self._conn.execute(
+                    "UPDATE pages SET accessed_at=?, fetched_at=? WHERE source=? AND language=? AND key=?",
+                    (now, now, source, language, str(key))
+                )
+            self._conn.commit()
+            self.hits += 1
+        return Document(id_=data["id"], text=data["text"], metadata=data["metadata"])
+
+    def contains(self, source: str, language: str, key: str) -> bool:
+        """Whether an entry exists for the page, within the TTL or not."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM pages WHERE source=? AND language=? AND key=?",
+                (source, language, str(key))
+            ).fetchone()
+        return row is not None
+
+    def put(self, source: str, language: str, key: str, revision: Optional[str], document: Document):
+        """Store a fetched page and evict least-recently-used entries if over budget."""
+        payload = json.dumps({"id": document.doc_id, "text": document.text, "metadata": document.metadata})
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (source, language, str(key), None if revision is None else str(revision),
+                 payload, len(payload), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT source, language, key, size FROM pages ORDER BY accessed_at"
+        ).fetchall()
+        for source, language, key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute(
+                "DELETE FROM pages WHERE source=? AND language=? AND key=?",
+                (source, language, key)
+            )
+            total -= size
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for this process."""
+        return {"hits": self.hits, "misses": self.misses, "revalidated": self.revalidated}
+
+    def summary(self) -> str:
+        """One-line hit/miss summary for build reports."""
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0.0
+        return (f"Fetch cache: {self.hits} hits ({self.revalidated} revalidated), "
+                f"{self.misses} misses, {rate:.0f}% hit rate")
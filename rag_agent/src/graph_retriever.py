@@ -0,0 +1,66 @@
+"""Retrieval expanded over the entity graph."""
+from typing import List
+
+from llama_index.core import QueryBundle
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.storage.docstore.types import BaseDocumentStore
+
+from .graph_store import KnowledgeGraphStore
+
+
+class GraphExpandedRetriever(BaseRetriever):
+    """
+    Base retriever hits plus chunks reached from them through the entity graph.
+
+    The hits' entities are expanded `hops` steps over the graph and up to
+    `max_nodes` extra chunks mentioning the strongest reached entities are
+    appended after the hits. The walk is cut off after `budget_ms`, so the
+    graph stage adds a bounded amount of latency to each query.
+    """
+
+    def __init__(
+        self,
+        base_retriever: BaseRetriever,
+        graph: KnowledgeGraphStore,
+        docstore: BaseDocumentStore,
+        hops: int = 1,
+        max_nodes: int = 2,
+        budget_ms: float = 20.0
+    ):
+        """
+        Args:
+            base_retriever: Retriever providing the seed chunks (vector or hybrid)
+            graph: Entity graph over the same chunks
+            docstore: Docstore holding the chunks
+            hops: Entity-to-entity steps from the seeds' entities
+            max_nodes: Extra chunks appended
+            budget_ms: Time allowed for the graph walk
+        """
+        super().__init__()
+        self.base_retriever = base_retriever
+        self.graph = graph
+        self.docstore = docstore
+        self.hops = hops
+        self.max_nodes = max_nodes
+        self.budget_ms = budget_ms
+
+    def expand(self, hits: List[NodeWithScore]) -> List[NodeWithScore]:
+        """`hits` followed by the chunks reached from them through the graph."""
+        if not hits or self.max_nodes <= 0:
+            return hits
+        related = self.graph.expand(
+            [hit.node.node_id for hit in hits], hops=self.hops, max_nodes=self.max_nodes, budget_ms=self.budget_ms
+        )
+        scores = dict(related)
+        nodes = self.docstore.get_nodes([node_id for node_id, _ in related], raise_error=False)
+        # Graph scores are not comparable with similarity scores; rank the extras after the hits
+        floor = min((hit.score or 0.0) for hit in hits)
+        top = max(scores.values(), default=1.0)
+        return hits + [NodeWithScore(node=node, score=floor * scores[node.node_id] / top) for node in nodes]
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self.expand(self.base_retriever.retrieve(query_bundle))
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self.expand(await self.base_retriever.aretrieve(query_bundle))
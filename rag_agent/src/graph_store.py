@@ -0,0 +1,313 @@
+"""Entity graph over index chunks, stored as memory-mapped CSR arrays."""
+import atexit
+import multiprocessing
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .text_utils import STOPWORDS
+
+
+GRAPH_DIR = "graph"
+ARRAYS = (
+    "chunk_offsets", "chunk_entities",       # chunk row -> entity ids
+    "entity_offsets", "entity_chunks",       # entity id -> chunk rows
+    "adj_offsets", "adj_entities", "adj_weights",  # entity id -> neighbours, strongest first
+)
+
+# Runs of capitalized words ("Alan Turing", "Bletchley Park", "NASA")
+_CANDIDATE = re.compile(r"\b[A-Z][\w'\-]*(?:\s+(?:of\s+|de\s+|von\s+|van\s+)?[A-Z][\w'\-]*)*")
+PARALLEL_MIN_CHUNKS = 256
+
+
+def extract_entities(text: str, title: str = "", max_entities: int = 32) -> List[str]:
+    """
+    Entity keys mentioned in a chunk: its document title, then the most frequent.
+
+    Entities are runs of capitalized words with a leading stopword dropped
+    ("The Warp Core" -> "warp core"); single common words are ignored.
+    """
+    counts: Counter = Counter()
+    for match in _CANDIDATE.finditer(text):
+        words = match.group(0).split()
+        while words and words[0].lower() in STOPWORDS:
+            words = words[1:]
+        if not words or (len(words) == 1 and (len(words[0]) < 3 or words[0].lower() in STOPWORDS)):
+            continue
+        counts[" ".join(words).lower()] += 1
+    title = title.lower()
+    entities = [title] if title else []
+    entities.extend(entity for entity, _ in counts.most_common(max_entities + 1) if entity != title)
+    return entities[:max_entities]
+
+
+def _extract_batch(items: List[Tuple[str, str]], max_entities: int) -> List[List[str]]:
+    return [extract_entities(text, title, max_entities) for text, title in items]
+
+
+def graph_dir(persist_dir: str) -> str:
+    return os.path.join(persist_dir, GRAPH_DIR)
+
+
+class KnowledgeGraphStore:
+    """
+    Entity co-mention graph linked to the chunks it was extracted from.
+
+    Three CSR structures (offsets + flat uint32 arrays) are persisted as
+    `.npy` files under `<storage>/graph/` and memory-mapped on load:
+    chunk -> entities, entity -> chunks, and entity -> neighbouring
+    entities with co-mention weights, sorted strongest first and capped at
+    `max_degree`. Each lookup is one slice, so walking the graph costs
+    O(degree) per visited entity and startup does not parse anything but
+    the id lists.
+
+    As with the vector and BM25 stores, added chunks stay in memory and
+    deleted ones are masked until `persist` rebuilds the arrays.
+    """
+
+    def __init__(self, max_degree: int = 32, max_entities_per_chunk: int = 32, workers: int = 1):
+        """
+        Args:
+            max_degree: Neighbours kept per entity (strongest co-mentions)
+            max_entities_per_chunk: Entities kept per chunk (most frequent)
+            workers: Extraction processes for large batches (1 = in-process)
+        """
+        self.max_degree = max_degree
+        self.max_entities_per_chunk = max_entities_per_chunk
+        self.workers = max(1, workers)
+        self.arrays: Dict[str, np.ndarray] = {
+            name: np.zeros(1 if name.endswith("offsets") else 0, dtype=np.int64 if name.endswith("offsets") else np.uint32)
+            for name in ARRAYS
+        }
+        self.arrays["adj_weights"] = np.zeros(0, dtype=np.float32)
+        self.entities: List[str] = []
+        self._ids: List[str] = []
+        self._ref_doc_ids: List[str] = []
+        self._live = np.zeros(0, dtype=bool)
+        self._rows_by_ref: Dict[str, List[int]] = {}
+        self._row_by_id: Optional[Dict[str, int]] = None
+        self._pending: List[Tuple[str, str, List[str]]] = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @staticmethod
+    def exists(persist_dir: str) -> bool:
+        return os.path.exists(os.path.join(graph_dir(persist_dir), "entities.txt"))
+
+    @classmethod
+    def load(cls, persist_dir: str, **kwargs) -> "KnowledgeGraphStore":
+        graph = cls(**kwargs)
+        graph._load(graph_dir(persist_dir))
+        return graph
+
+    def _load(self, directory: str):
+        self.arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+        with open(os.path.join(directory, "entities.txt"), "r", encoding="utf-8") as f:
+            self.entities = f.read().split("\n")[:-1]
+        self._ids, self._ref_doc_ids = [], []
+        with open(os.path.join(directory, "chunks.tsv"), "r", encoding="utf-8") as f:
+            for line in f:
+                node_id, ref_doc_id = line.rstrip("\n").split("\t")
+                self._ids.append(node_id)
+                self._ref_doc_ids.append(ref_doc_id)
+        self._live = np.ones(len(self._ids), dtype=bool)
+        self._rows_by_ref = {}
+        for row, ref_doc_id in enumerate(self._ref_doc_ids):
+            self._rows_by_ref.setdefault(ref_doc_id, []).append(row)
+        self._row_by_id = None
+        self._pending = []
+
+    @property
+    def num_entities(self) -> int:
+        return len(self.entities)
+
+    @property
+    def num_links(self) -> int:
+        """Stored adjacency entries (each co-mention appears once per direction, within the degree cap)."""
+        return len(self.arrays["adj_entities"])
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(self.close)
+        return self._pool
+
+    def close(self):
+        """Shut down the extraction pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def extract(self, items: Sequence[Tuple[str, str]]) -> List[List[str]]:
+        """Entities for (text, title) pairs, across worker processes when there are many."""
+        if self.workers == 1 or len(items) < PARALLEL_MIN_CHUNKS:
+            return _extract_batch(list(items), self.max_entities_per_chunk)
+        size = -(-len(items) // (self.workers * 4))
+        futures = [
+            self._get_pool().submit(_extract_batch, list(items[i:i + size]), self.max_entities_per_chunk)
+            for i in range(0, len(items), size)
+        ]
+        return [entities for future in futures for entities in future.result()]
+
+    def add(self, nodes: Iterable):
+        """Extract entities from nodes (chunks) and add them."""
+        nodes = list(nodes)
+        items = [(node.get_content(), str(node.metadata.get("title", ""))) for node in nodes]
+        for node, entities in zip(nodes, self.extract(items)):
+            self._pending.append((node.node_id, node.ref_doc_id or "None", entities))
+        self._row_by_id = None
+
+    def delete(self, ref_doc_id: str):
+        """Drop every chunk of `ref_doc_id` (and, on persist, entities left without chunks)."""
+        for row in self._rows_by_ref.pop(ref_doc_id, []):
+            self._live[row] = False
+        self._pending = [p for p in self._pending if p[1] != ref_doc_id]
+
+    def _slice(self, offsets: str, values: str, i: int) -> np.ndarray:
+        start, end = self.arrays[offsets][i], self.arrays[offsets][i + 1]
+        return self.arrays[values][start:end]
+
+    def neighbours(self, entity: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(neighbour ids, weights) of an entity, strongest first."""
+        start, end = self.arrays["adj_offsets"][entity], self.arrays["adj_offsets"][entity + 1]
+        return self.arrays["adj_entities"][start:end], self.arrays["adj_weights"][start:end]
+
+    def expand(
+        self,
+        node_ids: Sequence[str],
+        hops: int = 1,
+        max_nodes: int = 2,
+        budget_ms: float = 20.0,
+        fanout: int = 8
+    ) -> List[Tuple[str, float]]:
+        """
+        Chunks related to `node_ids` through shared or neighbouring entities.
+
+        Starting from the entities of the seed chunks, walks up to `hops`
+        steps over the `fanout` strongest edges of each entity, then scores
+        the chunks mentioning the reached entities. Once `budget_ms` is used
+        up the walk stops and only the entities reached so far are scored.
+
+        Returns:
+            Up to `max_nodes` (node id, score) pairs not among the seeds, best first
+        """
+        deadline = time.perf_counter() + budget_ms / 1000
+        if self._row_by_id is None:
+            self._row_by_id = {node_id: row for row, node_id in enumerate(self._ids)}
+        seeds = [self._row_by_id[n] for n in node_ids if n in self._row_by_id and self._live[self._row_by_id[n]]]
+
+        # Entity scores: seed entities 1.0, each hop scaled by relative edge weight and halved
+        reached: Dict[int, float] = {}
+        for row in seeds:
+            for entity in self._slice("chunk_offsets", "chunk_entities", row).tolist():
+                reached[int(entity)] = 1.0
+        frontier = dict(reached)
+        for _ in range(hops):
+            next_frontier: Dict[int, float] = {}
+            for entity, score in frontier.items():
+                if time.perf_counter() > deadline:
+                    break
+                ids, weights = self.neighbours(entity)
+                if not len(ids):
+                    continue
+                ids, weights = ids[:fanout].tolist(), weights[:fanout] / weights[0]
+                for neighbour, weight in zip(ids, weights.tolist()):
+                    value = 0.5 * score * weight
+                    if value > reached.get(neighbour, 0.0):
+                        reached[neighbour] = next_frontier[neighbour] = value
+            frontier = next_frontier
+
+        seed_set = set(seeds)
+        chunk_scores: Dict[int, float] = {}
+        for entity, score in sorted(reached.items(), key=lambda item: -item[1]):
+            if len(chunk_scores) >= max_nodes and time.perf_counter() > deadline:
+                break
+            for row in self._slice("entity_offsets", "entity_chunks", entity)[:fanout].tolist():
+                if row not in seed_set and self._live[row]:
+                    chunk_scores[row] = chunk_scores.get(row, 0.0) + score
+        top = sorted(chunk_scores, key=chunk_scores.get, reverse=True)[:max_nodes]
+        return [(self._ids[row], chunk_scores[row]) for row in top]
+
+    def persist(self, persist_dir: str):
+        """Rebuild the CSR arrays from live and pending chunks and write them."""
+        directory = graph_dir(persist_dir)
+        os.makedirs(directory, exist_ok=True)
+
+        chunks: List[Tuple[str, str, List[str]]] = []
+        for row in np.flatnonzero(self._live).tolist():
+            names = [self.entities[e] for e in self._slice("chunk_offsets", "chunk_entities", row).tolist()]
+            chunks.append((self._ids[row], self._ref_doc_ids[row], names))
+        chunks.extend(self._pending)
+
+        entities = sorted({name for _, _, names in chunks for name in names})
+        entity_ids = {name: i for i, name in enumerate(entities)}
+        counts = np.array([len(names) for _, _, names in chunks], dtype=np.int64)
+        chunk_entities = np.fromiter(
+            (entity_ids[name] for _, _, names in chunks for name in names), dtype=np.int64, count=int(counts.sum())
+        )
+        chunk_rows = np.repeat(np.arange(len(chunks), dtype=np.int64), counts)
+        arrays = {
+            "chunk_offsets": np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            "chunk_entities": chunk_entities.astype(np.uint32),
+        }
+
+        order = np.lexsort((chunk_rows, chunk_entities))
+        arrays["entity_offsets"] = np.concatenate(
+            [[0], np.cumsum(np.bincount(chunk_entities, minlength=len(entities)))]
+        ).astype(np.int64)
+        arrays["entity_chunks"] = chunk_rows[order].astype(np.uint32)
+
+        arrays["adj_offsets"], arrays["adj_entities"], arrays["adj_weights"] = self._adjacency(
+            [np.array([entity_ids[name] for name in names], dtype=np.int64) for _, _, names in chunks],
+            len(entities)
+        )
+
+        for name in ARRAYS:
+            np.save(os.path.join(directory, f"{name}.tmp.npy"), arrays[name])
+        with open(os.path.join(directory, "entities.tmp.txt"), "w", encoding="utf-8") as f:
+            f.writelines(f"{name}\n" for name in entities)
+        with open(os.path.join(directory, "chunks.tmp.tsv"), "w", encoding="utf-8") as f:
+            f.writelines(f"{node_id}\t{ref_doc_id}\n" for node_id, ref_doc_id, _ in chunks)
+
+        # Release the old mappings before replacing the files they point to
+        self.arrays = {}
+        for name in ARRAYS:
+            os.replace(os.path.join(directory, f"{name}.tmp.npy"), os.path.join(directory, f"{name}.npy"))
+        os.replace(os.path.join(directory, "entities.tmp.txt"), os.path.join(directory, "entities.txt"))
+        os.replace(os.path.join(directory, "chunks.tmp.tsv"), os.path.join(directory, "chunks.tsv"))
+        self._load(directory)
+
+    def _adjacency(self, chunk_entities: List[np.ndarray], n_entities: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Co-mention CSR: entities sharing a chunk are linked, weighted by shared chunks."""
+        pairs = []
+        triu: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        for ids in chunk_entities:
+            n = len(ids)
+            if n < 2:
+                continue
+            if n not in triu:
+                triu[n] = np.triu_indices(n, k=1)
+            a, b = ids[triu[n][0]], ids[triu[n][1]]
+            pairs.append(np.minimum(a, b) * n_entities + np.maximum(a, b))
+        if not pairs:
+            return np.zeros(n_entities + 1, dtype=np.int64), np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.float32)
+
+        keys, weights = np.unique(np.concatenate(pairs), return_counts=True)
+        a, b = keys // n_entities, keys % n_entities
+        src = np.concatenate([a, b])
+        dst = np.concatenate([b, a])
+        weight = np.concatenate([weights, weights]).astype(np.float32)
+
+        # Per source: strongest first, then keep the first max_degree
+        order = np.lexsort((dst, -weight, src))
+        src, dst, weight = src[order], dst[order], weight[order]
+        starts = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n_entities))])
+        rank = np.arange(len(src)) - starts[src]
+        keep = rank < self.max_degree
+        src, dst, weight = src[keep], dst[keep], weight[keep]
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n_entities))]).astype(np.int64)
+        return offsets, dst.astype(np.uint32), weight
@@ -0,0 +1,75 @@
+"""Hybrid retrieval: vector and BM25 rankings merged with reciprocal rank fusion."""
+from typing import Dict, List, Tuple
+
+from llama_index.core import QueryBundle
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.storage.docstore.types import BaseDocumentStore
+
+from .bm25 import BM25Index
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> Dict[str, float]:
+    """Fused score per id: the sum of 1 / (k + rank) over the rankings it appears in."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, node_id in enumerate(ranking, start=1):
+            scores[node_id] = scores.get(node_id, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+def fuse_rankings(dense: List[str], lexical: List[str], top_k: int, k: int = 60) -> List[Tuple[str, float]]:
+    """The `top_k` (node id, fused score) pairs of a dense and a lexical ranking, best first."""
+    fused = reciprocal_rank_fusion([dense, lexical], k)
+    return [(node_id, fused[node_id]) for node_id in sorted(fused, key=fused.get, reverse=True)[:top_k]]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Top-k nodes by reciprocal rank fusion of dense and lexical results.
+
+    Dense retrieval misses exact names and rare terms; BM25 catches them.
+    Both rankings are taken `candidate_k` deep and fused, so a node ranked
+    highly by either one can make the final `similarity_top_k` without
+    raising top_k (and the prompt size) for everything.
+    """
+
+    def __init__(
+        self,
+        vector_retriever: BaseRetriever,
+        bm25: BM25Index,
+        docstore: BaseDocumentStore,
+        similarity_top_k: int = 3,
+        rrf_k: int = 60
+    ):
+        """
+        Args:
+            vector_retriever: Dense retriever returning the candidate ranking (its top_k is the depth)
+            bm25: Lexical index over the same nodes
+            docstore: Docstore holding the nodes, for BM25-only hits
+            similarity_top_k: Nodes returned
+            rrf_k: Fusion constant; larger values flatten the rank weights
+        """
+        super().__init__()
+        self.vector_retriever = vector_retriever
+        self.bm25 = bm25
+        self.docstore = docstore
+        self.similarity_top_k = similarity_top_k
+        self.rrf_k = rrf_k
+
+    def _fuse(self, query_bundle: QueryBundle, dense: List[NodeWithScore]) -> List[NodeWithScore]:
+        depth = max(len(dense), self.similarity_top_k)
+        lexical = [node_id for node_id, _ in self.bm25.search(query_bundle.query_str, depth)]
+        top = fuse_rankings([n.node.node_id for n in dense], lexical, self.similarity_top_k, self.rrf_k)
+
+        nodes = {n.node.node_id: n.node for n in dense}
+        missing = [node_id for node_id, _ in top if node_id not in nodes]
+        if missing:
+            nodes.update((node.node_id, node) for node in self.docstore.get_nodes(missing, raise_error=False))
+        return [NodeWithScore(node=nodes[node_id], score=score) for node_id, score in top if node_id in nodes]
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._fuse(query_bundle, self.vector_retriever.retrieve(query_bundle))
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        return self._fuse(query_bundle, await self.vector_retriever.aretrieve(query_bundle))
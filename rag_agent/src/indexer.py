@@ -1,52 +1,424 @@
 """Knowledge Graph Indexer using LlamaIndex and Ollama."""
 from llama_index.core import VectorStoreIndex, StorageContext, load_index_from_storage
-from llama_index.llms.ollama import Ollama
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.core import Settings
-from typing import List
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.schema import BaseNode
+from typing import Dict, Iterable, List, Optional
 from llama_index.core import Document
+from contextlib import contextmanager, nullcontext
+import hashlib
 import os
-from .config import OLLAMA_BASE_URL, OLLAMA_MODEL, STORAGE_DIR
+import shutil
+import uuid
+from .config import (
+    STORAGE_DIR, VECTOR_STORE,
+    ANN_INDEX, ANN_NLIST, ANN_NPROBE, ANN_MIN_ROWS, VECTOR_QUANTIZATION, VECTOR_RESCORE, GRAPH_ENABLED, GRAPH_WORKERS, GRAPH_MAX_DEGREE,
+    EMBED_MODEL, EMBED_WORKERS, EMBED_BATCH_SIZE, INGEST_QUEUE_SIZE, INGEST_FLUSH_EVERY,
+    DEDUP_ENABLED, DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_SHINGLE_SIZE
+)
+from .bm25 import BM25Index
+from .dedup import NearDuplicateDetector
+from .embedding_cache import CachedEmbedding
+from .embedding_pipeline import EmbeddingPipeline
+from .graph_store import KnowledgeGraphStore
+from .ingestion import StreamingIngestion
+from .models import configure_settings, get_embed_model, get_llm
+from .shards import DEFAULT_SHARD, SHARDS_SUBDIR, sample_embeddings, save_router, shard_dir
+from .startup import startup_timer
+from .tracing import tracer
+from .vector_store import NumpyVectorStore
+
+
+# Rewritten with a new token by every persist
+VERSION_FILE = "index_version"
+
+
+def stored_index_version(storage_dir: str) -> str:
+    """
+    Version of the index persisted in `storage_dir`.
+    
+    The token in its version file, or for an index persisted before
+    version files were written, a fingerprint of the directory's files
+    (names, sizes and mtimes).
+    """
+    try:
+        with open(os.path.join(storage_dir, VERSION_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    digest = hashlib.blake2b(digest_size=8)
+    if os.path.isdir(storage_dir):
+        for name in sorted(os.listdir(storage_dir)):
+            path = os.path.join(storage_dir, name)
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                digest.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
 
 
 class KnowledgeGraphIndexer:
     """Builds and manages the Knowledge Graph index."""
     
-    def __init__(self):
-        # Initialize Ollama LLM
-        self.llm = Ollama(
-            model=OLLAMA_MODEL,
-            base_url=OLLAMA_BASE_URL,
-            request_timeout=120.0
-        )
+    def __init__(
+        self,
+        shard: Optional[str] = None,
+        vector_store: Optional[str] = None,
+        dedup_threshold: Optional[float] = None
+    ):
+        """
+        Args:
+            shard: Named shard to build or load, kept in `STORAGE_DIR/shards/<shard>`
+                and rebuilt without touching other shards (default: the index in STORAGE_DIR)
+            vector_store: Vector store of new indexes, "simple" or "numpy" (default: VECTOR_STORE)
+            dedup_threshold: Similarity above which text counts as a near-duplicate
+                (default: DEDUP_THRESHOLD)
+        """
+        # Shared per process: the Ollama client and the embedding model
+        # (which loads lazily, on first use, behind the embedding cache)
+        configure_settings()
+        self.llm = get_llm()
+        self.embed_model = get_embed_model()
         
-        # Initialize local embedding model
-        self.embed_model = HuggingFaceEmbedding(
-            model_name="BAAI/bge-small-en-v1.5"
+        self.embedding_pipeline = EmbeddingPipeline(
+            self.embed_model,
+            EMBED_MODEL,
+            workers=EMBED_WORKERS,
+            batch_size=EMBED_BATCH_SIZE
         )
         
-        # Set global settings
-        Settings.llm = self.llm
-        Settings.embed_model = self.embed_model
-        Settings.chunk_size = 1024
-        Settings.chunk_overlap = 50
-        
-        self.storage_dir = STORAGE_DIR
+        self.shard = shard or DEFAULT_SHARD
+        self.storage_dir = shard_dir(STORAGE_DIR, self.shard)
+        self.vector_store = vector_store or VECTOR_STORE
+        self.dedup_threshold = dedup_threshold or DEDUP_THRESHOLD
         self.index = None
+        self.bm25 = None
+        self.graph = None
+        self.dedup = None
+        self._version: Optional[str] = None
     
-    def build_index(self, documents: List[Document]):
-        """Build the vector index from documents."""
+    def build_index(self, documents: List[Document], incremental: bool = False, prune: bool = False):
+        """Build the vector index from documents.
+        
+        With `incremental=True` an existing index is updated in place
+        instead of being rebuilt (see `update_index`).
+        """
+        if incremental and os.path.exists(self.storage_dir):
+            return self.update_index(documents, prune=prune)
+        
         print(f"Building index from {len(documents)} documents...")
         
-        # Create vector store index
-        self.index = VectorStoreIndex.from_documents(
-            documents,
-            show_progress=True
+        with self._fresh_storage():
+            # Create vector store index from pre-embedded nodes
+            self.dedup = self._new_dedup()
+            documents = self._drop_duplicate_documents(documents)
+            nodes = self._chunk_and_embed(documents)
+            with tracer.span("index.insert"):
+                self.index = VectorStoreIndex(
+                    nodes,
+                    storage_context=self._new_storage_context(),
+                    show_progress=True
+                )
+            with tracer.span("index.bm25"):
+                self.bm25 = BM25Index.from_nodes(nodes)
+            self.graph = self._new_graph()
+            if self.graph is not None:
+                with tracer.span("index.graph"):
+                    self.graph.add(nodes)
+            for doc in documents:
+                self.index.docstore.set_document_hash(doc.doc_id, doc.hash)
+            
+            # Persist to disk
+            self.persist()
+        self._print_embedding_cache_summary()
+        self._print_dedup_summary(self.embedding_pipeline.last_stats)
+        if self.graph is not None:
+            print(f"Entity graph: {self.graph.num_entities} entities, {self.graph.num_links} links")
+        print(f"Index built and saved to {self.storage_dir}")
+    
+    def update_index(self, documents: List[Document], prune: bool = False) -> Dict[str, int]:
+        """
+        Upsert documents into the persisted index by stable document id.
+        
+        Documents whose content hash matches the stored one are skipped,
+        changed ones have their old nodes deleted and are re-chunked and
+        re-embedded, and new ones are added. Changed or new documents that
+        are near-duplicates of other indexed documents are not indexed (a
+        changed one still loses its old version) and are counted as
+        duplicates. With `prune=True`, indexed documents that are not in
+        `documents` are deleted from the vector store and docstore.
+        
+        Returns:
+            Counts of added, updated, skipped, duplicate and deleted documents
+        """
+        self.load_index()
+        self._load_dedup()
+        docstore = self.index.docstore
+        summary = {"added": 0, "updated": 0, "skipped": 0, "duplicates": 0, "deleted": 0}
+        if self.dedup is not None:
+            self.dedup.reset_stats()
+        
+        changed = []
+        replaced = set()
+        seen = set()
+        for doc in documents:
+            if doc.doc_id in seen:
+                continue
+            seen.add(doc.doc_id)
+            stored_hash = docstore.get_document_hash(doc.doc_id)
+            if stored_hash == doc.hash:
+                summary["skipped"] += 1
+                continue
+            if stored_hash is not None:
+                self.delete_document(doc.doc_id)
+                replaced.add(doc.doc_id)
+            changed.append(doc)
+        
+        if prune:
+            for doc_id in set(self.index.ref_doc_info) - seen:
+                self.delete_document(doc_id)
+                summary["deleted"] += 1
+        
+        kept = self._drop_duplicate_documents(changed)
+        summary["duplicates"] = len(changed) - len(kept)
+        changed = kept
+        for doc in changed:
+            summary["updated" if doc.doc_id in replaced else "added"] += 1
+        if changed:
+            nodes = self._chunk_and_embed(changed)
+            self.insert_nodes(nodes)
+            for doc in changed:
+                docstore.set_document_hash(doc.doc_id, doc.hash)
+        
+        self.persist()
+        self._print_embedding_cache_summary()
+        self._print_dedup_summary(self.embedding_pipeline.last_stats if changed else {})
+        self._print_update_summary(summary)
+        return summary
+    
+    def build_index_streaming(
+        self,
+        documents: Iterable[Document],
+        incremental: bool = False,
+        prune: bool = False
+    ) -> Dict[str, int]:
+        """
+        Build or update the index from a stream of documents.
+        
+        Unlike `build_index`, documents are consumed lazily: fetching,
+        chunking and embedding run concurrently behind bounded queues, so
+        the documents are never all held in memory at once (their chunks
+        still are; see `StreamingIngestion`).
+        
+        Args:
+            documents: Any iterable of Documents, e.g. `WikipediaReader.iter_articles`
+            incremental: Upsert into the existing index instead of starting empty
+            prune: With incremental, delete indexed documents not seen in the stream
+            
+        Returns:
+            Counts of added, updated, skipped, duplicate and deleted documents
+        """
+        if incremental and os.path.exists(self.storage_dir):
+            self.load_index()
+            self._load_dedup()
+            storage = nullcontext()
+        else:
+            self.index = VectorStoreIndex(nodes=[], storage_context=self._new_storage_context())
+            self.bm25 = BM25Index()
+            self.graph = self._new_graph()
+            self.dedup = self._new_dedup()
+            storage = self._fresh_storage()
+        if self.dedup is not None:
+            self.dedup.reset_stats()
+        
+        pipeline = StreamingIngestion(self, queue_size=INGEST_QUEUE_SIZE, flush_every=INGEST_FLUSH_EVERY)
+        with storage:
+            summary = pipeline.run(documents, prune=prune and incremental)
+        self._print_embedding_cache_summary()
+        self._print_update_summary(summary)
+        return summary
+    
+    def insert_nodes(self, nodes: List[BaseNode]):
+        """Add embedded nodes to the vector index, the BM25 index and the entity graph."""
+        with tracer.span("index.insert"):
+            self.index.insert_nodes(nodes)
+        with tracer.span("index.bm25"):
+            self.bm25.add(nodes)
+        if self.graph is not None:
+            with tracer.span("index.graph"):
+                self.graph.add(nodes)
+    
+    def delete_document(self, doc_id: str, keep_signatures: bool = False):
+        """Remove a document's nodes from the vector index, docstore, BM25 index and graph.
+        
+        Its near-duplicate signatures are forgotten too, unless
+        `keep_signatures` (they already belong to the version replacing it).
+        """
+        if not keep_signatures:
+            self._load_dedup()
+        self.index.delete_ref_doc(doc_id, delete_from_docstore=True)
+        self.bm25.delete(doc_id)
+        if self.graph is not None:
+            self.graph.delete(doc_id)
+        if self.dedup is not None and not keep_signatures:
+            self.dedup.remove_document(doc_id)
+    
+    @staticmethod
+    def _new_graph():
+        if not GRAPH_ENABLED:
+            return None
+        return KnowledgeGraphStore(max_degree=GRAPH_MAX_DEGREE, workers=GRAPH_WORKERS)
+    
+    def _new_dedup(self):
+        if not DEDUP_ENABLED:
+            return None
+        return NearDuplicateDetector(
+            threshold=self.dedup_threshold, num_perm=DEDUP_NUM_PERM, shingle_size=DEDUP_SHINGLE_SIZE
         )
+    
+    def _new_storage_context(self) -> StorageContext:
+        """Storage context for a new index using the configured vector store."""
+        if self.vector_store == "numpy":
+            return StorageContext.from_defaults(vector_store=NumpyVectorStore(**self._vector_store_settings()))
+        return StorageContext.from_defaults()
+    
+    @staticmethod
+    def _vector_store_settings() -> Dict:
+        return {
+            "ann_index": ANN_INDEX,
+            "ann_nlist": ANN_NLIST,
+            "ann_nprobe": ANN_NPROBE,
+            "ann_min_rows": ANN_MIN_ROWS,
+            "quantization": VECTOR_QUANTIZATION,
+            "rescore_factor": VECTOR_RESCORE
+        }
+    
+    @contextmanager
+    def _fresh_storage(self):
+        """
+        Persist a full rebuild to a scratch directory, moved in place of
+        the previous build's files once it is complete.
         
-        # Persist to disk
-        self.index.storage_context.persist(persist_dir=self.storage_dir)
-        print(f"Index built and saved to {self.storage_dir}")
+        Files the new build does not write (e.g. the NumPy matrix after
+        switching to the simple vector store) do not outlive the old
+        build, and the old index stays loadable until the new one is done.
+        The named shards under the default shard's directory are left alone.
+        """
+        target = self.storage_dir
+        parent, name = os.path.split(os.path.normpath(target))
+        build_dir = os.path.join(parent, f".{name}.rebuild")
+        shutil.rmtree(build_dir, ignore_errors=True)
+        self.storage_dir = build_dir
+        try:
+            yield
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+        finally:
+            self.storage_dir = target
+        
+        os.makedirs(target, exist_ok=True)
+        built = sorted(os.listdir(build_dir), key=lambda name: name == VERSION_FILE)
+        for name in os.listdir(target):
+            if name != VERSION_FILE and name != SHARDS_SUBDIR and not name.startswith("."):
+                self._remove(os.path.join(target, name))
+        for name in built[:-1] if VERSION_FILE in built else built:
+            os.replace(os.path.join(build_dir, name), os.path.join(target, name))
+        # Last, like `persist`: the new version appears once the files it names are in place
+        if VERSION_FILE in built:
+            os.replace(os.path.join(build_dir, VERSION_FILE), os.path.join(target, VERSION_FILE))
+        os.rmdir(build_dir)
+    
+    @staticmethod
+    def _remove(path: str):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    
+    def persist(self):
+        """Write the index, its BM25 index and graph (and the embedding cache) to disk."""
+        with tracer.span("index.persist"):
+            self.index.storage_context.persist(persist_dir=self.storage_dir)
+            self.bm25.persist(self.storage_dir)
+            if self.graph is not None:
+                self.graph.persist(self.storage_dir)
+            if self.dedup is not None:
+                self.dedup.persist(self.storage_dir)
+            # Centroids for routing queries between shards
+            save_router(self.storage_dir, sample_embeddings(self.index.storage_context.vector_store))
+            if isinstance(self.embed_model, CachedEmbedding):
+                self.embed_model.cache.flush()
+            # Last, so the new version is only visible once everything else is written
+            self._version = uuid.uuid4().hex
+            version_path = os.path.join(self.storage_dir, VERSION_FILE)
+            with open(f"{version_path}.tmp", "w", encoding="utf-8") as f:
+                f.write(self._version)
+            os.replace(f"{version_path}.tmp", version_path)
+    
+    def _load_dedup(self):
+        """
+        Load the loaded index's near-duplicate signatures, if not loaded yet.
+        
+        Only paths that write to the index need them, so loading an index
+        for queries skips this. An index without usable signatures (built
+        before detection was enabled, or with other MinHash settings) has
+        its chunks recorded once and the signatures persisted.
+        """
+        if not DEDUP_ENABLED or self.dedup is not None:
+            return
+        with tracer.span("index.dedup"):
+            if NearDuplicateDetector.exists(self.storage_dir):
+                self.dedup = NearDuplicateDetector.load(
+                    self.storage_dir, threshold=self.dedup_threshold, num_perm=DEDUP_NUM_PERM,
+                    shingle_size=DEDUP_SHINGLE_SIZE
+                )
+            if self.dedup is None:
+                self.dedup = self._new_dedup()
+                self.dedup.add_nodes(self.index.docstore.docs.values())
+                self.dedup.persist(self.storage_dir)
+    
+    def _drop_duplicate_documents(self, documents: List[Document]) -> List[Document]:
+        """`documents` without near-duplicates of indexed documents (or of earlier ones in the list)."""
+        if self.dedup is None:
+            return documents
+        with tracer.span("index.dedup"):
+            return [doc for doc in documents if self.dedup.check_document(doc.doc_id, doc.text) is None]
+    
+    def _chunk_and_embed(self, documents: List[Document]) -> List[BaseNode]:
+        """Split documents into nodes, drop near-duplicate chunks and embed the rest."""
+        with tracer.span("index.chunk") as span:
+            nodes = run_transformations(documents, Settings.transformations, show_progress=True)
+            span.add(documents=len(documents), chunks=len(nodes))
+        if self.dedup is not None:
+            with tracer.span("index.dedup"):
+                by_doc: Dict[str, List[BaseNode]] = {}
+                for node in nodes:
+                    by_doc.setdefault(node.ref_doc_id, []).append(node)
+                nodes = [node for doc_id, doc_nodes in by_doc.items()
+                         for node in self.dedup.filter_chunks(doc_id, doc_nodes)]
+        self.embedding_pipeline.embed_nodes(nodes)
+        return nodes
+    
+    def _print_embedding_cache_summary(self):
+        if isinstance(self.embed_model, CachedEmbedding):
+            print(self.embed_model.cache.summary())
+    
+    def _print_dedup_summary(self, embed_stats: Dict[str, float]):
+        """Near-duplicates skipped this run, with the embedding time they would have cost."""
+        if self.dedup is None:
+            return
+        embedded = embed_stats.get("embedded", 0)
+        seconds_per_chunk = embed_stats["seconds"] / embedded if embedded else 0.0
+        tracer.count("index.dedup", documents=self.dedup.skipped_documents, chunks=self.dedup.skipped_chunks)
+        line = self.dedup.summary(seconds_per_chunk)
+        if line:
+            print(line)
+    
+    def _print_update_summary(self, summary: Dict[str, int]):
+        print(f"Index updated in {self.storage_dir}: "
+              f"{summary['added']} added, {summary['updated']} updated, "
+              f"{summary['skipped']} skipped, {summary['duplicates']} near-duplicates, "
+              f"{summary['deleted']} deleted")
     
     def load_index(self):
         """Load existing index from disk."""
@@ -54,10 +426,55 @@ class KnowledgeGraphIndexer:
             raise FileNotFoundError(f"No index found at {self.storage_dir}")
         
         print(f"Loading index from {self.storage_dir}...")
-        storage_context = StorageContext.from_defaults(persist_dir=self.storage_dir)
-        self.index = load_index_from_storage(storage_context)
+        with startup_timer.measure("index load"), tracer.span("index.load"):
+            if NumpyVectorStore.exists(self.storage_dir):
+                storage_context = StorageContext.from_defaults(
+                    persist_dir=self.storage_dir,
+                    vector_store=NumpyVectorStore.from_persist_dir(self.storage_dir, **self._vector_store_settings())
+                )
+            else:
+                storage_context = StorageContext.from_defaults(persist_dir=self.storage_dir)
+            self.index = load_index_from_storage(storage_context)
+            if isinstance(storage_context.vector_store, NumpyVectorStore):
+                usage = storage_context.vector_store.memory_usage()
+                if usage["code_bytes"]:
+                    print(f"Vector store: {usage['rows']} rows, {VECTOR_QUANTIZATION} codes "
+                          f"{usage['code_bytes'] / 2**20:.1f} MB in memory "
+                          f"(float32 matrix {usage['float_bytes'] / 2**20:.1f} MB, memory-mapped)")
+            if BM25Index.exists(self.storage_dir):
+                self.bm25 = BM25Index.load(self.storage_dir)
+            else:
+                # Index built before BM25 was added: index the stored nodes once
+                self.bm25 = BM25Index.from_nodes(self.index.docstore.docs.values())
+                self.bm25.persist(self.storage_dir)
+            if not GRAPH_ENABLED:
+                self.graph = None
+            elif KnowledgeGraphStore.exists(self.storage_dir):
+                self.graph = KnowledgeGraphStore.load(
+                    self.storage_dir, max_degree=GRAPH_MAX_DEGREE, workers=GRAPH_WORKERS
+                )
+            else:
+                self.graph = self._new_graph()
+                self.graph.add(self.index.docstore.docs.values())
+                self.graph.persist(self.storage_dir)
+            # Loaded by the write paths that need it (see `_load_dedup`)
+            self.dedup = None
+            self._version = stored_index_version(self.storage_dir)
         print("Index loaded successfully")
     
+    def index_version(self) -> str:
+        """
+        Version of the loaded index (of the one on disk if none is loaded).
+        
+        Changes whenever the index is rebuilt, updated or persisted, so
+        caches derived from query results can tell they are stale. It is
+        read when the index is loaded and set when it is persisted, so
+        asking for it costs no file system access.
+        """
+        if self.index is None or self._version is None:
+            return stored_index_version(self.storage_dir)
+        return self._version
+    
     def get_index(self):
         """Get the current index."""
         if self.index is None:
@@ -0,0 +1,214 @@
+"""Streaming ingestion pipeline: reader -> chunker -> embedder -> store."""
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from llama_index.core import Document, Settings
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.schema import BaseNode
+
+from .tracing import tracer
+from .vector_store import NumpyVectorStore
+
+
+_DONE = object()
+
+
+class StreamingIngestion:
+    """
+    Runs the indexing stages concurrently with bounded queues between them.
+
+    Each stage runs on its own thread, so fetching, chunking and embedding
+    overlap, and at most `queue_size` items wait between any two stages.
+    The store stage inserts embedded nodes into the index and, with the
+    NumPy vector store, persists it every `flush_every` documents, which
+    moves the new embeddings into the memory-mapped matrix and leaves a
+    complete index on disk. Only the documents in flight are held at once,
+    but the docstore, BM25 index and graph stay in memory and every flush
+    rewrites the whole index, so memory and flush time still grow with the
+    corpus.
+    """
+
+    def __init__(self, indexer, queue_size: int = 16, flush_every: int = 500):
+        """
+        Initialize the pipeline.
+
+        Args:
+            indexer: KnowledgeGraphIndexer whose index receives the nodes
+            queue_size: Maximum items buffered between two stages
+            flush_every: Persist the index after this many stored documents (NumPy vector store only)
+        """
+        self.indexer = indexer
+        self.queue_size = queue_size
+        self.flush_every = max(1, flush_every)
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def _put(self, q: queue.Queue, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _stage(self, target: Callable, *args) -> threading.Thread:
+        def run():
+            try:
+                target(*args)
+            except BaseException as e:
+                self._errors.append(e)
+                self._stop.set()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def _read(self, documents: Iterable[Document], out: queue.Queue, summary: Dict[str, int], seen: set):
+        docstore = self.indexer.index.docstore
+        for doc in documents:
+            if self._stop.is_set():
+                break
+            if doc.doc_id in seen:
+                continue
+            seen.add(doc.doc_id)
+            stored_hash = docstore.get_document_hash(doc.doc_id)
+            if stored_hash == doc.hash:
+                summary["skipped"] += 1
+                continue
+            self._put(out, (doc, stored_hash is not None))
+        self._put(out, _DONE)
+
+    def _chunk(self, inbox: queue.Queue, out: queue.Queue):
+        dedup = self.indexer.dedup
+        while True:
+            item = self._get(inbox)
+            if item is _DONE:
+                break
+            doc, replaces = item
+            if dedup is not None:
+                with tracer.span("index.dedup"):
+                    duplicate = dedup.check_document(doc.doc_id, doc.text) is not None
+                if duplicate:
+                    # Passed on with no nodes so the store stage can drop an older version
+                    self._put(out, (doc, replaces, None))
+                    continue
+            with tracer.span("index.chunk") as span:
+                nodes = run_transformations([doc], Settings.transformations)
+                span.add(documents=1, chunks=len(nodes))
+            if dedup is not None:
+                with tracer.span("index.dedup"):
+                    nodes = dedup.filter_chunks(doc.doc_id, nodes)
+            self._put(out, (doc, replaces, nodes))
+        self._put(out, _DONE)
+
+    def _embed(self, inbox: queue.Queue, out: queue.Queue, stats: Dict[str, float]):
+        pipeline = self.indexer.embedding_pipeline
+        target = pipeline.batch_size * pipeline.workers
+        pending: List[Tuple[Document, bool, List[BaseNode]]] = []
+        pending_nodes = 0
+
+        def flush():
+            nodes = [node for _, _, doc_nodes in pending for node in doc_nodes or ()]
+            pipeline.embed_nodes(nodes, report=False)
+            for key in ("chunks", "cached", "embedded", "seconds"):
+                stats[key] += pipeline.last_stats.get(key, 0)
+            for entry in pending:
+                self._put(out, entry)
+
+        while True:
+            item = self._get(inbox)
+            if item is _DONE:
+                break
+            pending.append(item)
+            pending_nodes += len(item[2] or ())
+            if pending_nodes >= target:
+                flush()
+                pending, pending_nodes = [], 0
+        if pending:
+            flush()
+        self._put(out, _DONE)
+
+    def run(self, documents: Iterable[Document], prune: bool = False) -> Dict[str, int]:
+        """
+        Stream `documents` into the indexer's index.
+
+        Documents are upserted by stable id exactly as in
+        `KnowledgeGraphIndexer.update_index`.
+
+        Returns:
+            Counts of added, updated, skipped, duplicate and deleted documents
+        """
+        index = self.indexer.index
+        summary = {"added": 0, "updated": 0, "skipped": 0, "duplicates": 0, "deleted": 0}
+        embed_stats = {"chunks": 0, "cached": 0, "embedded": 0, "seconds": 0.0}
+        seen: set = set()
+        start = time.perf_counter()
+
+        docs_q: queue.Queue = queue.Queue(self.queue_size)
+        nodes_q: queue.Queue = queue.Queue(self.queue_size)
+        embedded_q: queue.Queue = queue.Queue(self.queue_size)
+        threads = [
+            self._stage(self._read, documents, docs_q, summary, seen),
+            self._stage(self._chunk, docs_q, nodes_q),
+            self._stage(self._embed, nodes_q, embedded_q, embed_stats),
+        ]
+
+        # Persisting moves the NumPy store's new rows into its memory-mapped
+        # file; other stores keep everything in memory and would only be
+        # rewritten in full every batch, so they are persisted once at the end
+        flush_every = self.flush_every if isinstance(index.storage_context.vector_store, NumpyVectorStore) else 0
+        stored = 0
+        try:
+            while True:
+                item = self._get(embedded_q)
+                if item is _DONE:
+                    break
+                doc, replaces, nodes = item
+                if nodes is None:
+                    # Near-duplicate of an indexed document: not stored, and
+                    # without a hash it is checked again on the next run
+                    if replaces:
+                        self.indexer.delete_document(doc.doc_id)
+                    summary["duplicates"] += 1
+                    print(f"  Skipped near-duplicate: {doc.metadata.get('title', doc.doc_id)}")
+                    continue
+                if replaces:
+                    self.indexer.delete_document(doc.doc_id, keep_signatures=True)
+                summary["updated" if replaces else "added"] += 1
+                self.indexer.insert_nodes(nodes)
+                index.docstore.set_document_hash(doc.doc_id, doc.hash)
+                stored += 1
+                print(f"  Indexed: {doc.metadata.get('title', doc.doc_id)} ({len(nodes)} chunks)")
+                if flush_every and stored % flush_every == 0:
+                    self.indexer.persist()
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+        if self._errors:
+            raise self._errors[0]
+
+        if prune:
+            for doc_id in set(index.ref_doc_info) - seen:
+                self.indexer.delete_document(doc_id)
+                summary["deleted"] += 1
+
+        self.indexer.persist()
+        elapsed = time.perf_counter() - start
+        rate = embed_stats["chunks"] / embed_stats["seconds"] if embed_stats["seconds"] > 0 else 0.0
+        print(f"Streamed {stored} documents in {elapsed:.2f}s; embedded {int(embed_stats['chunks'])} chunks "
+              f"({int(embed_stats['cached'])} from cache, {rate:.1f} chunks/s)")
+        self.indexer._print_dedup_summary(embed_stats)
+        return summary
@@ -0,0 +1,451 @@
+"""Pooled, parallel HTTP transport to Ollama, and the LlamaIndex LLM built on it."""
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+from llama_index.core.base.llms.generic_utils import (
+    achat_to_completion_decorator,
+    astream_chat_to_completion_decorator,
+    chat_to_completion_decorator,
+    stream_chat_to_completion_decorator,
+)
+from llama_index.core.base.llms.types import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    ChatResponseGen,
+    CompletionResponse,
+    CompletionResponseAsyncGen,
+    CompletionResponseGen,
+    LLMMetadata,
+    MessageRole,
+)
+from llama_index.core.constants import DEFAULT_CONTEXT_WINDOW, DEFAULT_NUM_OUTPUTS
+from llama_index.core.llms.callbacks import llm_chat_callback, llm_completion_callback
+from llama_index.core.llms.custom import CustomLLM
+from pydantic import Field, PrivateAttr
+
+from .config import LLM_COALESCE, LLM_PARALLEL, LLM_REQUEST_TIMEOUT
+
+
+class _Call:
+    """
+    One HTTP request to Ollama and everyone waiting on it.
+
+    The response (one JSON object, or the lines of a stream) is appended to
+    `chunks` as it arrives; each subscriber replays it from the start, so a
+    caller that joins an in-flight call late still sees the whole answer.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.chunks: List[Dict] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.cancelled = False
+        self._cond = threading.Condition()
+        self._listeners: List[Callable[[], None]] = []
+
+    def _notify(self):
+        listeners, self._listeners = self._listeners, []
+        self._cond.notify_all()
+        return listeners
+
+    def push(self, chunk: Dict):
+        with self._cond:
+            self.chunks.append(chunk)
+            listeners = self._notify()
+        for wake in listeners:
+            wake()
+
+    def finish(self, error: Optional[BaseException] = None):
+        with self._cond:
+            self.done = True
+            self.error = error
+            listeners = self._notify()
+        for wake in listeners:
+            wake()
+
+    def iter(self) -> Iterator[Dict]:
+        position = 0
+        while True:
+            with self._cond:
+                while position == len(self.chunks) and not self.done:
+                    self._cond.wait()
+                chunks = self.chunks[position:]
+                done, error = self.done, self.error
+            yield from chunks
+            position += len(chunks)
+            if done and position == len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+    async def aiter(self) -> AsyncIterator[Dict]:
+        loop = asyncio.get_running_loop()
+        position = 0
+        while True:
+            wake = asyncio.Event()
+            with self._cond:
+                chunks = self.chunks[position:]
+                done, error = self.done, self.error
+                if not chunks and not done:
+                    self._listeners.append(lambda: _call_soon(loop, wake.set))
+            for chunk in chunks:
+                yield chunk
+            position += len(chunks)
+            if not chunks:
+                if done:
+                    if error is not None:
+                        raise error
+                    return
+                await wake.wait()
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, callback: Callable[[], None]):
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        # The subscriber's loop is gone; nobody is left to wake
+        pass
+
+
+class OllamaTransport:
+    """
+    HTTP client for the Ollama API shared by every query path in the process.
+
+    Connections are kept alive in a `requests` pool, and at most
+    `max_parallel` requests are sent at once (match Ollama's
+    OLLAMA_NUM_PARALLEL); the rest wait for a slot. While a request is in
+    flight, an identical one (same endpoint and body, e.g. the same prompt
+    from two sessions) subscribes to it instead of being sent again.
+    Requests whose subscribers have all gone away are abandoned.
+
+    `metrics()` reports per-call latency, time spent waiting for a slot,
+    time to the first streamed chunk, and call / coalescing counters.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_parallel: Optional[int] = None,
+        timeout: Optional[float] = None,
+        coalesce: Optional[bool] = None,
+        window: int = 1000
+    ):
+        """
+        Args:
+            base_url: Ollama server URL
+            max_parallel: Requests sent at once (default: LLM_PARALLEL)
+            timeout: Seconds to wait for a response or the next streamed chunk (default: LLM_REQUEST_TIMEOUT)
+            coalesce: Share identical in-flight requests (default: LLM_COALESCE)
+            window: Recent calls kept for the latency percentiles
+        """
+        self.base_url = base_url.rstrip("/")
+        self.max_parallel = max_parallel or LLM_PARALLEL
+        self.timeout = timeout or LLM_REQUEST_TIMEOUT
+        self.coalesce = LLM_COALESCE if coalesce is None else coalesce
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_parallel)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="ollama")
+
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, _Call] = {}
+        self.counters = {"calls": 0, "coalesced": 0, "errors": 0, "abandoned": 0, "queued": 0, "active": 0}
+        self._latency: Deque[float] = deque(maxlen=window)
+        self._queue_wait: Deque[float] = deque(maxlen=window)
+        self._first_chunk: Deque[float] = deque(maxlen=window)
+
+    def _subscribe(self, path: str, payload: Dict, stream: bool) -> _Call:
+        body = json.dumps(payload, sort_keys=True)
+        key = hashlib.blake2b(f"{path}\n{stream}\n{body}".encode(), digest_size=16).hexdigest()
+        with self._lock:
+            call = self._inflight.get(key) if self.coalesce else None
+            if call is not None:
+                self.counters["coalesced"] += 1
+            else:
+                call = _Call(key)
+                if self.coalesce:
+                    self._inflight[key] = call
+                self.counters["calls"] += 1
+                self.counters["queued"] += 1
+                self._pool.submit(self._send, call, path, body, stream, time.perf_counter())
+            call.subscribers += 1
+        return call
+
+    def _unsubscribe(self, call: _Call):
+        with self._lock:
+            call.subscribers -= 1
+            if call.subscribers == 0 and not call.done:
+                call.cancelled = True
+                self.counters["abandoned"] += 1
+                if self._inflight.get(call.key) is call:
+                    del self._inflight[call.key]
+
+    def _send(self, call: _Call, path: str, body: str, stream: bool, submitted: float):
+        start = time.perf_counter()
+        with self._lock:
+            self.counters["queued"] -= 1
+            self.counters["active"] += 1
+            self._queue_wait.append(start - submitted)
+        error = None
+        try:
+            if call.cancelled:
+                return
+            with self.session.post(
+                f"{self.base_url}{path}",
+                data=body,
+                headers={"Content-Type": "application/json"},
+                stream=stream,
+                timeout=self.timeout
+            ) as response:
+                if not stream:
+                    call.push(self._parse(response, response.content))
+                    self._record(self._first_chunk, time.perf_counter() - start)
+                    return
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    if not call.chunks:
+                        self._record(self._first_chunk, time.perf_counter() - start)
+                    call.push(self._parse(response, line))
+                    if call.cancelled:
+                        return
+                if response.status_code >= 400 and not call.chunks:
+                    raise RuntimeError(f"Ollama returned HTTP {response.status_code} for {path}")
+        except BaseException as e:
+            error = e
+            with self._lock:
+                self.counters["errors"] += 1
+        finally:
+            with self._lock:
+                self.counters["active"] -= 1
+                if self._inflight.get(call.key) is call:
+                    del self._inflight[call.key]
+                self._latency.append(time.perf_counter() - start)
+            call.finish(error)
+
+    def _record(self, samples: Deque[float], seconds: float):
+        # metrics() copies the samples under the same lock
+        with self._lock:
+            samples.append(seconds)
+
+    @staticmethod
+    def _parse(response: requests.Response, data: bytes) -> Dict:
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            chunk = {}
+        if response.status_code >= 400 or "error" in chunk:
+            message = chunk.get("error") or response.reason
+            raise RuntimeError(f"Ollama request failed (HTTP {response.status_code}): {message}")
+        return chunk
+
+    def request(self, path: str, payload: Dict) -> Dict:
+        """POST `payload` and return the JSON response."""
+        call = self._subscribe(path, payload, stream=False)
+        try:
+            return list(call.iter())[0]
+        finally:
+            self._unsubscribe(call)
+
+    def stream(self, path: str, payload: Dict) -> Iterator[Dict]:
+        """POST `payload` and yield the streamed JSON lines."""
+        call = self._subscribe(path, payload, stream=True)
+        try:
+            yield from call.iter()
+        finally:
+            self._unsubscribe(call)
+
+    async def arequest(self, path: str, payload: Dict) -> Dict:
+        call = self._subscribe(path, payload, stream=False)
+        try:
+            return [chunk async for chunk in call.aiter()][0]
+        finally:
+            self._unsubscribe(call)
+
+    async def astream(self, path: str, payload: Dict) -> AsyncIterator[Dict]:
+        call = self._subscribe(path, payload, stream=True)
+        try:
+            async for chunk in call.aiter():
+                yield chunk
+        finally:
+            self._unsubscribe(call)
+
+    def metrics(self) -> Dict:
+        """Counters, plus p50/p95/max in milliseconds over the recent calls."""
+        def summary(samples: List[float]) -> Dict:
+            values = np.array(samples, dtype=np.float64) * 1000
+            if not len(values):
+                return {"count": 0}
+            p50, p95 = np.percentile(values, [50, 95])
+            return {
+                "count": len(values),
+                "p50": round(float(p50), 2),
+                "p95": round(float(p95), 2),
+                "max": round(float(values.max()), 2)
+            }
+
+        with self._lock:
+            counters = dict(self.counters, inflight=len(self._inflight), max_parallel=self.max_parallel)
+            # Copies, as the worker threads keep appending
+            latency, queue_wait, first_chunk = list(self._latency), list(self._queue_wait), list(self._first_chunk)
+        return dict(
+            counters,
+            latency_ms=summary(latency),
+            queue_wait_ms=summary(queue_wait),
+            first_chunk_ms=summary(first_chunk)
+        )
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+class PooledOllama(CustomLLM):
+    """
+    Ollama chat model that talks to the server through an `OllamaTransport`.
+
+    A drop-in for `llama_index.llms.ollama.Ollama` (same /api/chat requests,
+    chat model metadata, context window asked from /api/show when created)
+    without its single client per instance: sync and async calls share one
+    connection pool and one parallelism limit, and are coalesced across
+    sessions.
+    """
+
+    model: str = Field(description="The Ollama model to use.")
+    base_url: str = Field(default="http://localhost:11434", description="Ollama server URL.")
+    temperature: Optional[float] = Field(default=None, description="Sampling temperature.")
+    context_window: int = Field(default=-1, description="Context tokens (-1 asks the server when created).")
+    request_timeout: Optional[float] = Field(default=None, description="Seconds per response or streamed chunk.")
+    max_parallel: Optional[int] = Field(default=None, description="Requests sent to Ollama at once.")
+    keep_alive: Optional[str] = Field(default="5m", description="How long Ollama keeps the model loaded.")
+    additional_kwargs: Dict[str, Any] = Field(default_factory=dict, description="Extra model options.")
+
+    _transport: OllamaTransport = PrivateAttr()
+
+    def __init__(self, transport: Optional[OllamaTransport] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._transport = transport or OllamaTransport(
+            self.base_url, max_parallel=self.max_parallel, timeout=self.request_timeout
+        )
+        # Asked for now rather than on the first call, which may come from an
+        # event loop: LlamaIndex reads `metadata` synchronously even around
+        # `achat`. If the server is not up yet, the first call asks instead.
+        if self.context_window == -1:
+            try:
+                self.get_context_window()
+            except Exception:
+                pass
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "PooledOllama"
+
+    @property
+    def transport(self) -> OllamaTransport:
+        return self._transport
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(
+            context_window=self.get_context_window(),
+            num_output=DEFAULT_NUM_OUTPUTS,
+            model_name=self.model,
+            is_chat_model=True
+        )
+
+    def get_context_window(self) -> int:
+        if self.context_window == -1:
+            info = self._transport.request("/api/show", {"model": self.model}).get("model_info") or {}
+            for key, value in info.items():
+                if "context_length" in key:
+                    self.context_window = int(value)
+                    break
+        return self.context_window if self.context_window != -1 else DEFAULT_CONTEXT_WINDOW
+
+    def _payload(self, messages: Sequence[ChatMessage], stream: bool) -> Dict:
+        options = {"num_ctx": self.get_context_window(), **self.additional_kwargs}
+        if self.temperature is not None:
+            options["temperature"] = self.temperature
+        payload = {
+            "model": self.model,
+            "messages": [{"role": m.role.value, "content": m.content or ""} for m in messages],
+            "stream": stream,
+            "options": options,
+        }
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        return payload
+
+    @staticmethod
+    def _response(raw: Dict, content: str, delta: Optional[str] = None) -> ChatResponse:
+        role = (raw.get("message") or {}).get("role") or MessageRole.ASSISTANT.value
+        return ChatResponse(message=ChatMessage(role=role, content=content), delta=delta, raw=raw)
+
+    @llm_chat_callback()
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        raw = self._transport.request("/api/chat", self._payload(messages, stream=False))
+        return self._response(raw, (raw.get("message") or {}).get("content", ""))
+
+    @llm_chat_callback()
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseGen:
+        chunks = self._transport.stream("/api/chat", self._payload(messages, stream=True))
+
+        def gen() -> ChatResponseGen:
+            text = ""
+            for raw in chunks:
+                delta = (raw.get("message") or {}).get("content", "")
+                text += delta
+                yield self._response(raw, text, delta)
+
+        return gen()
+
+    @llm_chat_callback()
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        raw = await self._transport.arequest("/api/chat", self._payload(messages, stream=False))
+        return self._response(raw, (raw.get("message") or {}).get("content", ""))
+
+    @llm_chat_callback()
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponseAsyncGen:
+        chunks = self._transport.astream("/api/chat", self._payload(messages, stream=True))
+
+        async def gen() -> ChatResponseAsyncGen:
+            text = ""
+            async for raw in chunks:
+                delta = (raw.get("message") or {}).get("content", "")
+                text += delta
+                yield self._response(raw, text, delta)
+
+        return gen()
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return chat_to_completion_decorator(self.chat)(prompt, **kwargs)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        return stream_chat_to_completion_decorator(self.stream_chat)(prompt, **kwargs)
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return await achat_to_completion_decorator(self.achat)(prompt, **kwargs)
+
+    @llm_completion_callback()
+    async def astream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseAsyncGen:
+        return await astream_chat_to_completion_decorator(self.astream_chat)(prompt, **kwargs)
@@ -0,0 +1,222 @@
+"""Rate-limited MediaWiki API client with batched title queries."""
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from .tracing import tracer
+
+
+USER_AGENT = "knowledge-graph-rag-poc (https://github.com/vparag2386/knowledge-graph-rag-poc)"
+
+# MediaWiki caps `titles=` at 50 per request for regular clients and
+# intro extracts at 20 per request.
+MAX_TITLES_PER_QUERY = 50
+MAX_EXTRACTS_PER_QUERY = 20
+
+
+class RateLimiter:
+    """Per-host token bucket shared by all worker threads."""
+
+    def __init__(self, requests_per_second: float, burst: int = 1):
+        self.rate = requests_per_second
+        self.burst = max(1, burst)
+        self._lock = threading.Lock()
+        self._tokens: Dict[str, float] = {}
+        self._updated: Dict[str, float] = {}
+        self._blocked_until: Dict[str, float] = {}
+
+    def acquire(self, host: str):
+        """Block until a request to `host` is allowed."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                blocked = self._blocked_until.get(host, 0.0)
+                if now >= blocked:
+                    tokens = self._tokens.get(host, float(self.burst))
+                    elapsed = now - self._updated.get(host, now)
+                    tokens = min(float(self.burst), tokens + elapsed * self.rate)
+                    self._updated[host] = now
+                    if tokens >= 1.0:
+                        self._tokens[host] = tokens - 1.0
+                        return
+                    self._tokens[host] = tokens
+                    wait = (1.0 - tokens) / self.rate
+                else:
+                    wait = blocked - now
+            time.sleep(wait)
+
+    def backoff(self, host: str, seconds: float):
+        """Pause every request to `host` for `seconds`."""
+        with self._lock:
+            until = time.monotonic() + seconds
+            self._blocked_until[host] = max(self._blocked_until.get(host, 0.0), until)
+
+
+class MediaWikiClient:
+    """Thin client for the MediaWiki `action=query` API."""
+
+    def __init__(
+        self,
+        language: str = "en",
+        requests_per_second: float = 10.0,
+        max_retries: int = 5,
+        pool_size: int = 8,
+        timeout: float = 30.0,
+    ):
+        """
+        Initialize the client.
+
+        Args:
+            language: Wikipedia language code
+            requests_per_second: Request budget per host (0 disables limiting)
+            max_retries: Retries on throttling and transient errors
+            pool_size: Keep-alive connections held open to the host
+            timeout: Per-request timeout in seconds
+        """
+        self.api_url = f"https://{language}.wikipedia.org/w/api.php"
+        self.host = urlparse(self.api_url).netloc
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.limiter = RateLimiter(requests_per_second, burst=pool_size)
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    def get(self, params: Dict) -> Dict:
+        """Issue one API request with rate limiting and exponential backoff."""
+        params = dict(params, format="json", formatversion=2, maxlag=5)
+        delay = 1.0
+        for attempt in range(self.max_retries + 1):
+            with tracer.span("fetch.throttle"):
+                self.limiter.acquire(self.host)
+            with self._count_lock:
+                self.request_count += 1
+            try:
+                with tracer.span("fetch.request"):
+                    response = self.session.get(self.api_url, params=params, timeout=self.timeout)
+            except requests.RequestException:
+                if attempt == self.max_retries:
+                    raise
+                wait = delay
+            else:
+                wait = self._retry_after(response)
+                if wait is None:
+                    response.raise_for_status()
+                    data = response.json()
+                    error = data.get("error")
+                    if not error:
+                        return data
+                    if error.get("code") != "maxlag":
+                        raise Exception(f"MediaWiki Error: {error}")
+                    wait = float(response.headers.get("Retry-After", delay))
+                if attempt == self.max_retries:
+                    raise Exception(f"MediaWiki request throttled after {attempt} retries")
+            wait = max(delay, wait) * (1.0 + random.random() * 0.25)
+            self.limiter.backoff(self.host, wait)
+            delay = min(delay * 2, 60.0)
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        if response.status_code in (429, 503):
+            try:
+                return float(response.headers.get("Retry-After", 1.0))
+            except ValueError:
+                return 1.0
+        return None
+
+    def query_all(self, params: Dict) -> Tuple[List[Dict], Dict[str, str]]:
+        """
+        Run a `prop=` query and follow continuations.
+
+        Returns:
+            Pages merged by title, and a map of requested title -> resolved
+            title for normalized or redirected titles
+        """
+        params = dict(params, action="query")
+        pages: Dict[str, Dict] = {}
+        aliases: Dict[str, str] = {}
+        while True:
+            data = self.get(params)
+            query = data.get("query", {})
+            for item in query.get("normalized", []) + query.get("redirects", []):
+                aliases[item["from"]] = item["to"]
+            for page in query.get("pages", []):
+                merged = pages.setdefault(page["title"], {})
+                for key, value in page.items():
+                    if isinstance(value, list) and isinstance(merged.get(key), list):
+                        merged[key].extend(value)
+                    else:
+                        merged[key] = value
+            if "continue" not in data:
+                break
+            params = dict(params, **data["continue"])
+        return list(pages.values()), aliases
+
+    def page_info(self, titles: Iterable[str]) -> Tuple[List[Dict], Dict[str, str]]:
+        """
+        Resolve up to 50 titles in one round trip.
+
+        Returns info (url, lastrevid), disambiguation flag and visible
+        categories for every page, following redirects.
+        """
+        return self.query_all({
+            "prop": "info|pageprops|categories",
+            "inprop": "url",
+            "ppprop": "disambiguation",
+            "clshow": "!hidden",
+            "cllimit": "max",
+            "redirects": 1,
+            "titles": "|".join(titles),
+        })
+
+    def summaries(self, titles: Iterable[str]) -> Dict[str, str]:
+        """Fetch plain-text intro extracts for up to 20 titles at once."""
+        pages, _ = self.query_all({
+            "prop": "extracts",
+            "exintro": 1,
+            "explaintext": 1,
+            "exlimit": "max",
+            "titles": "|".join(titles),
+        })
+        return {page["title"]: page.get("extract", "") for page in pages}
+
+    def content(self, title: str) -> str:
+        """Fetch the full plain-text extract of a single page."""
+        pages, _ = self.query_all({
+            "prop": "extracts",
+            "explaintext": 1,
+            "titles": title,
+        })
+        return pages[0].get("extract", "") if pages else ""
+
+    def first_link(self, title: str) -> Optional[str]:
+        """
+        Return the first option listed on a disambiguation page.
+
+        The rendered page is read in order, the way the `wikipedia`
+        package builds `DisambiguationError.options`, so this picks the
+        same article as `options[0]` (`prop=links` would return the
+        alphabetically first link instead).
+        """
+        data = self.get({
+            "action": "parse",
+            "prop": "text",
+            "redirects": 1,
+            "page": title,
+        })
+        html = data.get("parse", {}).get("text", "")
+        for item in BeautifulSoup(html, "html.parser").find_all("li"):
+            if "tocsection" not in "".join(item.get("class", [])) and item.a:
+                return item.a.get_text()
+        return None
@@ -0,0 +1,132 @@
+"""Bounded, token-budgeted conversation memory."""
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core.utilities.token_counting import TokenCounter
+
+from .config import MEMORY_MAX_TURNS, MEMORY_SUMMARY_TOKENS, MEMORY_TOKEN_BUDGET
+
+
+_counter = TokenCounter()
+
+
+def count_tokens(text: str) -> int:
+    return _counter.get_string_tokens(text)
+
+
+def truncate_tokens(text: str, limit: int) -> str:
+    """`text` cut (at a word boundary, with an ellipsis) to at most `limit` tokens."""
+    if limit <= 0:
+        return ""
+    tokens = count_tokens(text)
+    if tokens <= limit:
+        return text
+    words = text.split()
+    keep = max(1, len(words) * limit // tokens)
+    while keep > 1 and count_tokens(" ".join(words[:keep]) + " ...") > limit:
+        keep = keep * 9 // 10
+    text = " ".join(words[:keep]) + " ..."
+    return text if count_tokens(text) <= limit else ""
+
+
+def first_sentence(text: str) -> str:
+    for end in (". ", "? ", "! ", "\n"):
+        position = text.find(end)
+        if position != -1:
+            text = text[:position + 1]
+    return text.strip()
+
+
+class ConversationMemory:
+    """
+    Recent turns verbatim plus a compressed summary of older ones.
+
+    The last `max_turns` turns are kept in a ring buffer; a turn pushed
+    out of it is folded into the summary as one line (the question and the
+    first sentence of the answer), and the summary drops its oldest lines
+    beyond `summary_tokens`. Memory per conversation is therefore bounded,
+    and `messages` never returns more than `token_budget` tokens however
+    long the conversation or its answers get.
+    """
+
+    def __init__(
+        self,
+        max_turns: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        summary_tokens: Optional[int] = None
+    ):
+        """
+        Args:
+            max_turns: Turns kept verbatim (default: MEMORY_MAX_TURNS)
+            token_budget: Maximum tokens returned by `messages` (default: MEMORY_TOKEN_BUDGET)
+            summary_tokens: Maximum size of the summary of older turns (default: MEMORY_SUMMARY_TOKENS)
+        """
+        self.max_turns = max_turns or MEMORY_MAX_TURNS
+        self.token_budget = token_budget or MEMORY_TOKEN_BUDGET
+        self.summary_tokens = MEMORY_SUMMARY_TOKENS if summary_tokens is None else summary_tokens
+        self.turns: Deque[Tuple[str, str]] = deque()
+        self.summary_lines: Deque[Tuple[str, int]] = deque()
+        self._summary_size = 0
+
+    def add_turn(self, question: str, answer: str):
+        self.turns.append((question, answer))
+        while len(self.turns) > self.max_turns:
+            self._summarize(*self.turns.popleft())
+
+    def _summarize(self, question: str, answer: str):
+        line = truncate_tokens(f"Q: {question} A: {first_sentence(answer)}", max(1, self.summary_tokens // 2))
+        size = count_tokens(line)
+        self.summary_lines.append((line, size))
+        self._summary_size += size
+        while self.summary_lines and self._summary_size > self.summary_tokens:
+            self._summary_size -= self.summary_lines.popleft()[1]
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(line for line, _ in self.summary_lines)
+
+    def clear(self):
+        self.turns.clear()
+        self.summary_lines.clear()
+        self._summary_size = 0
+
+    def history(self) -> List[ChatMessage]:
+        """The verbatim turns as chat messages, oldest first."""
+        messages = []
+        for question, answer in self.turns:
+            messages.append(ChatMessage(role=MessageRole.USER, content=question))
+            messages.append(ChatMessage(role=MessageRole.ASSISTANT, content=answer))
+        return messages
+
+    def messages(self, token_budget: Optional[int] = None) -> List[ChatMessage]:
+        """
+        Context for a follow-up question, within `token_budget` tokens of message content.
+
+        The newest turns are taken first (long answers are truncated so one
+        answer cannot take the whole budget) until the budget is spent; the
+        summary of older turns goes first if room is left.
+
+        Returns:
+            Messages oldest first, the summary (if any) as a system message
+        """
+        budget = token_budget or self.token_budget
+        per_message = max(1, budget // 2)
+        selected: List[ChatMessage] = []
+        # Built newest first and reversed at the end
+        for question, answer in reversed(self.turns):
+            question = truncate_tokens(question, min(per_message, budget))
+            if not question:
+                break
+            budget -= count_tokens(question)
+            answer = truncate_tokens(answer, min(per_message, budget))
+            budget -= count_tokens(answer)
+            if answer:
+                selected.append(ChatMessage(role=MessageRole.ASSISTANT, content=answer))
+            selected.append(ChatMessage(role=MessageRole.USER, content=question))
+        header = "Earlier in the conversation:\n"
+        if self.summary_lines and budget > count_tokens(header):
+            summary = truncate_tokens(self.summary, budget - count_tokens(header))
+            if summary:
+                selected.append(ChatMessage(role=MessageRole.SYSTEM, content=header + summary))
+        return list(reversed(selected))
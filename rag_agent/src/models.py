@@ -0,0 +1,175 @@
+"""Process-wide LLM and embedding model, loaded once and lazily."""
+import threading
+from typing import Callable, List, Optional
+
+from llama_index.core import Settings
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from pydantic import PrivateAttr
+
+from .config import (
+    OLLAMA_BASE_URL, OLLAMA_MODEL, LLM_TRANSPORT, LLM_REQUEST_TIMEOUT,
+    EMBED_MODEL, EMBED_BATCH_SIZE, EMBED_CACHE_ENABLED, EMBED_CACHE_DIR, EMBED_CACHE_MAX_ENTRIES
+)
+from .embedding_cache import CachedEmbedding, EmbeddingCache
+from .startup import startup_timer
+from .usage import usage_handler
+
+
+class LazyEmbedding(BaseEmbedding):
+    """
+    Embedding model that is constructed on first use.
+
+    Indexes can be loaded against it before the real model exists, and
+    `load_in_background` starts loading it while other startup work runs.
+    Any call that needs a vector waits for the load to finish.
+    """
+
+    _factory: Callable[[], BaseEmbedding] = PrivateAttr()
+    _model: Optional[BaseEmbedding] = PrivateAttr(default=None)
+    _error: Optional[BaseException] = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _loaded: threading.Event = PrivateAttr(default_factory=threading.Event)
+    _started: bool = PrivateAttr(default=False)
+
+    def __init__(self, factory: Callable[[], BaseEmbedding], **kwargs):
+        super().__init__(**kwargs)
+        self._factory = factory
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LazyEmbedding"
+
+    def _load(self):
+        try:
+            with startup_timer.measure("embedding model"):
+                self._model = self._factory()
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._loaded.set()
+
+    def load_in_background(self):
+        """Start loading the model on a daemon thread (no-op if already started)."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def load(self) -> BaseEmbedding:
+        """Return the model, loading it (or waiting for the background load)."""
+        with self._lock:
+            start_here = not self._started
+            self._started = True
+        if start_here:
+            self._load()
+        self._loaded.wait()
+        if self._error is not None:
+            raise self._error
+        return self._model
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        return self.load().get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self.load().get_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[Embedding]:
+        return self.load().get_text_embedding_batch(texts)
+
+
+_lock = threading.Lock()
+_embed_model: Optional[BaseEmbedding] = None
+_lazy_embed_model: Optional[LazyEmbedding] = None
+_llm = None
+
+
+def _load_huggingface() -> BaseEmbedding:
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    return HuggingFaceEmbedding(model_name=EMBED_MODEL, embed_batch_size=EMBED_BATCH_SIZE)
+
+
+def get_embed_model() -> BaseEmbedding:
+    """
+    The process-wide embedding model.
+
+    Returned immediately; the HuggingFace model itself is loaded on first
+    use (or by `preload_embed_model`). Wrapped in the on-disk embedding
+    cache when enabled, so cache hits never load the model at all.
+    """
+    global _embed_model, _lazy_embed_model
+    with _lock:
+        if _embed_model is None:
+            _lazy_embed_model = LazyEmbedding(
+                _load_huggingface,
+                model_name=EMBED_MODEL,
+                embed_batch_size=EMBED_BATCH_SIZE
+            )
+            _embed_model = _lazy_embed_model
+            if EMBED_CACHE_ENABLED:
+                _embed_model = CachedEmbedding(
+                    _lazy_embed_model,
+                    EmbeddingCache(EMBED_CACHE_DIR, EMBED_MODEL, max_entries=EMBED_CACHE_MAX_ENTRIES)
+                )
+        return _embed_model
+
+
+def preload_embed_model():
+    """Start loading the embedding model in the background."""
+    get_embed_model()
+    _lazy_embed_model.load_in_background()
+
+
+def get_llm():
+    """The process-wide Ollama client (pooled transport unless LLM_TRANSPORT is "ollama")."""
+    global _llm
+    with _lock:
+        if _llm is None:
+            with startup_timer.measure("llm client"):
+                if LLM_TRANSPORT == "ollama":
+                    from llama_index.llms.ollama import Ollama
+                    _llm = Ollama(
+                        model=OLLAMA_MODEL,
+                        base_url=OLLAMA_BASE_URL,
+                        request_timeout=LLM_REQUEST_TIMEOUT
+                    )
+                else:
+                    from .llm_transport import PooledOllama
+                    _llm = PooledOllama(
+                        model=OLLAMA_MODEL,
+                        base_url=OLLAMA_BASE_URL,
+                        request_timeout=LLM_REQUEST_TIMEOUT
+                    )
+        return _llm
+
+
+def set_llm(llm):
+    """
+    Replace the process-wide LLM, e.g. with a client of a local test server.
+
+    With `None` the client from config is created again on next use.
+    """
+    global _llm
+    with _lock:
+        _llm = llm
+    if llm is not None:
+        Settings.llm = llm
+
+
+def llm_transport_metrics() -> Optional[dict]:
+    """Latency, queue-wait and coalescing metrics of the pooled transport (None if not in use)."""
+    transport = getattr(_llm, "transport", None)
+    return transport.metrics() if transport is not None else None
+
+
+def configure_settings():
+    """Point LlamaIndex's global Settings at the shared models."""
+    Settings.llm = get_llm()
+    Settings.embed_model = get_embed_model()
+    Settings.chunk_size = 1024
+    Settings.chunk_overlap = 50
+    if usage_handler not in Settings.callback_manager.handlers:
+        Settings.callback_manager.add_handler(usage_handler)
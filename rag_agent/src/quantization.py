@@ -0,0 +1,206 @@
+"""Compact int8 and binary codes for first-pass scoring of an embedding matrix."""
+import os
+from abc import ABC, abstractmethod
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+# Rows encoded per chunk at build time, bounding scratch memory
+BUILD_CHUNK_ROWS = 65536
+
+# Rows decoded per chunk while scoring; small enough for the decoded block
+# to stay in cache, which makes the int8 scan about as fast as float32
+SCORE_CHUNK_ROWS = 1024
+
+# Fewest candidates re-scored against the float matrix, whatever k is
+MIN_CANDIDATES = 32
+
+# Set bits per byte value, for NumPy releases without `bitwise_count` (< 2.0)
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+
+def _bit_count(values: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _POPCOUNT[values]
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class Quantizer(ABC):
+    """
+    Codes for the rows of an L2-normalized float32 matrix.
+
+    `search` scores every row on the codes, keeps the best
+    `k * rescore_factor` candidates and re-scores only those against the
+    original matrix, so results carry exact cosine scores and the float
+    rows read per query are a few candidates rather than the whole
+    (memory-mapped) matrix. The codes are held in memory; the matrix is
+    not needed except for those candidate rows.
+    """
+
+    kind = ""
+    default_rescore = 4
+
+    def __init__(self, rescore_factor: int = 0):
+        """
+        Args:
+            rescore_factor: Candidates re-scored exactly per result (0 = the kind's default)
+        """
+        self.rescore_factor = rescore_factor or self.default_rescore
+        self.codes: Optional[np.ndarray] = None
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes) if self.codes is not None else 0
+
+    @abstractmethod
+    def build(self, matrix: np.ndarray):
+        """Encode every row of `matrix`."""
+
+    @abstractmethod
+    def approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        """Approximate similarity of `query` to every row (higher is closer)."""
+
+    def search(
+        self,
+        matrix: np.ndarray,
+        query: np.ndarray,
+        k: int,
+        mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k by cosine similarity: codes first, then exact re-scoring.
+
+        Args:
+            matrix: The float32 matrix the codes were built from
+            query: L2-normalized query vector
+            k: Results wanted
+            mask: Rows that may be returned (deleted or filtered rows excluded)
+
+        Returns:
+            (rows, exact scores) sorted by descending score
+        """
+        approximate = self.approximate_scores(query)
+        if mask is not None:
+            approximate[~mask] = -np.inf
+            allowed = int(mask.sum())
+        else:
+            allowed = len(approximate)
+        if allowed == 0 or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        rows = _top(approximate, min(allowed, max(k * self.rescore_factor, MIN_CANDIDATES)))
+        rows.sort()  # sequential reads from the memory-mapped matrix
+        scores = np.asarray(matrix[rows] @ query, dtype=np.float32)
+        top = _top(scores, k)
+        return rows[top], scores[top]
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **self._arrays())
+        os.replace(tmp_path, path)
+
+    def _arrays(self):
+        return {"codes": self.codes}
+
+    @classmethod
+    def load(cls, path: str, rescore_factor: int = 0) -> "Quantizer":
+        quantizer = cls(rescore_factor=rescore_factor)
+        with np.load(path) as data:
+            quantizer._restore(data)
+        return quantizer
+
+    def _restore(self, data):
+        self.codes = data["codes"]
+
+
+class Int8Quantizer(Quantizer):
+    """
+    Symmetric per-dimension scalar quantization to int8 (4x smaller than float32).
+
+    Each dimension is scaled by its largest absolute value over the rows,
+    so the codes use the full [-127, 127] range; scores are computed
+    against the query pre-multiplied by the scales.
+    """
+
+    kind = "int8"
+    default_rescore = 4
+
+    def __init__(self, rescore_factor: int = 0):
+        super().__init__(rescore_factor)
+        self.scales: Optional[np.ndarray] = None
+
+    @property
+    def nbytes(self) -> int:
+        return super().nbytes + (int(self.scales.nbytes) if self.scales is not None else 0)
+
+    def build(self, matrix: np.ndarray):
+        rows, dim = matrix.shape
+        peak = np.zeros(dim, dtype=np.float32)
+        for start in range(0, rows, BUILD_CHUNK_ROWS):
+            block = np.asarray(matrix[start:start + BUILD_CHUNK_ROWS], dtype=np.float32)
+            peak = np.maximum(peak, np.abs(block).max(axis=0))
+        self.scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+        self.codes = np.empty((rows, dim), dtype=np.int8)
+        for start in range(0, rows, BUILD_CHUNK_ROWS):
+            block = np.asarray(matrix[start:start + BUILD_CHUNK_ROWS], dtype=np.float32)
+            self.codes[start:start + len(block)] = np.clip(np.rint(block / self.scales), -127, 127)
+
+    def approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        scaled = (query * self.scales).astype(np.float32)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), SCORE_CHUNK_ROWS):
+            block = self.codes[start:start + SCORE_CHUNK_ROWS].astype(np.float32)
+            scores[start:start + len(block)] = block @ scaled
+        return scores
+
+    def _arrays(self):
+        return {"codes": self.codes, "scales": self.scales}
+
+    def _restore(self, data):
+        self.codes = data["codes"]
+        self.scales = data["scales"]
+
+
+class BinaryQuantizer(Quantizer):
+    """
+    One sign bit per dimension (32x smaller than float32).
+
+    Rows are compared with the query's sign bits by Hamming distance, a
+    coarse estimate of the angle between them, so more candidates are
+    re-scored than for int8.
+    """
+
+    kind = "binary"
+    default_rescore = 16
+
+    def build(self, matrix: np.ndarray):
+        rows, dim = matrix.shape
+        self.codes = np.empty((rows, (dim + 7) // 8), dtype=np.uint8)
+        for start in range(0, rows, BUILD_CHUNK_ROWS):
+            block = np.asarray(matrix[start:start + BUILD_CHUNK_ROWS], dtype=np.float32)
+            self.codes[start:start + len(block)] = np.packbits(block > 0, axis=1)
+
+    def approximate_scores(self, query: np.ndarray) -> np.ndarray:
+        bits = np.packbits(query > 0)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), SCORE_CHUNK_ROWS):
+            block = self.codes[start:start + SCORE_CHUNK_ROWS]
+            distance = _bit_count(block ^ bits).sum(axis=1, dtype=np.int32)
+            scores[start:start + len(block)] = -distance
+        return scores
+
+
+QUANTIZERS = {quantizer.kind: quantizer for quantizer in (Int8Quantizer, BinaryQuantizer)}
+
+
+def get_quantizer(kind: str, rescore_factor: int = 0) -> Quantizer:
+    """A new quantizer for `kind` ("int8" or "binary")."""
+    if kind not in QUANTIZERS:
+        raise ValueError(f"Unknown vector quantization: {kind!r} (expected one of {sorted(QUANTIZERS)})")
+    return QUANTIZERS[kind](rescore_factor=rescore_factor)
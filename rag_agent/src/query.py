@@ -1,95 +1,574 @@
 """Query Engine for the Knowledge Graph."""
-from .indexer import KnowledgeGraphIndexer
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
 
+import numpy as np
 
-from llama_index.core import Settings
-from llama_index.core.llms import ChatMessage, MessageRole
+from .condense import RewriteCache, needs_rewrite
+from .config import (
+    REWRITE_CACHE_SIZE, SPECULATIVE_RETRIEVAL, SPECULATIVE_MIN_SIMILARITY, LLM_MAX_CONCURRENCY,
+    SYNTHESIS_MODE, RETRIEVAL_MODE, HYBRID_CANDIDATES, RRF_K,
+    GRAPH_ENABLED, GRAPH_HOPS, GRAPH_EXPAND_NODES, GRAPH_BUDGET_MS,
+    SHARDS, SHARD_ROUTING, SHARD_ROUTE_TOP, SHARD_WORKERS
+)
+from .graph_retriever import GraphExpandedRetriever
+from .hybrid_retriever import HybridRetriever
+from .indexer import KnowledgeGraphIndexer, stored_index_version
+from .models import llm_transport_metrics, preload_embed_model
+from .semantic_cache import SemanticCache, get_semantic_cache, replay_tokens
+from .sessions import ConversationSession
+from .shards import DEFAULT_SHARD, ShardedRetriever, ShardSet, list_shards, shard_dir
+from .synthesis import PackedSynthesizer, ParallelTreeSummarize
+from .tracing import tracer
+from .usage import LLMUsage, aiter_with_usage, iter_with_usage, track_llm_usage
+
+
+from llama_index.core import QueryBundle, Settings
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.llms import ChatMessage
+from llama_index.core.schema import NodeWithScore
 
 class QueryEngine:
-    """Handles queries against the Knowledge Graph with chat memory."""
+    """
+    Handles queries against the Knowledge Graph with chat memory.
+    
+    Conversation state lives in `ConversationSession` objects passed to
+    each call, so one engine (one loaded index and embedding model) can
+    serve many conversations. Calls without a session use the engine's
+    default session. `aquery` and `astream` are the asyncio equivalents
+    of `query` and `query_stream`; at most `max_llm_concurrency` of them
+    talk to the LLM at once.
     
-    def __init__(self):
-        self.indexer = KnowledgeGraphIndexer()
+    When the storage directory holds named shards, retrieval fans out to
+    them (see `ShardedRetriever`) and each shard is loaded on its first query.
+    """
+    
+    def __init__(
+        self,
+        indexer: Optional[KnowledgeGraphIndexer] = None,
+        answer_cache: Optional[SemanticCache] = None,
+        max_llm_concurrency: Optional[int] = None,
+        synthesis_mode: Optional[str] = None,
+        shards: Optional[List[str]] = None,
+        cache_answers: bool = True,
+        verbose: bool = True
+    ):
+        """
+        Args:
+            indexer: Reuse an existing indexer (and its loaded index) instead of creating one
+            answer_cache: Semantic answer cache (default: the shared cache from config, if enabled)
+            max_llm_concurrency: Async requests allowed to call the LLM at once
+                (default: LLM_MAX_CONCURRENCY)
+            synthesis_mode: "tree_summarize" or "packed" (default: SYNTHESIS_MODE)
+            shards: Shards to query (default: SHARDS, or every shard in the storage directory)
+            cache_answers: Set to False to answer every question from the LLM, even
+                when SEMANTIC_CACHE_ENABLED is set
+            verbose: Print each (rewritten) query
+        """
+        self.indexer = indexer or KnowledgeGraphIndexer()
+        self.answer_cache = (answer_cache or get_semantic_cache()) if cache_answers else None
         self.query_engine = None
-        self.chat_history = []
+        self.shard_names = shards if shards is not None else SHARDS
+        self.shards: Optional[ShardSet] = None
+        self.default_session = ConversationSession("default")
+        self.rewrite_cache = RewriteCache(REWRITE_CACHE_SIZE)
+        self.condense_stats = {"skipped": 0, "cached": 0, "llm": 0, "speculation_kept": 0}
+        self.verbose = verbose
+        self.max_llm_concurrency = max_llm_concurrency or LLM_MAX_CONCURRENCY
+        self.synthesis_mode = synthesis_mode or SYNTHESIS_MODE
+        if self.synthesis_mode not in ("tree_summarize", "packed"):
+            raise ValueError(f"Unknown synthesis mode: {self.synthesis_mode}")
+        self.usage_stats = {"queries": 0, "llm_calls": 0, "prompt_tokens": 0}
+        self._llm_slots: Optional[asyncio.Semaphore] = None
+        self._stats_lock = threading.Lock()
+        self._warm_up: Optional[Future] = None
+        self._warm_up_lock = threading.Lock()
+        self._speculation_pool = ThreadPoolExecutor(max_workers=2)
+    
+    @property
+    def chat_history(self) -> List[ChatMessage]:
+        """History of the default session."""
+        return self.default_session.history
+    
+    @chat_history.setter
+    def chat_history(self, messages: List[ChatMessage]):
+        self.default_session.history = messages
+    
+    @staticmethod
+    def _build_retriever(indexer: KnowledgeGraphIndexer):
+        """Hybrid or vector retrieval over one loaded index, expanded over its entity graph."""
+        index = indexer.get_index()
+        if RETRIEVAL_MODE == "hybrid":
+            retriever = HybridRetriever(
+                index.as_retriever(similarity_top_k=max(HYBRID_CANDIDATES, 3)),
+                indexer.bm25,
+                index.docstore,
+                similarity_top_k=3,
+                rrf_k=RRF_K
+            )
+        else:
+            retriever = index.as_retriever(similarity_top_k=3)
+        if indexer.graph is not None and GRAPH_EXPAND_NODES > 0:
+            retriever = GraphExpandedRetriever(
+                retriever,
+                indexer.graph,
+                index.docstore,
+                hops=GRAPH_HOPS,
+                max_nodes=GRAPH_EXPAND_NODES,
+                budget_ms=GRAPH_BUDGET_MS
+            )
+        return retriever
+    
+    def _load_shard(self, name: str) -> KnowledgeGraphIndexer:
+        if name == self.indexer.shard:
+            self.indexer.get_index()
+            return self.indexer
+        indexer = KnowledgeGraphIndexer(shard=name)
+        indexer.load_index()
+        return indexer
+    
+    def _query_shards(self) -> List[str]:
+        """Shards to fan out to; empty for a single unsharded index."""
+        available = list_shards(self.indexer.storage_dir)
+        if self.shard_names:
+            missing = [name for name in self.shard_names if name not in available]
+            if missing:
+                raise FileNotFoundError(f"No index found for shards: {', '.join(missing)}")
+            return list(self.shard_names)
+        return available if available not in ([], [DEFAULT_SHARD]) else []
     
     def initialize(self):
         """Initialize the query engine."""
-        index = self.indexer.get_index()
-        self.query_engine = index.as_query_engine(
-            similarity_top_k=3,
-            response_mode="tree_summarize",
-            streaming=True  # Enable streaming by default
+        shard_names = self._query_shards()
+        if shard_names:
+            self.shards = ShardSet(
+                self.indexer.storage_dir,
+                shard_names,
+                self._load_shard,
+                self._build_retriever,
+                routing=SHARD_ROUTING,
+                route_top=SHARD_ROUTE_TOP
+            )
+            retriever = ShardedRetriever(
+                self.shards,
+                top_k=3 + (GRAPH_EXPAND_NODES if GRAPH_ENABLED else 0),
+                max_workers=SHARD_WORKERS
+            )
+            print(f"Sharded index: {', '.join(shard_names)} ({SHARD_ROUTING} routing)")
+        else:
+            retriever = self._build_retriever(self.indexer)
+        if self.synthesis_mode == "packed":
+            self.query_engine = RetrieverQueryEngine.from_args(
+                retriever,
+                response_synthesizer=PackedSynthesizer(streaming=True)
+            )
+        else:
+            self.query_engine = RetrieverQueryEngine.from_args(
+                retriever,
+                response_synthesizer=ParallelTreeSummarize(streaming=True)  # Enable streaming by default
+            )
+        print(f"Query engine initialized ({RETRIEVAL_MODE} retrieval, {self.synthesis_mode} synthesis)")
+    
+    def warm_up(self) -> Future:
+        """
+        Load the index and the embedding model concurrently in the background.
+        
+        Returns immediately; the first query waits for whatever is still
+        loading. Errors (e.g. a missing index) are raised by the queries
+        waiting on that attempt; the next call starts a new one.
+        """
+        with self._warm_up_lock:
+            if self._warm_up is None:
+                self._warm_up = Future()
+                preload_embed_model()
+                threading.Thread(target=self._run_warm_up, args=(self._warm_up,), daemon=True).start()
+            return self._warm_up
+    
+    def _run_warm_up(self, future: Future):
+        try:
+            self.initialize()
+            future.set_result(None)
+        except BaseException as e:
+            with self._warm_up_lock:
+                self._warm_up = None
+            future.set_exception(e)
+    
+    def _ensure_initialized(self):
+        warm_up = self._warm_up
+        if warm_up is not None:
+            warm_up.result()
+        elif self.query_engine is None:
+            self.initialize()
+    
+    async def _aensure_initialized(self):
+        if self.query_engine is None:
+            await asyncio.wrap_future(self.warm_up())
+    
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self.condense_stats[stat] += 1
+    
+    def _print_query(self, question: str, standalone_question: str):
+        if not self.verbose:
+            return
+        if standalone_question != question:
+            print(f"\nRewritten Query: {standalone_question}")
+        else:
+            print(f"\nQuery: {question}")
+    
+    def _cache_version(self) -> str:
+        """
+        Answer cache version: the versions of the indexes queried and the
+        settings that shape answers, so engines over different shards or
+        modes sharing one cache file never serve each other's answers.
+        """
+        if self.shards is None:
+            scope = f"index={self.indexer.index_version()}"
+        else:
+            versions = []
+            for name in sorted(self.shards.names):
+                # Loaded shards answer from memory; the others will load what is on disk
+                indexer = self.shards.indexers.get(name)
+                version = (indexer.index_version() if indexer is not None
+                           else stored_index_version(shard_dir(self.shards.storage_dir, name)))
+                versions.append(f"{name}:{version}")
+            scope = f"shards={','.join(versions)};routing={self.shards.routing}:{self.shards.route_top}"
+        return f"{scope};retrieval={RETRIEVAL_MODE};synthesis={self.synthesis_mode}"
+    
+    def _lookup_answer(self, question: str):
+        """
+        Embed the standalone question and check the answer cache.
+        
+        Returns:
+            (QueryBundle carrying the embedding for retrieval, cached answer or None)
+        """
+        if self.answer_cache is None:
+            return QueryBundle(question), None
+        with tracer.span("query.embed"):
+            embedding = Settings.embed_model.get_query_embedding(question)
+        query_bundle = QueryBundle(question, embedding=embedding)
+        with tracer.span("query.cache_lookup"):
+            hit = self.answer_cache.lookup(embedding, self._cache_version())
+        if hit is None:
+            return query_bundle, None
+        cached_question, answer, similarity = hit
+        if self.verbose:
+            print(f"(Cached answer for \"{cached_question}\", similarity {similarity:.3f})")
+        return query_bundle, answer
+    
+    def _store_answer(self, query_bundle: QueryBundle, answer: str):
+        if self.answer_cache is not None:
+            self.answer_cache.put(
+                query_bundle.query_str, query_bundle.embedding, answer, self._cache_version()
+            )
+    
+    def _record_usage(self, session: ConversationSession, usage: LLMUsage):
+        session.last_usage = usage.as_dict()
+        with self._stats_lock:
+            self.usage_stats["queries"] += 1
+            self.usage_stats["llm_calls"] += usage.calls
+            self.usage_stats["prompt_tokens"] += usage.prompt_tokens
+    
+    def usage_summary(self, session: Optional[ConversationSession] = None) -> str:
+        """LLM calls and prompt tokens: the session's last query and the per-query average."""
+        last = (session or self.default_session).last_usage
+        queries = self.usage_stats["queries"]
+        if not queries:
+            return f"LLM usage ({self.synthesis_mode} synthesis): no queries yet"
+        return (
+            f"LLM usage ({self.synthesis_mode} synthesis): "
+            f"last query {last.get('llm_calls', 0)} calls, {last.get('prompt_tokens', 0)} prompt tokens; "
+            f"average {self.usage_stats['llm_calls'] / queries:.1f} calls, "
+            f"{self.usage_stats['prompt_tokens'] / queries:.0f} prompt tokens over {queries} queries"
         )
-        print("Query engine initialized")
     
-    def condense_question(self, question: str) -> str:
-        """Rewrite question based on chat history."""
-        if not self.chat_history:
+    def transport_summary(self) -> str:
+        """Calls, coalescing and latency of the pooled LLM transport."""
+        metrics = llm_transport_metrics()
+        if metrics is None:
+            return "LLM transport: stock Ollama client (no metrics)"
+        latency, wait = metrics["latency_ms"], metrics["queue_wait_ms"]
+        if not latency["count"]:
+            return f"LLM transport: no calls yet ({metrics['max_parallel']} parallel)"
+        return (
+            f"LLM transport: {metrics['calls']} calls, {metrics['coalesced']} coalesced, "
+            f"{metrics['errors']} errors; latency p50 {latency['p50']:.0f} ms, p95 {latency['p95']:.0f} ms; "
+            f"queue wait p95 {wait['p95']:.0f} ms ({metrics['max_parallel']} parallel)"
+        )
+    
+    def cache_stats(self) -> dict:
+        """Answer cache hit/miss counters (empty when the cache is disabled)."""
+        return self.answer_cache.stats() if self.answer_cache else {}
+    
+    def condense_question(self, question: str, session: Optional[ConversationSession] = None) -> str:
+        """Rewrite question based on chat history.
+        
+        The LLM is only asked when the question looks like it refers back
+        to the conversation and the same rewrite is not already cached.
+        """
+        history = (session or self.default_session).context()
+        standalone = self._local_rewrite(question, history)
+        if standalone is not None:
+            return standalone
+        return self._llm_rewrite(question, history)
+    
+    def _local_rewrite(self, question: str, history: List[ChatMessage]) -> Optional[str]:
+        """The standalone question if it can be had without the LLM, else None."""
+        if not history or not needs_rewrite(question):
+            if history:
+                self._count("skipped")
             return question
-            
-        # Create context string from history
+        rewrite = self.rewrite_cache.get(self._rewrite_key(question, history))
+        if rewrite is not None:
+            self._count("cached")
+        return rewrite
+    
+    @staticmethod
+    def _rewrite_key(question: str, history: List[ChatMessage]) -> bytes:
+        return RewriteCache.key([msg.content for msg in history], question)
+    
+    @staticmethod
+    def _rewrite_prompt(question: str, history: List[ChatMessage]) -> str:
+        # Create context string from the token-budgeted history
         history_str = "\n".join([
-            f"{msg.role}: {msg.content}" 
-            for msg in self.chat_history[-4:]  # Keep last 2 turns
+            f"{msg.role}: {msg.content}"
+            for msg in history
         ])
         
-        prompt = (
+        return (
             "Given the following conversation history and a follow-up question, "
             "rephrase the follow-up question to be a standalone question.\n\n"
             f"Chat History:\n{history_str}\n\n"
             f"Follow Up Input: {question}\n"
             "Standalone question:"
         )
+    
+    def _llm_rewrite(self, question: str, history: List[ChatMessage]) -> str:
+        with tracer.span("query.condense"):
+            response = Settings.llm.complete(self._rewrite_prompt(question, history))
+        return self._remember_rewrite(question, history, str(response).strip())
+    
+    async def _allm_rewrite(self, question: str, history: List[ChatMessage]) -> str:
+        async with self._slots():
+            start = time.perf_counter()
+            response = await Settings.llm.acomplete(self._rewrite_prompt(question, history))
+            tracer.record("query.condense", time.perf_counter() - start)
+        return self._remember_rewrite(question, history, str(response).strip())
+    
+    def _remember_rewrite(self, question: str, history: List[ChatMessage], rewrite: str) -> str:
+        self.rewrite_cache.put(self._rewrite_key(question, history), rewrite)
+        self._count("llm")
+        return rewrite
+    
+    def _slots(self) -> asyncio.Semaphore:
+        """Semaphore bounding concurrent LLM use by the async API."""
+        if self._llm_slots is None:
+            self._llm_slots = asyncio.Semaphore(self.max_llm_concurrency)
+        return self._llm_slots
+    
+    def _retrieve(self, query_bundle: QueryBundle) -> Tuple[QueryBundle, List[NodeWithScore]]:
+        if query_bundle.embedding is None:
+            with tracer.span("query.embed"):
+                query_bundle.embedding = Settings.embed_model.get_query_embedding(query_bundle.query_str)
+        with tracer.span("query.retrieve") as span:
+            nodes = self.query_engine.retrieve(query_bundle)
+            span.add(nodes=len(nodes))
+        return query_bundle, nodes
+    
+    @staticmethod
+    def _same_intent(raw: QueryBundle, rewritten: QueryBundle) -> bool:
+        """Whether retrieval results for `raw` can stand in for `rewritten`."""
+        if " ".join(raw.query_str.lower().split()) == " ".join(rewritten.query_str.lower().split()):
+            return True
+        a = np.asarray(raw.embedding, dtype=np.float32)
+        b = np.asarray(rewritten.embedding, dtype=np.float32)
+        denom = np.linalg.norm(a) * np.linalg.norm(b)
+        return denom > 0 and float(a @ b) / denom >= SPECULATIVE_MIN_SIMILARITY
+    
+    def _check_answer(self, question: str, standalone_question: str) -> Tuple[QueryBundle, Optional[str]]:
+        """Answer-cache lookup once the standalone question is known."""
+        self._print_query(question, standalone_question)
+        return self._lookup_answer(standalone_question)
+    
+    def _finish_prepare(
+        self,
+        query_bundle: QueryBundle,
+        speculation: Optional[Tuple[QueryBundle, List[NodeWithScore]]]
+    ) -> Tuple[QueryBundle, Optional[str], Optional[List[NodeWithScore]]]:
+        """Retrieval after an answer-cache miss, keeping the speculative results if they fit."""
+        if speculation is not None:
+            raw_bundle, raw_nodes = speculation
+            if query_bundle.embedding is None:
+                with tracer.span("query.embed"):
+                    query_bundle.embedding = Settings.embed_model.get_query_embedding(query_bundle.query_str)
+            if self._same_intent(raw_bundle, query_bundle):
+                self._count("speculation_kept")
+                return query_bundle, None, raw_nodes
+        query_bundle, nodes = self._retrieve(query_bundle)
+        return query_bundle, None, nodes
+    
+    def _prepare(
+        self,
+        question: str,
+        session: ConversationSession
+    ) -> Tuple[QueryBundle, Optional[str], Optional[List[NodeWithScore]]]:
+        """
+        Rewrite the question, check the answer cache and retrieve context.
         
-        response = Settings.llm.complete(prompt)
-        return str(response).strip()
-
-    def query(self, question: str) -> str:
+        When the rewrite needs the LLM, retrieval for the raw question runs
+        alongside it; those results are kept if the rewrite turns out to
+        mean the same thing, so retrieval is off the critical path. A hit
+        in the answer cache does not wait for it.
+        
+        Returns:
+            (query bundle, cached answer or None, retrieved nodes or None on a cache hit)
+        """
+        history = session.context()
+        standalone_question = self._local_rewrite(question, history)
+        speculation = None
+        if standalone_question is None:
+            if SPECULATIVE_RETRIEVAL:
+                speculation = self._speculation_pool.submit(self._retrieve, QueryBundle(question))
+            standalone_question = self._llm_rewrite(question, history)
+        query_bundle, cached = self._check_answer(question, standalone_question)
+        if cached is not None:
+            if speculation is not None:
+                speculation.cancel()
+            return query_bundle, cached, None
+        return self._finish_prepare(query_bundle, speculation.result() if speculation else None)
+    
+    async def _aprepare(
+        self,
+        question: str,
+        session: ConversationSession
+    ) -> Tuple[QueryBundle, Optional[str], Optional[List[NodeWithScore]]]:
+        """Async `_prepare`; embedding and retrieval run in worker threads."""
+        history = session.context()
+        standalone_question = self._local_rewrite(question, history)
+        speculation = None
+        if standalone_question is None:
+            if SPECULATIVE_RETRIEVAL:
+                speculation = asyncio.ensure_future(asyncio.to_thread(self._retrieve, QueryBundle(question)))
+            try:
+                standalone_question = await self._allm_rewrite(question, history)
+            except BaseException:
+                if speculation is not None:
+                    speculation.cancel()
+                raise
+        query_bundle, cached = await asyncio.to_thread(self._check_answer, question, standalone_question)
+        if cached is not None:
+            if speculation is not None:
+                speculation.cancel()
+            return query_bundle, cached, None
+        return await asyncio.to_thread(
+            self._finish_prepare, query_bundle, await speculation if speculation else None
+        )
+    
+    def query(self, question: str, session: Optional[ConversationSession] = None) -> str:
         """Query the knowledge graph (non-streaming)."""
-        if self.query_engine is None:
-            self.initialize()
-            
-        # Rewrite question if needed
-        standalone_question = self.condense_question(question)
-        if standalone_question != question:
-            print(f"\nRewritten Query: {standalone_question}")
-        else:
-            print(f"\nQuery: {question}")
-            
-        response = self.query_engine.query(standalone_question)
+        self._ensure_initialized()
+        session = session or self.default_session
+        
+        with tracer.span("query") as span, track_llm_usage() as usage:
+            query_bundle, cached, nodes = self._prepare(question, session)
+            if cached is not None:
+                answer = cached
+            else:
+                with tracer.span("query.synthesize"):
+                    answer = str(self.query_engine.synthesize(query_bundle, nodes))
+                self._store_answer(query_bundle, answer)
+            span.add(llm_calls=usage.calls, prompt_tokens=usage.prompt_tokens, cache_hits=cached is not None)
+        self._record_usage(session, usage)
+        if self.verbose:
+            print(f"(LLM calls: {usage.calls}, prompt tokens: {usage.prompt_tokens})")
         
         # Update history
-        self.chat_history.append(ChatMessage(role=MessageRole.USER, content=question))
-        self.chat_history.append(ChatMessage(role=MessageRole.ASSISTANT, content=str(response)))
+        session.add_turn(question, answer)
         
-        return str(response)
-
-    def query_stream(self, question: str):
+        return answer
+    
+    def query_stream(self, question: str, session: Optional[ConversationSession] = None):
         """Query the knowledge graph with streaming response."""
-        if self.query_engine is None:
-            self.initialize()
-            
-        # Rewrite question if needed
-        standalone_question = self.condense_question(question)
-        if standalone_question != question:
-            print(f"\nRewritten Query: {standalone_question}")
-        else:
-            print(f"\nQuery: {question}")
-            
-        response = self.query_engine.query(standalone_question)
+        self._ensure_initialized()
+        session = session or self.default_session
         
-        # Update history (we'll append the full response after streaming in the caller, 
-        # but for simplicity we can't easily do it here without consuming the stream.
-        # So we'll return the response object and let the caller handle history update if needed,
-        # or we can accumulate here. Let's accumulate here.)
+        start = time.perf_counter()
+        # Usage is tracked step by step, never across a yield (see `track_llm_usage`)
+        usage = LLMUsage()
+        with tracer.span("query") as span:
+            with track_llm_usage(usage):
+                query_bundle, cached, nodes = self._prepare(question, session)
+            if cached is not None:
+                # Replay the cached answer as a token stream
+                full_response = cached
+                yield from replay_tokens(cached)
+            else:
+                with tracer.span("query.synthesize") as synthesis:
+                    with track_llm_usage(usage):
+                        response = self.query_engine.synthesize(query_bundle, nodes)
+                    
+                    # Accumulate the streamed answer for the history and the cache
+                    parts = []
+                    for token in iter_with_usage(usage, response.response_gen):
+                        if not parts:
+                            tracer.record("query.first_token", time.perf_counter() - start)
+                        parts.append(token)
+                        yield token
+                    synthesis.add(answer_tokens=len(parts))
+                full_response = "".join(parts)
+                self._store_answer(query_bundle, full_response)
+            span.add(llm_calls=usage.calls, prompt_tokens=usage.prompt_tokens, cache_hits=cached is not None)
+        self._record_usage(session, usage)
         
-        full_response = ""
-        for token in response.response_gen:
-            full_response += token
-            yield token
-            
         # Update history
-        self.chat_history.append(ChatMessage(role=MessageRole.USER, content=question))
-        self.chat_history.append(ChatMessage(role=MessageRole.ASSISTANT, content=full_response))
-
+        session.add_turn(question, full_response)
+    
+    async def aquery(self, question: str, session: Optional[ConversationSession] = None) -> str:
+        """Async `query`."""
+        return "".join([token async for token in self.astream(question, session)])
+    
+    async def astream(
+        self,
+        question: str,
+        session: Optional[ConversationSession] = None
+    ) -> AsyncIterator[str]:
+        """Async `query_stream`: yields answer tokens as the LLM produces them."""
+        await self._aensure_initialized()
+        session = session or self.default_session
+        
+        start = time.perf_counter()
+        usage = LLMUsage()
+        with tracer.span("query") as span:
+            with track_llm_usage(usage):
+                query_bundle, cached, nodes = await self._aprepare(question, session)
+            if cached is not None:
+                full_response = cached
+                for token in replay_tokens(cached):
+                    yield token
+            else:
+                parts = []
+                waiting = time.perf_counter()
+                async with self._slots():
+                    tracer.record("query.slot_wait", time.perf_counter() - waiting)
+                    with tracer.span("query.synthesize") as synthesis:
+                        with track_llm_usage(usage):
+                            response = await self.query_engine.asynthesize(query_bundle, nodes)
+                        if hasattr(response, "async_response_gen"):
+                            async for token in aiter_with_usage(usage, response.async_response_gen()):
+                                if not parts:
+                                    tracer.record("query.first_token", time.perf_counter() - start)
+                                parts.append(token)
+                                yield token
+                        else:
+                            parts.append(str(response))
+                            yield parts[0]
+                        synthesis.add(answer_tokens=len(parts))
+                full_response = "".join(parts)
+                await asyncio.to_thread(self._store_answer, query_bundle, full_response)
+            span.add(llm_calls=usage.calls, prompt_tokens=usage.prompt_tokens, cache_hits=cached is not None)
+        self._record_usage(session, usage)
+        
+        session.add_turn(question, full_response)
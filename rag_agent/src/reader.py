@@ -1,94 +1,248 @@
 """Wiki.js GraphQL Client to fetch pages."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Union
+
 import requests
-from typing import List, Dict
+from requests.adapters import HTTPAdapter
 from llama_index.core import Document
-from .config import WIKI_URL, WIKI_API_KEY
+from .config import WIKI_URL, WIKI_API_KEY, WIKI_BATCH_SIZE, WIKI_FETCH_WORKERS
+from .fetch_cache import FetchCache, get_fetch_cache
+from .tracing import tracer
+
+
+LIST_QUERY = """
+query {
+  pages {
+    list {
+      id
+      path
+      locale
+      updatedAt
+    }
+  }
+}
+"""
+
+PAGE_FIELDS = "id path locale title description content updatedAt"
+
+
+def _batches(items: List[Dict], size: int) -> Iterator[List[Dict]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def parse_timestamp(value: Union[str, datetime, None]) -> Optional[datetime]:
+    """Parse a Wiki.js `updatedAt` value (ISO 8601, usually with a `Z` suffix)."""
+    if value is None or isinstance(value, datetime):
+        return value
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
 
 
 class WikiReader:
     """Reads pages from Wiki.js via GraphQL API."""
-    
-    def __init__(self):
-        self.api_url = f"{WIKI_URL}/graphql"
+
+    def __init__(
+        self,
+        cache: Optional[FetchCache] = None,
+        use_cache: bool = True,
+        batch_size: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        wiki_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        timeout: float = 60.0
+    ):
+        """
+        Initialize the reader.
+
+        Args:
+            cache: Page cache (default: the shared cache from config, if enabled)
+            use_cache: Set to False to fetch every page, even when FETCH_CACHE_ENABLED is set
+            batch_size: Pages fetched per GraphQL request (default: WIKI_BATCH_SIZE)
+            max_workers: Concurrent batch requests (default: WIKI_FETCH_WORKERS)
+            wiki_url: Wiki.js base URL (default: WIKI_URL)
+            api_key: API key (default: WIKI_API_KEY)
+            timeout: Per-request timeout in seconds
+        """
+        self.api_url = f"{wiki_url or WIKI_URL}/graphql"
         self.headers = {
-            "Authorization": f"Bearer {WIKI_API_KEY}",
+            "Authorization": f"Bearer {api_key or WIKI_API_KEY}",
             "Content-Type": "application/json"
         }
-    
-    def fetch_all_pages(self) -> List[Document]:
-        """Fetch all pages from Wiki.js and convert to LlamaIndex Documents."""
-        # First, get the list of all pages
-        list_query = """
-        query {
-          pages {
-            list {
-              id
-              path
-            }
-          }
-        }
+        self.batch_size = max(1, batch_size or WIKI_BATCH_SIZE)
+        self.max_workers = max(1, max_workers or WIKI_FETCH_WORKERS)
+        self.timeout = timeout
+        self.cache = (cache or get_fetch_cache()) if use_cache else None
+
+        # One keep-alive connection per worker
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self.last_sync: Optional[str] = None
+        self.last_fetch_stats: Dict[str, float] = {}
+
+    def _post(self, query: str, variables: Optional[Dict] = None) -> Dict:
+        """Send one GraphQL request and return its `data`, raising on transport errors."""
+        with self._count_lock:
+            self.request_count += 1
+        payload = {"query": query}
+        if variables:
+            payload["variables"] = variables
+        with tracer.span("fetch.request"):
+            response = self.session.post(self.api_url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()
+
+    def list_pages(self, updated_since: Union[str, datetime, None] = None) -> List[Dict]:
+        """
+        List page metadata (id, path, locale, updatedAt) in one request.
+
+        Args:
+            updated_since: Only return pages updated strictly after this time
+        """
+        with tracer.span("fetch.list"):
+            data = self._post(LIST_QUERY)
+        if "errors" in data:
+            raise Exception(f"GraphQL Error: {data['errors']}")
+        pages = data["data"]["pages"]["list"]
+
+        timestamps = [page["updatedAt"] for page in pages if page.get("updatedAt")]
+        self.last_sync = max(timestamps, key=parse_timestamp, default=self.last_sync)
+        since = parse_timestamp(updated_since)
+        if since is not None:
+            pages = [
+                page for page in pages
+                if page.get("updatedAt") and parse_timestamp(page["updatedAt"]) > since
+            ]
+        return pages
+
+    def fetch_all_pages(self, updated_since: Union[str, datetime, None] = None) -> List[Document]:
+        """Fetch all pages from Wiki.js and convert to LlamaIndex Documents.
+
+        The page list carries each page's `updatedAt`, which serves as the
+        revision id: cached pages with a matching timestamp are reused
+        without fetching their content.
+
+        Args:
+            updated_since: Incremental sync; only pages updated after this
+                time are fetched (e.g. the previous run's `last_sync`)
         """
-        
         try:
-            response = requests.post(
-                self.api_url,
-                json={"query": list_query},
-                headers=self.headers
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if "errors" in data:
-                raise Exception(f"GraphQL Error: {data['errors']}")
-            
-            page_list = data["data"]["pages"]["list"]
-            documents = []
-            
-            # Fetch each page individually to get content
-            for page_info in page_list:
-                page_query = """
-                query ($id: Int!) {
-                  pages {
-                    single(id: $id) {
-                      id
-                      path
-                      title
-                      description
-                      content
-                    }
-                  }
-                }
-                """
-                
-                page_response = requests.post(
-                    self.api_url,
-                    json={"query": page_query, "variables": {"id": page_info["id"]}},
-                    headers=self.headers
-                )
-                page_response.raise_for_status()
-                page_data = page_response.json()
-                
-                if "errors" in page_data:
-                    print(f"Warning: Could not fetch page {page_info['id']}: {page_data['errors']}")
-                    continue
-                
-                page = page_data["data"]["pages"]["single"]
-                
-                # Create LlamaIndex Document
-                doc = Document(
-                    text=page["content"],
-                    metadata={
-                        "id": page["id"],
-                        "path": page["path"],
-                        "title": page["title"],
-                        "description": page.get("description", "")
-                    }
-                )
-                documents.append(doc)
-            
-            print(f"Fetched {len(documents)} pages from Wiki.js")
-            return documents
-            
+            documents = list(self.iter_pages(updated_since=updated_since))
         except Exception as e:
             print(f"Error fetching pages: {e}")
             raise
+
+        print(f"Fetched {len(documents)} pages from Wiki.js")
+        if self.cache:
+            print(self.cache.summary())
+        return documents
+
+    def iter_pages(self, updated_since: Union[str, datetime, None] = None) -> Iterator[Document]:
+        """
+        Yield pages as they are fetched.
+
+        Page contents are requested `batch_size` at a time with aliased
+        `pages.single` fields in one GraphQL query, and up to `max_workers`
+        batches are in flight at once over pooled keep-alive connections.
+        Documents are yielded in completion order.
+
+        Args:
+            updated_since: Only fetch pages updated after this time
+        """
+        start = time.perf_counter()
+        requests_before = self.request_count
+        page_list = self.list_pages(updated_since=updated_since)
+        count = 0
+
+        missing = []
+        for page_info in page_list:
+            locale = page_info.get("locale") or "en"
+            if self.cache:
+                cached = self.cache.get("wikijs", locale, page_info["id"], revision=page_info.get("updatedAt"))
+                if cached:
+                    count += 1
+                    tracer.count("fetch", cache_hits=1)
+                    yield cached
+                    continue
+            missing.append(page_info)
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(self._fetch_batch, batch) for batch in _batches(missing, self.batch_size)]
+                try:
+                    for future in as_completed(futures):
+                        for doc in future.result():
+                            count += 1
+                            yield doc
+                finally:
+                    for future in futures:
+                        future.cancel()
+
+        self._record_fetch_stats(count, start, requests_before)
+
+    def _fetch_batch(self, batch: List[Dict]) -> List[Document]:
+        """Fetch the contents of several pages with one aliased query."""
+        fields = "\n".join(
+            f"      p{i}: single(id: {int(page_info['id'])}) {{ {PAGE_FIELDS} }}"
+            for i, page_info in enumerate(batch)
+        )
+        query = f"query {{\n  pages {{\n{fields}\n  }}\n}}"
+        with tracer.span("fetch.batch") as span:
+            data = self._post(query)
+            span.add(pages=len(batch))
+
+        # A missing or unreadable page nulls its alias and adds an error,
+        # without failing the rest of the batch
+        for error in data.get("errors", []):
+            print(f"Warning: Could not fetch page {error.get('path', '')}: {error.get('message', error)}")
+        results = (data.get("data") or {}).get("pages") or {}
+
+        documents = []
+        for i, page_info in enumerate(batch):
+            page = results.get(f"p{i}")
+            if not page:
+                continue
+            locale = page.get("locale") or page_info.get("locale") or "en"
+            doc = self._page_to_document(page, locale)
+            documents.append(doc)
+            if self.cache:
+                self.cache.put("wikijs", locale, page_info["id"], page_info.get("updatedAt"), doc)
+        return documents
+
+    @staticmethod
+    def _page_to_document(page: Dict, locale: str) -> Document:
+        return Document(
+            id_=f"wikijs:{locale}:{page['id']}",
+            text=page["content"],
+            metadata={
+                "id": page["id"],
+                "path": page["path"],
+                "title": page["title"],
+                "description": page.get("description", "")
+            }
+        )
+
+    def _record_fetch_stats(self, count: int, start: float, requests_before: int):
+        elapsed = time.perf_counter() - start
+        api_requests = self.request_count - requests_before
+        rate = count / elapsed if elapsed > 0 else 0.0
+        tracer.record("fetch", elapsed, {"documents": count, "api_requests": api_requests})
+        self.last_fetch_stats = {
+            "pages": count,
+            "seconds": elapsed,
+            "pages_per_second": rate,
+            "api_requests": api_requests
+        }
+        print(f"Fetched {count} pages in {elapsed:.2f}s "
+              f"({rate:.1f} pages/s, {api_requests} API requests)")
@@ -0,0 +1,204 @@
+"""Semantic answer cache keyed by question embedding."""
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from .config import (
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_PATH, SEMANTIC_CACHE_THRESHOLD,
+    SEMANTIC_CACHE_TTL, SEMANTIC_CACHE_MAX_ENTRIES
+)
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional["SemanticCache"]:
+    """Return the process-wide answer cache from config, or None if disabled."""
+    global _shared_cache
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = SemanticCache(
+                SEMANTIC_CACHE_PATH,
+                threshold=SEMANTIC_CACHE_THRESHOLD,
+                ttl_seconds=SEMANTIC_CACHE_TTL,
+                max_entries=SEMANTIC_CACHE_MAX_ENTRIES
+            )
+        return _shared_cache
+
+
+def replay_tokens(text: str) -> Iterator[str]:
+    """Split a cached answer into word-sized tokens for streaming output."""
+    for match in re.finditer(r"\s*\S+|\s+", text):
+        yield match.group()
+
+
+class SemanticCache:
+    """
+    Answers to previous standalone questions, looked up by cosine similarity.
+
+    Entries are kept in SQLite and mirrored in memory as a normalized
+    matrix, so a lookup is one matrix-vector product. Each entry records
+    the version it was answered against (the index, or the shards and
+    settings an engine queries), and a lookup only matches entries of its
+    own version, so engines with different scopes can share one cache.
+    Entries expire after the TTL, and least-recently-used entries are
+    evicted beyond `max_entries`; answers for an outdated version are
+    never read again, so they are the first to go.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        threshold: float = 0.95,
+        ttl_seconds: float = 86400,
+        max_entries: int = 1000
+    ):
+        """
+        Initialize the cache and load any entries already on disk.
+
+        Args:
+            path: SQLite file to store entries in (None keeps them in memory only)
+            threshold: Minimum cosine similarity for a hit
+            ttl_seconds: How long an answer is served
+            max_entries: Upper bound on cached answers
+        """
+        self.path = path
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS answers (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                version TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._load()
+
+    def _load(self):
+        rows = self._conn.execute(
+            "SELECT id, vector, version, created_at, accessed_at FROM answers ORDER BY id"
+        ).fetchall()
+        self._ids: List[int] = [row[0] for row in rows]
+        self._matrix = (np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+                        if rows else None)
+        self._versions = np.array([row[2] for row in rows], dtype=object)
+        self._created = np.array([row[3] for row in rows], dtype=np.float64)
+        self._accessed: Dict[int, float] = {row[0]: row[4] for row in rows}
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def lookup(self, vector: List[float], version: str) -> Optional[Tuple[str, str, float]]:
+        """
+        Find the closest cached question above the similarity threshold.
+
+        Args:
+            vector: Embedding of the standalone question
+            version: Current version; only entries stored with it can match
+
+        Returns:
+            (cached question, answer, similarity), or None on a miss
+        """
+        with self._lock:
+            if self._matrix is None:
+                self.misses += 1
+                return None
+            scores = self._matrix @ self._normalize(vector)
+            scores[time.time() - self._created > self.ttl_seconds] = -np.inf
+            scores[self._versions != version] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            entry_id = self._ids[best]
+            now = time.time()
+            self._accessed[entry_id] = now
+            question, answer = self._conn.execute(
+                "SELECT question, answer FROM answers WHERE id=?", (entry_id,)
+            ).fetchone()
+            self._conn.execute("UPDATE answers SET accessed_at=? WHERE id=?", (now, entry_id))
+            self._conn.commit()
+            self.hits += 1
+            return question, answer, float(scores[best])
+
+    def put(self, question: str, vector: List[float], answer: str, version: str):
+        """Store an answer, dropping expired and least-recently-used entries."""
+        if not answer.strip():
+            return
+        normalized = self._normalize(vector)
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO answers (question, answer, vector, version, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (question, answer, normalized.tobytes(), version, now, now)
+            )
+            self._ids.append(cursor.lastrowid)
+            self._accessed[cursor.lastrowid] = now
+            row = normalized[None, :]
+            self._matrix = row if self._matrix is None else np.vstack([self._matrix, row])
+            self._versions = np.append(self._versions, np.array([version], dtype=object))
+            self._created = np.append(self._created, now)
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        keep = now - self._created <= self.ttl_seconds
+        overflow = int(keep.sum()) - self.max_entries
+        if overflow > 0:
+            live = [i for i in range(len(self._ids)) if keep[i]]
+            live.sort(key=lambda i: self._accessed[self._ids[i]])
+            keep[live[:overflow]] = False
+        if keep.all():
+            return
+        dropped = [self._ids[i] for i in np.flatnonzero(~keep)]
+        self._conn.executemany("DELETE FROM answers WHERE id=?", [(i,) for i in dropped])
+        for entry_id in dropped:
+            del self._accessed[entry_id]
+        self._ids = [self._ids[i] for i in np.flatnonzero(keep)]
+        self._matrix = self._matrix[keep] if keep.any() else None
+        self._versions = self._versions[keep]
+        self._created = self._created[keep]
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for this process."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._ids)
+        }
+
+    def summary(self) -> str:
+        """One-line hit/miss summary."""
+        stats = self.stats()
+        return (f"Answer cache: {stats['hits']} hits, {stats['misses']} misses, "
+                f"{stats['hit_rate'] * 100:.0f}% hit rate, {stats['entries']} entries")
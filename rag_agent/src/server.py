@@ -0,0 +1,316 @@
+"""Long-lived HTTP server for the RAG agent with streamed answers."""
+import asyncio
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from .config import SERVER_MAX_QUEUE, SERVER_REQUEST_TIMEOUT
+from .models import llm_transport_metrics
+from .query import QueryEngine
+from .sessions import SessionStore
+from .tracing import tracer
+
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Background event loop shared by every server in the process.
+
+    The LLM's async HTTP client is bound to the loop it first runs on, so
+    servers started one after another must keep using the same loop.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="rag-server-loop", daemon=True).start()
+        return _loop
+
+
+class RAGServer:
+    """
+    HTTP front end for a warm `QueryEngine`.
+
+    Endpoints:
+        POST   /query            {"question": ..., "session_id": ..., "stream": true}
+        GET    /health           readiness and load
+        GET    /stats            request, cache, rewrite, LLM and shard counters (and stage traces when tracing is on)
+        DELETE /sessions/<id>    forget a conversation
+
+    Streaming answers are sent as server-sent events over a chunked
+    response: a `session` event, one `data: {"token": ...}` message per
+    token, then `done` (or `error`). With `"stream": false` the answer is
+    returned as one JSON object.
+
+    Each HTTP request is handled on its own thread and runs
+    `QueryEngine.astream` on a shared event loop, where the engine bounds
+    concurrent LLM use. Requests beyond that limit wait in a queue of
+    `max_queue`; when it is full the server answers 503 with Retry-After
+    instead of piling up work. A request that runs past `request_timeout`
+    is cancelled.
+    """
+
+    def __init__(
+        self,
+        engine: QueryEngine,
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        max_queue: Optional[int] = None,
+        request_timeout: Optional[float] = None,
+        sessions: Optional[SessionStore] = None
+    ):
+        """
+        Initialize the server (call `start` or `serve_forever` to run it).
+
+        Args:
+            engine: Query engine shared by all requests
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            max_queue: Requests allowed to wait for an LLM slot (default: SERVER_MAX_QUEUE)
+            request_timeout: Seconds before a request is cancelled (default: SERVER_REQUEST_TIMEOUT)
+            sessions: Conversation sessions (default: a new SessionStore)
+        """
+        self.engine = engine
+        self.sessions = sessions or SessionStore()
+        self.max_queue = SERVER_MAX_QUEUE if max_queue is None else max_queue
+        self.request_timeout = request_timeout or SERVER_REQUEST_TIMEOUT
+        self.capacity = engine.max_llm_concurrency + self.max_queue
+        self.stats = {"requests": 0, "rejected": 0, "timeouts": 0, "errors": 0, "completed": 0}
+        self.inflight = 0
+        self._lock = threading.Lock()
+
+        self.loop = _event_loop()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._serve_thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _admit(self) -> bool:
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.inflight >= self.capacity:
+                self.stats["rejected"] += 1
+                return False
+            self.inflight += 1
+            return True
+
+    def _release(self, outcome: str):
+        with self._lock:
+            self.inflight -= 1
+            self.stats[outcome] += 1
+
+    async def _answer(self, question: str, session, tokens: "queue.Queue"):
+        """Run one query on the event loop, handing tokens to the request thread."""
+        try:
+            async for token in self.engine.astream(question, session):
+                if token:
+                    tokens.put(("token", token))
+            tokens.put(("done", None))
+        except asyncio.CancelledError:
+            tokens.put(("error", "cancelled"))
+            raise
+        except Exception as e:
+            tokens.put(("error", str(e)))
+
+    def stream_answer(self, question: str, session_id: Optional[str] = None):
+        """
+        Yield ("session", id), then ("token", text)... and finally ("done", None)
+        or ("error", message), enforcing the request timeout.
+        """
+        session = self.sessions.get(session_id)
+        yield "session", session.session_id
+        tokens: "queue.Queue" = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._answer(question, session, tokens), self.loop)
+        deadline = time.monotonic() + self.request_timeout
+        try:
+            while True:
+                try:
+                    kind, value = tokens.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    future.cancel()
+                    yield "error", "timeout"
+                    return
+                yield kind, value
+                if kind != "token":
+                    return
+        finally:
+            # Client went away or the request ended: stop generating
+            future.cancel()
+
+    def health(self) -> Dict:
+        return {
+            "status": "ok" if self.engine.query_engine is not None else "loading",
+            "inflight": self.inflight,
+            "capacity": self.capacity,
+            "sessions": len(self.sessions)
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_body(self) -> bytes:
+                # Read the body whatever the route: left unread, it would be
+                # parsed as the next request on this keep-alive connection
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    self.close_connection = True
+                    return b""
+                return self.rfile.read(length)
+
+            def _write_chunk(self, text: str):
+                data = text.encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _send_event(self, event: Optional[str], payload: Dict):
+                message = f"event: {event}\n" if event else ""
+                self._write_chunk(message + f"data: {json.dumps(payload)}\n\n")
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self._send_json(200, server.health())
+                elif self.path == "/stats":
+                    self._send_json(200, {
+                        "server": dict(server.stats, inflight=server.inflight),
+                        "answer_cache": server.engine.cache_stats(),
+                        "rewrites": dict(server.engine.condense_stats),
+                        "llm_usage": dict(server.engine.usage_stats),
+                        "llm_transport": llm_transport_metrics(),
+                        "shards": server.engine.shards.stats() if server.engine.shards else None,
+                        "trace": tracer.snapshot() if tracer.enabled else None
+                    })
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_DELETE(self):
+                self._read_body()
+                if self.path.startswith("/sessions/"):
+                    deleted = server.sessions.delete(self.path[len("/sessions/"):])
+                    self._send_json(200 if deleted else 404, {"deleted": deleted})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                body = self._read_body()
+                if self.path != "/query":
+                    self._send_json(404, {"error": "not found"})
+                    return
+                try:
+                    request = json.loads(body or b"{}")
+                    question = str(request["question"]).strip()
+                except (ValueError, KeyError, TypeError):
+                    self._send_json(400, {"error": "expected a JSON body with a 'question'"})
+                    return
+                if not question:
+                    self._send_json(400, {"error": "empty question"})
+                    return
+
+                if not server._admit():
+                    self._send_json(503, {"error": "server busy, retry later"}, {"Retry-After": "1"})
+                    return
+                self.released = False
+                try:
+                    events = server.stream_answer(question, request.get("session_id"))
+                    if request.get("stream", True):
+                        self._stream(events)
+                    else:
+                        self._respond(events)
+                finally:
+                    self._finish("errors")
+
+            def _finish(self, outcome: str):
+                # Free the slot before the last bytes go out, so a client's
+                # next request never finds its previous one still counted
+                if not self.released:
+                    self.released = True
+                    server._release(outcome)
+
+            def _respond(self, events):
+                answer = []
+                session_id = None
+                for kind, value in events:
+                    if kind == "session":
+                        session_id = value
+                    elif kind == "token":
+                        answer.append(value)
+                    elif kind == "done":
+                        self._finish("completed")
+                        self._send_json(200, {"session_id": session_id, "answer": "".join(answer)})
+                        return
+                    else:
+                        timeout = value == "timeout"
+                        self._finish("timeouts" if timeout else "errors")
+                        self._send_json(504 if timeout else 500, {"session_id": session_id, "error": value})
+                        return
+
+            def _stream(self, events):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                outcome = "errors"
+                try:
+                    for kind, value in events:
+                        if kind == "session":
+                            self._send_event("session", {"session_id": value})
+                        elif kind == "token":
+                            self._send_event(None, {"token": value})
+                        elif kind == "done":
+                            self._send_event("done", {})
+                            outcome = "completed"
+                        else:
+                            self._send_event("error", {"error": value})
+                            outcome = "timeouts" if value == "timeout" else "errors"
+                    self._finish(outcome)
+                    self._write_chunk("")
+                except (BrokenPipeError, ConnectionResetError):
+                    events.close()
+                    self.close_connection = True
+                    self._finish(outcome)
+
+        return Handler
+
+    def start(self) -> "RAGServer":
+        """Serve on a background thread."""
+        self._serve_thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._serve_thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
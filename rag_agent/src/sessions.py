@@ -0,0 +1,87 @@
+"""Per-conversation state, kept outside the QueryEngine so sessions can share one engine."""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from llama_index.core.llms import ChatMessage, MessageRole
+from .config import SESSION_MAX, SESSION_TTL
+from .memory import ConversationMemory
+
+
+class ConversationSession:
+    """Chat memory of one conversation (see `ConversationMemory`)."""
+
+    def __init__(self, session_id: Optional[str] = None):
+        self.session_id = session_id or uuid.uuid4().hex
+        self.memory = ConversationMemory()
+        self.last_usage: Dict[str, int] = {}
+        self.last_used = time.time()
+        self._lock = threading.Lock()
+
+    @property
+    def history(self) -> List[ChatMessage]:
+        """Turns kept verbatim, as chat messages."""
+        with self._lock:
+            return self.memory.history()
+
+    @history.setter
+    def history(self, messages: List[ChatMessage]):
+        with self._lock:
+            self.memory.clear()
+            questions = [m.content for m in messages if m.role == MessageRole.USER]
+            answers = [m.content for m in messages if m.role == MessageRole.ASSISTANT]
+            for question, answer in zip(questions, answers):
+                self.memory.add_turn(question, answer)
+
+    def context(self) -> List[ChatMessage]:
+        """Token-budgeted history for rewriting a follow-up question."""
+        with self._lock:
+            return self.memory.messages()
+
+    def add_turn(self, question: str, answer: str):
+        with self._lock:
+            self.memory.add_turn(question, answer)
+            self.last_used = time.time()
+
+    def clear(self):
+        with self._lock:
+            self.memory.clear()
+
+
+class SessionStore:
+    """Sessions by id, dropping idle ones after `ttl_seconds` and the oldest beyond `max_sessions`."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_sessions: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds or SESSION_TTL
+        self.max_sessions = max_sessions or SESSION_MAX
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: Optional[str] = None) -> ConversationSession:
+        """Return the session with this id, creating it (or a new id) if needed."""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = ConversationSession(session_id)
+                self._sessions[session.session_id] = session
+                # Only a new session can push the store past its size
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session.session_id)
+            session.last_used = time.time()
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        for session_id in [sid for sid, s in self._sessions.items() if s.last_used < cutoff]:
+            del self._sessions[session_id]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
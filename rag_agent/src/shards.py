@@ -0,0 +1,295 @@
+"""Named index shards: layout, centroid routing and parallel fan-out retrieval."""
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from llama_index.core import QueryBundle
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore
+
+from .ann import IVFFlatIndex
+from .graph_retriever import GraphExpandedRetriever
+from .hybrid_retriever import HybridRetriever, fuse_rankings
+from .tracing import tracer
+
+
+# The unsharded index at the storage root is the shard of this name
+DEFAULT_SHARD = "default"
+SHARDS_SUBDIR = "shards"
+ROUTER_FILE = "router.npy"
+
+# Rows sampled from a shard's embeddings to cluster into its router centroids
+ROUTER_SAMPLE_ROWS = 4096
+ROUTER_CENTROIDS = 8
+
+_SHARD_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]*$")
+
+
+def shard_dir(storage_dir: str, name: str) -> str:
+    """Directory of shard `name`: `<storage_dir>/shards/<name>`, or `storage_dir` itself for "default"."""
+    if name == DEFAULT_SHARD:
+        return storage_dir
+    if not _SHARD_NAME.match(name):
+        raise ValueError(f"Invalid shard name: {name!r} (use letters, digits, '.', '_' and '-')")
+    return os.path.join(storage_dir, SHARDS_SUBDIR, name)
+
+
+def _has_index(path: str) -> bool:
+    return os.path.exists(os.path.join(path, "docstore.json"))
+
+
+def list_shards(storage_dir: str) -> List[str]:
+    """Names of the shards with a persisted index ("default" first if the root index exists)."""
+    names = [DEFAULT_SHARD] if _has_index(storage_dir) else []
+    root = os.path.join(storage_dir, SHARDS_SUBDIR)
+    if os.path.isdir(root):
+        # Rebuilds in progress (".<name>.rebuild") are not valid shard names
+        names.extend(sorted(
+            name for name in os.listdir(root)
+            if _SHARD_NAME.match(name) and _has_index(os.path.join(root, name))
+        ))
+    return names
+
+
+def sample_embeddings(vector_store, limit: int = ROUTER_SAMPLE_ROWS, seed: int = 0) -> Optional[np.ndarray]:
+    """Up to `limit` embeddings from a NumpyVectorStore or SimpleVectorStore, or None if there are none."""
+    if hasattr(vector_store, "sample_rows"):
+        return vector_store.sample_rows(limit, seed=seed)
+    embeddings = getattr(getattr(vector_store, "data", None), "embedding_dict", None)
+    if not embeddings:
+        return None
+    keys = list(embeddings)
+    if len(keys) > limit:
+        rng = np.random.default_rng(seed)
+        keys = [keys[i] for i in rng.choice(len(keys), size=limit, replace=False)]
+    return np.asarray([embeddings[key] for key in keys], dtype=np.float32)
+
+
+def save_router(path: str, embeddings: Optional[np.ndarray]):
+    """
+    Persist the routing centroids of the shard in `path`.
+
+    Up to ROUTER_CENTROIDS spherical k-means centroids of a sample of the
+    shard's embeddings, so a shard covering a few sub-topics is still
+    found by a question about any of them.
+    """
+    router_path = os.path.join(path, ROUTER_FILE)
+    if embeddings is None or len(embeddings) == 0:
+        if os.path.exists(router_path):
+            os.remove(router_path)
+        return
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    clusters = IVFFlatIndex(nlist=min(ROUTER_CENTROIDS, len(embeddings)))
+    clusters.build(embeddings / norms)
+    tmp_path = f"{router_path}.tmp.npy"
+    np.save(tmp_path, clusters.centroids)
+    os.replace(tmp_path, router_path)
+
+
+def load_router(path: str) -> Optional[np.ndarray]:
+    router_path = os.path.join(path, ROUTER_FILE)
+    return np.load(router_path) if os.path.exists(router_path) else None
+
+
+class ShardSet:
+    """
+    The shards of one storage directory, each loaded on first use.
+
+    Only the routers (a few centroids per shard) are read up front; a
+    shard's index, BM25 index and graph are loaded the first time a query
+    is sent to it, by `load_indexer(name)`, and its retriever is built by
+    `make_retriever(indexer)`.
+    """
+
+    def __init__(
+        self,
+        storage_dir: str,
+        names: List[str],
+        load_indexer: Callable[[str], object],
+        make_retriever: Callable[[object], BaseRetriever],
+        routing: str = "all",
+        route_top: int = 2
+    ):
+        """
+        Args:
+            storage_dir: Storage root holding the shards
+            names: Shards to query
+            load_indexer: Returns a loaded indexer for a shard name
+            make_retriever: Builds the retriever for a loaded indexer
+            routing: "all" (every shard) or "centroid" (the `route_top` closest shards)
+            route_top: Shards queried per question with centroid routing
+        """
+        if routing not in ("all", "centroid"):
+            raise ValueError(f"Unknown shard routing: {routing}")
+        self.storage_dir = storage_dir
+        self.names = list(names)
+        self.load_indexer = load_indexer
+        self.make_retriever = make_retriever
+        self.routing = routing
+        self.route_top = route_top
+        self.routers = {name: load_router(shard_dir(storage_dir, name)) for name in self.names}
+        self.indexers: Dict[str, object] = {}
+        self.retrievers: Dict[str, BaseRetriever] = {}
+        self.queries: Dict[str, int] = {name: 0 for name in self.names}
+        self._locks = {name: threading.Lock() for name in self.names}
+        self._stats_lock = threading.Lock()
+
+    def route(self, embedding: Optional[List[float]]) -> List[str]:
+        """Shards to query for a question embedding (all of them without centroid routing)."""
+        if self.routing == "all" or embedding is None or len(self.names) <= self.route_top:
+            return list(self.names)
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        scores = {}
+        for name, centroids in self.routers.items():
+            # Shards without a router (built before routing existed) are always queried
+            scores[name] = float(np.max(centroids @ query)) if centroids is not None else np.inf
+        return sorted(self.names, key=scores.get, reverse=True)[:self.route_top]
+
+    def retriever(self, name: str) -> BaseRetriever:
+        """The shard's retriever, loading the shard if this is its first query."""
+        retriever = self.retrievers.get(name)
+        if retriever is None:
+            with self._locks[name]:
+                retriever = self.retrievers.get(name)
+                if retriever is None:
+                    start = time.perf_counter()
+                    indexer = self.load_indexer(name)
+                    retriever = self.make_retriever(indexer)
+                    tracer.record("query.shard_load", time.perf_counter() - start, {"shards": 1})
+                    self.indexers[name] = indexer
+                    self.retrievers[name] = retriever
+        # Called from the fan-out threads
+        with self._stats_lock:
+            self.queries[name] += 1
+        return retriever
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._stats_lock:
+            return {
+                name: {"loaded": name in self.retrievers, "queries": self.queries[name]}
+                for name in self.names
+            }
+
+
+class ShardedRetriever(BaseRetriever):
+    """
+    Fans a query out to the routed shards in parallel and merges their hits.
+
+    Fused scores only reflect ranks within one shard, so every shard's
+    best hit would tie; instead the shards' candidates are merged before
+    fusion, as if the shards were one index. Dense candidates are ranked
+    by their cosine scores (one embedding model for every shard). BM25
+    scores each shard's rows with the query terms' statistics summed over
+    the routed shards, so lexical scores are those of the union too. The
+    merged rankings are fused (hybrid retrieval) and cut to the shards'
+    `similarity_top_k`, each shard's share of the hits is expanded over
+    that shard's entity graph, and the result is cut to `top_k`.
+    """
+
+    def __init__(self, shards: ShardSet, top_k: int, max_workers: int = 4):
+        """
+        Args:
+            shards: The shards to search
+            top_k: Nodes returned after merging
+            max_workers: Shards searched at once
+        """
+        super().__init__()
+        self.shards = shards
+        self.top_k = top_k
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="shard")
+
+    def _map(self, fn: Callable, items: List) -> List:
+        if len(items) == 1:
+            return [fn(items[0])]
+        return list(self._pool.map(fn, items))
+
+    def _dense(self, name: str, query_bundle: QueryBundle):
+        """The shard's retriever, its retriever before graph expansion, dense hits and BM25 statistics."""
+        retriever = self.shards.retriever(name)
+        base = retriever.base_retriever if isinstance(retriever, GraphExpandedRetriever) else retriever
+        if isinstance(base, HybridRetriever):
+            hits = base.vector_retriever.retrieve(query_bundle)
+            return retriever, base, hits, base.bm25.term_stats(query_bundle.query_str)
+        return retriever, base, base.retrieve(query_bundle), None
+
+    @staticmethod
+    def _sum_stats(stats: List) -> Tuple[int, float, Dict[str, int]]:
+        n_rows, total_length, dfs = 0, 0.0, {}
+        for rows, length, shard_dfs in stats:
+            n_rows += rows
+            total_length += length
+            for term, df in shard_dfs.items():
+                dfs[term] = dfs.get(term, 0) + df
+        return n_rows, total_length, dfs
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        names = self.shards.route(query_bundle.embedding)
+        with tracer.span("query.shards") as span:
+            span.add(shards=len(names))
+            return self._search(names, query_bundle)
+
+    def _search(self, names: List[str], query_bundle: QueryBundle) -> List[NodeWithScore]:
+        shards = self._map(lambda name: self._dense(name, query_bundle), names)
+        retrievers = {name: retriever for name, (retriever, _, _, _) in zip(names, shards)}
+        bases = {name: base for name, (_, base, _, _) in zip(names, shards)}
+        owner: Dict[str, str] = {}
+        dense: List[NodeWithScore] = []
+        for name, (_, _, hits, _) in zip(names, shards):
+            for hit in hits:
+                owner[hit.node.node_id] = name
+                dense.append(hit)
+        dense.sort(key=lambda hit: hit.score or 0.0, reverse=True)
+
+        first = bases[names[0]]
+        if isinstance(first, HybridRetriever):
+            # The depth each shard's dense ranking has in a single index
+            dense = dense[:first.vector_retriever.similarity_top_k]
+            depth = max(len(dense), first.similarity_top_k)
+            stats = self._sum_stats([shard_stats for _, _, _, shard_stats in shards])
+            searched = self._map(
+                lambda name: bases[name].bm25.search(query_bundle.query_str, depth, stats=stats), names
+            )
+            lexical = []
+            for name, pairs in zip(names, searched):
+                for node_id, score in pairs:
+                    owner.setdefault(node_id, name)
+                    lexical.append((node_id, score))
+            lexical.sort(key=lambda pair: pair[1], reverse=True)
+            top = fuse_rankings(
+                [hit.node.node_id for hit in dense], [node_id for node_id, _ in lexical[:depth]],
+                first.similarity_top_k, first.rrf_k
+            )
+        else:
+            top = [(hit.node.node_id, hit.score or 0.0) for hit in dense[:first.similarity_top_k]]
+
+        # Nodes of the fused hits, fetched from their shard's docstore if only BM25 found them
+        nodes = {hit.node.node_id: hit.node for hit in dense}
+        missing: Dict[str, List[str]] = {}
+        for node_id, _ in top:
+            if node_id not in nodes:
+                missing.setdefault(owner[node_id], []).append(node_id)
+        for name, node_ids in missing.items():
+            nodes.update((node.node_id, node) for node in bases[name].docstore.get_nodes(node_ids, raise_error=False))
+        by_shard: Dict[str, List[NodeWithScore]] = {}
+        for node_id, score in top:
+            if node_id in nodes:
+                by_shard.setdefault(owner[node_id], []).append(NodeWithScore(node=nodes[node_id], score=score))
+
+        merged: Dict[str, NodeWithScore] = {}
+        for name, hits in by_shard.items():
+            retriever = retrievers[name]
+            if isinstance(retriever, GraphExpandedRetriever):
+                hits = retriever.expand(hits)
+            for hit in hits:
+                seen = merged.get(hit.node.node_id)
+                if seen is None or (hit.score or 0.0) > (seen.score or 0.0):
+                    merged[hit.node.node_id] = hit
+        return sorted(merged.values(), key=lambda hit: hit.score or 0.0, reverse=True)[:self.top_k]
@@ -0,0 +1,42 @@
+"""Startup timing breakdown for the query CLIs."""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class StartupTimer:
+    """Records how long each startup stage took, measured from process start."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, stage: str):
+        """Time the enclosed block as `stage` (first measurement wins)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages.setdefault(stage, seconds)
+
+    def mark(self, stage: str):
+        """Record the time elapsed since process start, e.g. for first answer."""
+        self.record(stage, time.perf_counter() - self.start)
+
+    def report(self) -> str:
+        """Multi-line breakdown, in the order stages were recorded."""
+        lines = ["Startup timings:"]
+        for stage, seconds in self.stages.items():
+            lines.append(f"  {stage:<24}{seconds * 1000:>10.1f} ms")
+        return "\n".join(lines)
+
+
+# Shared by every module in the process; created on first import of src
+startup_timer = StartupTimer()
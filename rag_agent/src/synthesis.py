@@ -0,0 +1,218 @@
+"""Answer synthesizers: one token-budgeted prompt ("packed" mode) and a parallel tree_summarize."""
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from llama_index.core.node_parser import TokenTextSplitter
+from llama_index.core.prompts import PromptTemplate
+from llama_index.core.response_synthesizers import SimpleSummarize, TreeSummarize
+from llama_index.core.types import RESPONSE_TEXT_TYPE
+from llama_index.core.utilities.token_counting import TokenCounter
+
+from .config import LLM_MAX_CONCURRENCY, SYNTHESIS_NOTES_TOKENS, SYNTHESIS_TOKEN_BUDGET
+
+
+NOTES_PROMPT = PromptTemplate(
+    "Context information is below.\n"
+    "---------------------\n"
+    "{context_str}\n"
+    "---------------------\n"
+    "List, as short notes, only the facts from the context that help answer "
+    "the question. Reply NONE if nothing is relevant.\n"
+    "Question: {query_str}\n"
+    "Notes: "
+)
+
+
+def pack_chunks(
+    chunks: Sequence[str],
+    budget: int,
+    count_tokens: Callable[[str], int],
+    reserve: int = 0
+) -> Tuple[List[str], List[List[str]]]:
+    """
+    Pack retrieved chunks (best first) into one prompt's worth of context.
+
+    Args:
+        chunks: Chunk texts, each at most `budget` tokens
+        budget: Context tokens allowed in one prompt
+        count_tokens: Token counter
+        reserve: Tokens kept free for overflow notes when not everything fits
+
+    Returns:
+        (chunks for the answer prompt, groups of the remaining chunks of at most `budget` tokens each)
+    """
+    sizes = [count_tokens(chunk) for chunk in chunks]
+    if sum(sizes) <= budget:
+        return list(chunks), []
+
+    packed, rest, used = [], [], 0
+    for chunk, size in zip(chunks, sizes):
+        # First fit in rank order: a smaller, lower-ranked chunk may still fit
+        if used + size <= budget - reserve:
+            packed.append(chunk)
+            used += size
+        else:
+            rest.append((chunk, size))
+
+    groups: List[List[str]] = []
+    group_size = budget + 1
+    for chunk, size in rest:
+        if group_size + size > budget:
+            groups.append([])
+            group_size = 0
+        groups[-1].append(chunk)
+        group_size += size
+    return packed, groups
+
+
+class PackedSynthesizer(SimpleSummarize):
+    """
+    Answer with a single LLM call over as much retrieved context as fits a token budget.
+
+    Unlike tree_summarize, which may summarize chunk groups and then the
+    summaries in sequential rounds, the retrieved chunks are packed best
+    first into one prompt of at most `token_budget` context tokens. Chunks
+    that do not fit are condensed into short notes by concurrent LLM calls
+    and the notes are appended to the prompt, so the answer costs at most
+    two sequential LLM round trips.
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        notes_tokens: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        **kwargs: Any
+    ):
+        """
+        Args:
+            token_budget: Context tokens in the answer prompt (default: SYNTHESIS_TOKEN_BUDGET,
+                capped by the LLM's context window)
+            notes_tokens: Part of the budget kept for notes on overflow chunks
+                (default: SYNTHESIS_NOTES_TOKENS)
+            max_concurrency: Overflow notes generated at once (default: LLM_MAX_CONCURRENCY)
+            **kwargs: Passed to SimpleSummarize (llm, streaming, text_qa_template, ...)
+        """
+        super().__init__(**kwargs)
+        self.token_budget = token_budget or SYNTHESIS_TOKEN_BUDGET
+        self.notes_tokens = SYNTHESIS_NOTES_TOKENS if notes_tokens is None else notes_tokens
+        self.max_concurrency = max_concurrency or LLM_MAX_CONCURRENCY
+        self._counter = TokenCounter()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def _budget(self, query_str: str) -> int:
+        """Context tokens available once the template, question and answer are accounted for."""
+        template = self._text_qa_template.format(context_str="", query_str=query_str)
+        available = (
+            self._prompt_helper.context_window
+            - self._prompt_helper.num_output
+            - self._counter.get_string_tokens(template)
+        )
+        return max(1, min(self.token_budget, available))
+
+    def _pack(self, query_str: str, text_chunks: Sequence[str]) -> Tuple[int, List[str], List[List[str]]]:
+        budget = self._budget(query_str)
+        splitter = TokenTextSplitter(chunk_size=budget, chunk_overlap=0)
+        pieces = []
+        for chunk in text_chunks:
+            if self._counter.get_string_tokens(chunk) > budget:
+                pieces.extend(splitter.split_text(chunk))
+            else:
+                pieces.append(chunk)
+        reserve = min(self.notes_tokens, budget // 2)
+        packed, overflow = pack_chunks(pieces, budget, self._counter.get_string_tokens, reserve)
+        return budget, packed, overflow
+
+    def _context(self, budget: int, packed: List[str], notes: List[str]) -> str:
+        context = "\n\n".join(packed)
+        notes = [n.strip() for n in notes if n and n.strip() and n.strip().upper() != "NONE"]
+        if notes:
+            room = budget - self._counter.get_string_tokens(context)
+            if room > 0:
+                text = "\n".join(notes)
+                if self._counter.get_string_tokens(text) > room:
+                    text = TokenTextSplitter(chunk_size=room, chunk_overlap=0).split_text(text)[0]
+                context += "\n\nNotes from further sources:\n" + text
+        return context
+
+    def _note(self, query_str: str, group: List[str]) -> str:
+        return self._llm.predict(NOTES_PROMPT, context_str="\n\n".join(group), query_str=query_str)
+
+    def _notes(self, query_str: str, groups: List[List[str]]) -> List[str]:
+        if not groups:
+            return []
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        # Each call runs in a copy of the caller's context so per-query usage tracking sees it
+        futures = [
+            self._pool.submit(contextvars.copy_context().run, self._note, query_str, group)
+            for group in groups
+        ]
+        return [f.result() for f in futures]
+
+    async def _anotes(self, query_str: str, groups: List[List[str]]) -> List[str]:
+        slots = asyncio.Semaphore(self.max_concurrency)
+
+        async def note(group: List[str]) -> str:
+            async with slots:
+                return await self._llm.apredict(NOTES_PROMPT, context_str="\n\n".join(group), query_str=query_str)
+
+        return list(await asyncio.gather(*(note(group) for group in groups)))
+
+    def get_response(self, query_str: str, text_chunks: Sequence[str], **kwargs: Any) -> RESPONSE_TEXT_TYPE:
+        budget, packed, overflow = self._pack(query_str, text_chunks)
+        context = self._context(budget, packed, self._notes(query_str, overflow))
+        if not self._streaming:
+            return self._llm.predict(self._text_qa_template, context_str=context, query_str=query_str, **kwargs) \
+                or "Empty Response"
+        return self._llm.stream(self._text_qa_template, context_str=context, query_str=query_str, **kwargs)
+
+    async def aget_response(self, query_str: str, text_chunks: Sequence[str], **kwargs: Any) -> RESPONSE_TEXT_TYPE:
+        budget, packed, overflow = self._pack(query_str, text_chunks)
+        notes = await self._anotes(query_str, overflow) if overflow else []
+        context = self._context(budget, packed, notes)
+        if not self._streaming:
+            return await self._llm.apredict(
+                self._text_qa_template, context_str=context, query_str=query_str, **kwargs
+            ) or "Empty Response"
+        return await self._llm.astream(self._text_qa_template, context_str=context, query_str=query_str, **kwargs)
+
+
+class ParallelTreeSummarize(TreeSummarize):
+    """
+    tree_summarize whose per-group summaries run concurrently.
+
+    LlamaIndex's synchronous tree_summarize summarizes the repacked chunk
+    groups one after another before the final round; here they are
+    dispatched together on a thread pool (the async path already gathers
+    them), so a round costs one LLM round trip however many groups it has.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, **kwargs: Any):
+        """
+        Args:
+            max_concurrency: Group summaries generated at once (default: LLM_MAX_CONCURRENCY)
+            **kwargs: Passed to TreeSummarize (llm, streaming, summary_template, ...)
+        """
+        super().__init__(**kwargs)
+        self.max_concurrency = max_concurrency or LLM_MAX_CONCURRENCY
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def get_response(self, query_str: str, text_chunks: Sequence[str], **kwargs: Any) -> RESPONSE_TEXT_TYPE:
+        summary_template = self._summary_template.partial_format(query_str=query_str)
+        text_chunks = self._prompt_helper.repack(summary_template, text_chunks=text_chunks, llm=self._llm)
+        if len(text_chunks) == 1 or self._output_cls is not None:
+            return super().get_response(query_str, text_chunks, **kwargs)
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        futures = [
+            self._pool.submit(
+                contextvars.copy_context().run,
+                self._llm.predict, summary_template, context_str=chunk, **kwargs
+            )
+            for chunk in text_chunks
+        ]
+        return self.get_response(query_str, [f.result() for f in futures], **kwargs)
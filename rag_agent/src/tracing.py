@@ -0,0 +1,221 @@
+"""Per-stage spans and counters for profiling index builds and queries."""
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from .config import TRACE_ENABLED, TRACE_SINK
+
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class _NullSpan:
+    """What `Tracer.span` returns while tracing is off: does nothing, allocates nothing."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, **counts):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """Times the enclosed block; `add` attaches counts (tokens, chunks, ...) to it."""
+
+    __slots__ = ("tracer", "name", "start", "counts")
+
+    def __init__(self, tracer: "Tracer", name: str):
+        self.tracer = tracer
+        self.name = name
+        self.counts: Optional[Dict[str, float]] = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, time.perf_counter() - self.start, self.counts)
+        return False
+
+    def add(self, **counts):
+        if self.counts is None:
+            self.counts = {}
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+
+class Stage:
+    """Aggregate of one span name: calls, latency histogram, recent samples and counters."""
+
+    def __init__(self, window: int = 2048):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.counters: Dict[str, float] = {}
+
+    def observe(self, seconds: Optional[float], counts: Optional[Dict[str, float]]):
+        if seconds is not None:
+            self.calls += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            ms = seconds * 1000
+            bucket = 0
+            while bucket < len(BUCKETS_MS) and ms > BUCKETS_MS[bucket]:
+                bucket += 1
+            self.buckets[bucket] += 1
+            self.samples.append(ms)
+        if counts:
+            for key, value in counts.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def as_dict(self) -> Dict:
+        stats = {"calls": self.calls, "counters": dict(self.counters)}
+        if self.calls:
+            # Imported here so the CLI's `--help` does not wait for NumPy
+            import numpy as np
+            p50, p95, p99 = np.percentile(np.array(self.samples), [50, 95, 99])
+            stats.update(
+                total_ms=round(self.total * 1000, 3),
+                mean_ms=round(self.total * 1000 / self.calls, 3),
+                p50_ms=round(float(p50), 3),
+                p95_ms=round(float(p95), 3),
+                p99_ms=round(float(p99), 3),
+                max_ms=round(self.max * 1000, 3),
+                histogram={"le_ms": list(BUCKETS_MS) + ["inf"], "counts": list(self.buckets)}
+            )
+        return stats
+
+
+class Tracer:
+    """
+    Named spans and counters, aggregated per name.
+
+    Stage names are dotted paths ("query.retrieve", "index.embed"), so the
+    report groups them by prefix. While tracing is disabled, `span` returns
+    a shared no-op object and `record`/`count` return at once, so
+    instrumented hot paths pay one attribute check.
+
+    With a sink path, `flush` appends one JSON line per stage (calls,
+    counters, latency percentiles and histogram) to that file; it is also
+    called at exit.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sink_path: Optional[str] = None
+        self.stages: Dict[str, Stage] = {}
+        self.run_id = f"{int(time.time())}-{os.getpid()}"
+        self._lock = threading.Lock()
+        self._atexit = False
+
+    def enable(self, sink_path: Optional[str] = None):
+        """Start collecting; with `sink_path`, stage aggregates are appended there as JSON lines."""
+        self.enabled = True
+        if sink_path:
+            self.sink_path = sink_path
+            if not self._atexit:
+                atexit.register(self.flush)
+                self._atexit = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+
+    def span(self, name: str):
+        """Context manager timing the enclosed block as stage `name`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name)
+
+    def record(self, name: str, seconds: Optional[float], counts: Optional[Dict[str, float]] = None):
+        """Add one timing (and counts) to stage `name`, e.g. for spans that cross a `yield`."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = Stage()
+            stage.observe(seconds, counts)
+
+    def count(self, name: str, **counts):
+        """Add to stage `name`'s counters without a timing (cache hits, tokens, ...)."""
+        if self.enabled:
+            self.record(name, None, counts)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: stage.as_dict() for name, stage in self.stages.items()}
+
+    def report(self) -> str:
+        """Multi-line per-stage breakdown, grouped by name prefix."""
+        stages = self.snapshot()
+        if not stages:
+            return "Profile: no stages recorded"
+        lines = [
+            "Profile:",
+            f"  {'stage':<28}{'calls':>7}{'total ms':>11}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"
+        ]
+        shown = set()
+        for name in sorted(stages):
+            # Group headers for prefixes without a stage of their own (e.g. "index")
+            parts = name.split(".")
+            for depth in range(len(parts) - 1):
+                prefix = ".".join(parts[:depth + 1])
+                if prefix not in stages and prefix not in shown:
+                    shown.add(prefix)
+                    lines.append(f"  {'  ' * depth + parts[depth]}")
+            stats = stages[name]
+            label = "  " * (len(parts) - 1) + parts[-1]
+            if stats["calls"]:
+                lines.append(
+                    f"  {label:<28}{stats['calls']:>7}{stats['total_ms']:>11.1f}{stats['mean_ms']:>10.2f}"
+                    f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['max_ms']:>10.2f}"
+                )
+            else:
+                lines.append(f"  {label:<28}")
+            counters = ", ".join(f"{key} {value:g}" for key, value in sorted(stats["counters"].items()))
+            if counters:
+                lines.append(f"  {'':<28}{counters}")
+        return "\n".join(lines)
+
+    def flush(self):
+        """Append the current aggregates to the sink file (no-op without one)."""
+        if not self.sink_path:
+            return
+        stages = self.snapshot()
+        if not stages:
+            return
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        lines: List[str] = [
+            json.dumps({"time": timestamp, "run": self.run_id, "stage": name, **stats})
+            for name, stats in sorted(stages.items())
+        ]
+        directory = os.path.dirname(self.sink_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.sink_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+# Shared by every module in the process, like `startup_timer`
+tracer = Tracer()
+if TRACE_ENABLED:
+    tracer.enable(TRACE_SINK or None)
@@ -0,0 +1,132 @@
+"""Per-query accounting of LLM calls and prompt tokens."""
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+from llama_index.core.callbacks import CBEventType, EventPayload
+from llama_index.core.callbacks.base_handler import BaseCallbackHandler
+from llama_index.core.utilities.token_counting import TokenCounter
+
+
+class LLMUsage:
+    """LLM calls and (estimated) prompt tokens spent on one query."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self._prompts: List[str] = []
+        self._lock = threading.Lock()
+
+    def record_prompt(self, prompt: str, tokens: int):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += tokens
+            self._prompts.append(prompt)
+
+    def record_messages(self, messages: List[Any], tokens: int):
+        with self._lock:
+            # Completion LLMs built on chat (e.g. Ollama) report the same
+            # request again as a one-message chat; count it once
+            if len(messages) == 1 and messages[0].content in self._prompts:
+                self._prompts.remove(messages[0].content)
+                return
+            self.calls += 1
+            self.prompt_tokens += tokens
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"llm_calls": self.calls, "prompt_tokens": self.prompt_tokens}
+
+
+_current: "contextvars.ContextVar[Optional[LLMUsage]]" = contextvars.ContextVar("llm_usage", default=None)
+
+T = TypeVar("T")
+
+
+@contextmanager
+def track_llm_usage(usage: Optional[LLMUsage] = None) -> Iterator[LLMUsage]:
+    """
+    Count the LLM calls made inside the block (including worker threads
+    started with a copy of the context, and asyncio tasks) into `usage`,
+    or a new `LLMUsage`.
+
+    The block must not contain a `yield`: between two steps of a
+    generator its caller's code runs in the same context, and would be
+    counted too. Generators open one block per step with the same
+    `usage`, and iterate token streams with `iter_with_usage`.
+    """
+    usage = usage if usage is not None else LLMUsage()
+    token = _current.set(usage)
+    try:
+        yield usage
+    finally:
+        _current.reset(token)
+
+
+def iter_with_usage(usage: LLMUsage, items: Iterable[T]) -> Iterator[T]:
+    """Iterate `items`, counting the LLM calls made while producing each one into `usage`."""
+    iterator = iter(items)
+    while True:
+        with track_llm_usage(usage):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+async def aiter_with_usage(usage: LLMUsage, items: AsyncIterable[T]) -> AsyncIterator[T]:
+    """Async `iter_with_usage`."""
+    iterator = items.__aiter__()
+    while True:
+        with track_llm_usage(usage):
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+        yield item
+
+
+class LLMUsageHandler(BaseCallbackHandler):
+    """Callback handler feeding LLM events into the active `track_llm_usage` block."""
+
+    def __init__(self):
+        super().__init__(event_starts_to_ignore=[], event_ends_to_ignore=[])
+        self._counter = TokenCounter()
+
+    def on_event_start(
+        self,
+        event_type: CBEventType,
+        payload: Optional[Dict[str, Any]] = None,
+        event_id: str = "",
+        parent_id: str = "",
+        **kwargs: Any
+    ) -> str:
+        usage = _current.get()
+        if usage is None or event_type != CBEventType.LLM or not payload:
+            return event_id
+        if EventPayload.PROMPT in payload:
+            prompt = str(payload[EventPayload.PROMPT])
+            usage.record_prompt(prompt, self._counter.get_string_tokens(prompt))
+        elif EventPayload.MESSAGES in payload:
+            messages = list(payload[EventPayload.MESSAGES])
+            usage.record_messages(messages, self._counter.estimate_tokens_in_messages(messages))
+        return event_id
+
+    def on_event_end(
+        self,
+        event_type: CBEventType,
+        payload: Optional[Dict[str, Any]] = None,
+        event_id: str = "",
+        **kwargs: Any
+    ) -> None:
+        pass
+
+    def start_trace(self, trace_id: Optional[str] = None) -> None:
+        pass
+
+    def end_trace(self, trace_id: Optional[str] = None, trace_map: Optional[Dict[str, List[str]]] = None) -> None:
+        pass
+
+
+usage_handler = LLMUsageHandler()
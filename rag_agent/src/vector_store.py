@@ -0,0 +1,330 @@
+"""Memory-mapped NumPy vector store for LlamaIndex."""
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import fsspec
+import numpy as np
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+from pydantic import PrivateAttr
+
+from .ann import IVFFlatIndex
+from .quantization import QUANTIZERS, Quantizer, get_quantizer
+
+
+DEFAULT_NAMESPACE = "default"
+VECTOR_STORE_STEM = "vector_store"
+
+
+def vector_store_paths(persist_dir: str, namespace: str = DEFAULT_NAMESPACE) -> Tuple[str, str]:
+    """Paths of the embedding matrix and id map for a persisted store."""
+    stem = os.path.join(persist_dir, f"{namespace}__{VECTOR_STORE_STEM}")
+    return f"{stem}.npy", f"{stem}.ids.tsv"
+
+
+def ann_index_path(matrix_path: str) -> str:
+    """Path of the IVF index persisted next to an embedding matrix."""
+    return matrix_path[:-len(".npy")] + ".ivf.npz"
+
+
+def quantized_codes_path(matrix_path: str, kind: str) -> str:
+    """Path of the `kind` ("int8", "binary") codes persisted next to an embedding matrix."""
+    return matrix_path[:-len(".npy")] + f".{kind}.npz"
+
+
+class NumpyVectorStore(BasePydanticVectorStore):
+    """
+    Vector store backed by a contiguous float32 matrix.
+
+    Embeddings are L2-normalized and persisted as one `.npy` matrix with a
+    separate tab-separated id map (node id, ref doc id per row). Loaded
+    stores memory-map the matrix, and queries score every row with a
+    single matrix-vector product followed by `argpartition`, so startup
+    does not parse embeddings and search cost is one BLAS call.
+
+    Rows added after loading are kept in an in-memory block until the next
+    persist; deleted rows are masked and dropped on persist.
+
+    With `ann_index="ivf"` an IVF-flat index is built over the matrix on
+    every persist and used for unrestricted queries on the mapped rows,
+    probing `ann_nprobe` of `ann_nlist` lists instead of scanning all rows.
+    Stores smaller than `ann_min_rows` are always searched exactly.
+
+    With `quantization="int8"` or `"binary"`, compact codes of the matrix
+    (4x or 32x smaller) are built on persist and loaded into memory in its
+    place: searches that do not use the IVF index score the codes, then
+    re-score the best `rescore_factor * k` rows exactly, so only those
+    rows of the float matrix are read (see `quantization.Quantizer`).
+    """
+
+    stores_text: bool = False
+    ann_index: str = "none"
+    ann_nlist: int = 0
+    ann_nprobe: int = 16
+    ann_min_rows: int = 10000
+    quantization: str = "none"
+    rescore_factor: int = 0
+
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+    _ids: List[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: List[str] = PrivateAttr(default_factory=list)
+    _live: Optional[np.ndarray] = PrivateAttr(default=None)
+    _rows_by_ref: Dict[str, List[int]] = PrivateAttr(default_factory=dict)
+    _pending: List[np.ndarray] = PrivateAttr(default_factory=list)
+    _pending_ids: List[str] = PrivateAttr(default_factory=list)
+    _pending_ref_doc_ids: List[str] = PrivateAttr(default_factory=list)
+    _pending_live: List[bool] = PrivateAttr(default_factory=list)
+    _ivf: Optional[IVFFlatIndex] = PrivateAttr(default=None)
+    _quantizer: Optional[Quantizer] = PrivateAttr(default=None)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "NumpyVectorStore"
+
+    @classmethod
+    def from_persist_dir(
+        cls,
+        persist_dir: str,
+        namespace: str = DEFAULT_NAMESPACE,
+        **kwargs: Any
+    ) -> "NumpyVectorStore":
+        """Load a persisted store, memory-mapping the embedding matrix.
+        
+        Keyword arguments set the ANN and quantization fields (e.g.
+        `ann_nprobe`, `rescore_factor`), so search parameters can be tuned
+        without rebuilding. Codes are only used if they were built, i.e.
+        the store was persisted with the same `quantization`.
+        """
+        store = cls(**kwargs)
+        matrix_path, ids_path = vector_store_paths(persist_dir, namespace)
+        store._load(matrix_path, ids_path)
+        return store
+
+    @staticmethod
+    def exists(persist_dir: str, namespace: str = DEFAULT_NAMESPACE) -> bool:
+        """Whether a NumPy store has been persisted in `persist_dir`."""
+        return os.path.exists(vector_store_paths(persist_dir, namespace)[0])
+
+    def _load(self, matrix_path: str, ids_path: str):
+        self._matrix = np.load(matrix_path, mmap_mode="r")
+        self._ids, self._ref_doc_ids = [], []
+        with open(ids_path, "r", encoding="utf-8") as f:
+            for line in f:
+                node_id, ref_doc_id = line.rstrip("\n").split("\t")
+                self._ids.append(node_id)
+                self._ref_doc_ids.append(ref_doc_id)
+        self._live = np.ones(len(self._ids), dtype=bool)
+        self._rows_by_ref = {}
+        for row, ref_doc_id in enumerate(self._ref_doc_ids):
+            self._rows_by_ref.setdefault(ref_doc_id, []).append(row)
+        ivf_path = ann_index_path(matrix_path)
+        if self.ann_index == "ivf" and os.path.exists(ivf_path):
+            self._ivf = IVFFlatIndex.load(ivf_path, nprobe=self.ann_nprobe)
+        else:
+            self._ivf = None
+        codes_path = quantized_codes_path(matrix_path, self.quantization)
+        if self.quantization in QUANTIZERS and os.path.exists(codes_path):
+            self._quantizer = QUANTIZERS[self.quantization].load(codes_path, rescore_factor=self.rescore_factor)
+        else:
+            self._quantizer = None
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    @property
+    def num_rows(self) -> int:
+        """Number of live (non-deleted) rows."""
+        base = int(self._live.sum()) if self._live is not None else 0
+        return base + sum(self._pending_live)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes of the float32 matrix and of the codes searched in its place (0 without quantization)."""
+        return {
+            "rows": len(self._ids),
+            "float_bytes": int(self._matrix.nbytes) if self._matrix is not None else 0,
+            "code_bytes": self._quantizer.nbytes if self._quantizer is not None else 0,
+        }
+
+    def sample_rows(self, limit: int, seed: int = 0) -> Optional[np.ndarray]:
+        """Up to `limit` live embeddings, drawn at random (None if the store is empty)."""
+        blocks = [(matrix, np.flatnonzero(live)) for matrix, _, _, live in self._blocks()]
+        total = sum(len(rows) for _, rows in blocks)
+        if total == 0:
+            return None
+        picks = np.arange(total)
+        if total > limit:
+            picks = np.sort(np.random.default_rng(seed).choice(total, size=limit, replace=False))
+        samples, offset = [], 0
+        for matrix, rows in blocks:
+            chosen = picks[(picks >= offset) & (picks < offset + len(rows))] - offset
+            if len(chosen):
+                samples.append(np.asarray(matrix[rows[chosen]], dtype=np.float32))
+            offset += len(rows)
+        return np.concatenate(samples)
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        """Add node embeddings to the in-memory block."""
+        for node in nodes:
+            vector = np.asarray(node.get_embedding(), dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            self._pending.append(vector / norm if norm > 0 else vector)
+            self._pending_ids.append(node.node_id)
+            self._pending_ref_doc_ids.append(node.ref_doc_id or "None")
+            self._pending_live.append(True)
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        """Mask every row that belongs to `ref_doc_id`."""
+        for row in self._rows_by_ref.pop(ref_doc_id, []):
+            self._live[row] = False
+        for row, row_ref in enumerate(self._pending_ref_doc_ids):
+            if row_ref == ref_doc_id:
+                self._pending_live[row] = False
+
+    def delete_nodes(self, node_ids: Optional[List[str]] = None, filters=None, **delete_kwargs: Any) -> None:
+        """Mask rows by node id (metadata filters are not supported)."""
+        if filters is not None:
+            raise ValueError("NumpyVectorStore does not support metadata filters")
+        targets = set(node_ids or [])
+        for row, node_id in enumerate(self._ids):
+            if node_id in targets:
+                self._live[row] = False
+        for row, node_id in enumerate(self._pending_ids):
+            if node_id in targets:
+                self._pending_live[row] = False
+
+    def clear(self) -> None:
+        self._matrix = None
+        self._ivf = None
+        self._quantizer = None
+        self._ids, self._ref_doc_ids, self._live, self._rows_by_ref = [], [], None, {}
+        self._pending, self._pending_ids, self._pending_ref_doc_ids, self._pending_live = [], [], [], []
+
+    def _blocks(self) -> List[Tuple[np.ndarray, List[str], List[str], np.ndarray]]:
+        """(matrix, node ids, ref doc ids, live mask) for the mapped and in-memory rows."""
+        blocks = []
+        if self._matrix is not None and len(self._ids):
+            blocks.append((self._matrix, self._ids, self._ref_doc_ids, self._live))
+        if self._pending:
+            blocks.append((
+                np.stack(self._pending),
+                self._pending_ids,
+                self._pending_ref_doc_ids,
+                np.asarray(self._pending_live, dtype=bool),
+            ))
+        return blocks
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        """Cosine top-k with one matrix product per block (exact unless IVF or codes are in use)."""
+        if query.filters is not None:
+            raise ValueError("NumpyVectorStore does not support metadata filters")
+        if query.mode != VectorStoreQueryMode.DEFAULT:
+            raise ValueError(f"Invalid query mode: {query.mode}")
+
+        q = np.asarray(query.query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm > 0:
+            q = q / norm
+
+        node_filter = set(query.node_ids) if query.node_ids is not None else None
+        doc_filter = set(query.doc_ids) if query.doc_ids is not None else None
+
+        scores, ids = [], []
+        for matrix, block_ids, block_refs, live in self._blocks():
+            if matrix is self._matrix and self._ivf is not None and node_filter is None and doc_filter is None:
+                rows, row_scores = self._ivf.search(matrix, q, query.similarity_top_k, live=live)
+                scores.append(row_scores)
+                ids.extend(block_ids[row] for row in rows)
+                continue
+            mask = live.copy()
+            if node_filter is not None:
+                mask &= np.fromiter((i in node_filter for i in block_ids), dtype=bool, count=len(block_ids))
+            if doc_filter is not None:
+                mask &= np.fromiter((r in doc_filter for r in block_refs), dtype=bool, count=len(block_refs))
+            if matrix is self._matrix and self._quantizer is not None:
+                rows, row_scores = self._quantizer.search(matrix, q, query.similarity_top_k, mask=mask)
+                scores.append(row_scores)
+                ids.extend(block_ids[row] for row in rows)
+                continue
+            block_scores = np.asarray(matrix @ q, dtype=np.float32)
+            block_scores[~mask] = -np.inf
+            scores.append(block_scores)
+            ids.extend(block_ids)
+        return self._top_k(scores, ids, query.similarity_top_k)
+
+    @staticmethod
+    def _top_k(scores: List[np.ndarray], ids: List[str], k: int) -> VectorStoreQueryResult:
+        if not scores:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+        all_scores = np.concatenate(scores)
+        k = min(k, int(np.isfinite(all_scores).sum()))
+        if k <= 0:
+            return VectorStoreQueryResult(similarities=[], ids=[])
+        top = np.argpartition(-all_scores, k - 1)[:k]
+        top = top[np.argsort(-all_scores[top])]
+        return VectorStoreQueryResult(
+            similarities=[float(all_scores[i]) for i in top],
+            ids=[ids[i] for i in top],
+        )
+
+    def persist(self, persist_path: str, fs: Optional[fsspec.AbstractFileSystem] = None) -> None:
+        """
+        Write live rows to `<namespace>__vector_store.npy` and `.ids.tsv`.
+
+        `persist_path` is the JSON path StorageContext would use for a
+        SimpleVectorStore; only its directory and namespace are used.
+        """
+        persist_dir = os.path.dirname(persist_path)
+        namespace = os.path.basename(persist_path).split("__")[0] or DEFAULT_NAMESPACE
+        os.makedirs(persist_dir, exist_ok=True)
+        matrix_path, ids_path = vector_store_paths(persist_dir, namespace)
+
+        blocks = self._blocks()
+        rows = sum(int(live.sum()) for _, _, _, live in blocks)
+        dim = blocks[0][0].shape[1] if blocks else 0
+
+        tmp_matrix = f"{matrix_path}.tmp"
+        tmp_ids = f"{ids_path}.tmp"
+        out = np.lib.format.open_memmap(tmp_matrix, mode="w+", dtype=np.float32, shape=(rows, dim))
+        position = 0
+        with open(tmp_ids, "w", encoding="utf-8") as f:
+            for matrix, block_ids, block_refs, live in blocks:
+                keep = np.flatnonzero(live)
+                out[position:position + len(keep)] = matrix[keep]
+                position += len(keep)
+                for row in keep:
+                    f.write(f"{block_ids[row]}\t{block_refs[row]}\n")
+        out.flush()
+
+        ivf = None
+        if self.ann_index == "ivf" and rows >= self.ann_min_rows:
+            ivf = IVFFlatIndex(nlist=self.ann_nlist, nprobe=self.ann_nprobe)
+            ivf.build(out)
+        quantizer = None
+        if self.quantization != "none" and rows:
+            quantizer = get_quantizer(self.quantization, rescore_factor=self.rescore_factor)
+            quantizer.build(out)
+        del out
+
+        # Release the old mapping before replacing the file it points to
+        self.clear()
+        os.replace(tmp_matrix, matrix_path)
+        os.replace(tmp_ids, ids_path)
+        ivf_path = ann_index_path(matrix_path)
+        if ivf is not None:
+            ivf.save(ivf_path)
+        elif os.path.exists(ivf_path):
+            os.remove(ivf_path)
+        for kind in QUANTIZERS:
+            codes_path = quantized_codes_path(matrix_path, kind)
+            if quantizer is not None and kind == quantizer.kind:
+                quantizer.save(codes_path)
+            elif os.path.exists(codes_path):
+                os.remove(codes_path)
+        self._load(matrix_path, ids_path)
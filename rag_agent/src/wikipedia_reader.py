@@ -1,24 +1,65 @@
 """Wikipedia Reader to fetch articles via MediaWiki API."""
+import time
 import wikipedia
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional
 from llama_index.core import Document
+from .config import WIKIPEDIA_FETCH_WORKERS, WIKIPEDIA_RATE_LIMIT
+from .fetch_cache import FetchCache, get_fetch_cache
+from .mediawiki import MediaWikiClient, MAX_EXTRACTS_PER_QUERY, MAX_TITLES_PER_QUERY
+from .tracing import tracer
+
+
+# How many disambiguation pages may be followed in a row before giving up
+MAX_DISAMBIGUATION_HOPS = 2
+
+
+def _batches(items: List[str], size: int) -> Iterator[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
 
 
 class WikipediaReader:
     """Reads articles from Wikipedia using the MediaWiki API."""
     
-    def __init__(self, language: str = "en", max_articles: int = 10):
+    def __init__(
+        self,
+        language: str = "en",
+        max_articles: int = 10,
+        max_workers: Optional[int] = None,
+        requests_per_second: Optional[float] = None,
+        cache: Optional[FetchCache] = None,
+        use_cache: bool = True
+    ):
         """
         Initialize Wikipedia reader.
         
         Args:
             language: Wikipedia language code (default: "en")
             max_articles: Maximum number of articles to fetch per topic
+            max_workers: Concurrent fetch workers; 1 fetches sequentially
+                through the `wikipedia` package (default: WIKIPEDIA_FETCH_WORKERS)
+            requests_per_second: Rate limit for the MediaWiki host
+                (default: WIKIPEDIA_RATE_LIMIT)
+            cache: Page cache (default: the shared cache from config, if enabled)
+            use_cache: Set to False to fetch every page, even when FETCH_CACHE_ENABLED is set
         """
         self.language = language
         self.max_articles = max_articles
+        self.max_workers = max_workers or WIKIPEDIA_FETCH_WORKERS
+        self.client = MediaWikiClient(
+            language=language,
+            requests_per_second=requests_per_second or WIKIPEDIA_RATE_LIMIT,
+            pool_size=self.max_workers
+        )
+        self.cache = (cache or get_fetch_cache()) if use_cache else None
+        self.last_fetch_stats: Dict[str, float] = {}
         wikipedia.set_lang(language)
     
+    def document_id(self, title: str) -> str:
+        """Stable document id for an article, used for incremental indexing."""
+        return f"wikipedia:{self.language}:{title}"
+    
     def search_articles(self, topic: str, limit: Optional[int] = None) -> List[str]:
         """
         Search for articles related to a topic.
@@ -32,7 +73,8 @@ class WikipediaReader:
         """
         limit = limit or self.max_articles
         try:
-            results = wikipedia.search(topic, results=limit)
+            with tracer.span("fetch.search"):
+                results = wikipedia.search(topic, results=limit)
             print(f"Found {len(results)} articles for topic: {topic}")
             return results
         except Exception as e:
@@ -43,17 +85,29 @@ class WikipediaReader:
         """
         Fetch a single Wikipedia article by title.
         
+        A cached copy is served within the TTL, and after it as long as
+        the article's revision id is unchanged. Articles reached through a
+        redirect are cached under the requested title as well.
+        
         Args:
             title: Article title
             
         Returns:
             LlamaIndex Document or None if fetch fails
         """
+        if self.cache:
+            cached = self._cached_article(title)
+            if cached:
+                tracer.count("fetch", cache_hits=1)
+                return cached
+        
         try:
-            page = wikipedia.page(title, auto_suggest=False)
+            with tracer.span("fetch.article"):
+                page = wikipedia.page(title, auto_suggest=False)
             
             # Create LlamaIndex Document
             doc = Document(
+                id_=self.document_id(page.title),
                 text=page.content,
                 metadata={
                     "title": page.title,
@@ -64,6 +118,10 @@ class WikipediaReader:
                     "language": self.language
                 }
             )
+            if self.cache:
+                self.cache.put("wikipedia", self.language, page.title, page.revision_id, doc)
+                if title != page.title:
+                    self.cache.put("wikipedia", self.language, title, page.revision_id, doc)
             return doc
             
         except wikipedia.exceptions.DisambiguationError as e:
@@ -81,6 +139,25 @@ class WikipediaReader:
             print(f"Error fetching article '{title}': {e}")
             return None
     
+    def _cached_article(self, title: str) -> Optional[Document]:
+        """
+        The cached copy of `title`, checking its revision id past the TTL.
+        
+        The revision id comes from one `action=query` request (following
+        redirects), made only when there is an entry to revalidate.
+        """
+        cached = self.cache.get("wikipedia", self.language, title, count_miss=False)
+        if cached:
+            return cached
+        revision = None
+        if self.cache.contains("wikipedia", self.language, title):
+            try:
+                pages, _ = self.client.page_info([title])
+                revision = pages[0].get("lastrevid") if pages else None
+            except Exception as e:
+                print(f"Error checking revision of '{title}': {e}")
+        return self.cache.get("wikipedia", self.language, title, revision=revision)
+    
     def fetch_articles_by_topic(self, topic: str, limit: Optional[int] = None) -> List[Document]:
         """
         Fetch multiple articles related to a topic.
@@ -93,16 +170,7 @@ class WikipediaReader:
             List of LlamaIndex Documents
         """
         article_titles = self.search_articles(topic, limit)
-        documents = []
-        
-        for title in article_titles:
-            print(f"Fetching article: {title}")
-            doc = self.fetch_article(title)
-            if doc:
-                documents.append(doc)
-        
-        print(f"Successfully fetched {len(documents)} articles")
-        return documents
+        return self.fetch_articles_by_titles(article_titles)
     
     def fetch_articles_by_titles(self, titles: List[str]) -> List[Document]:
         """
@@ -114,13 +182,188 @@ class WikipediaReader:
         Returns:
             List of LlamaIndex Documents
         """
-        documents = []
-        
-        for title in titles:
-            print(f"Fetching article: {title}")
-            doc = self.fetch_article(title)
-            if doc:
-                documents.append(doc)
+        documents = list(self.iter_articles(titles))
         
         print(f"Successfully fetched {len(documents)} articles")
         return documents
+    
+    def iter_articles_by_topic(self, topic: str, limit: Optional[int] = None) -> Iterator[Document]:
+        """
+        Stream articles related to a topic as they are fetched.
+        
+        Args:
+            topic: Search query/topic
+            limit: Maximum number of articles to fetch
+            
+        Yields:
+            LlamaIndex Documents
+        """
+        yield from self.iter_articles(self.search_articles(topic, limit))
+    
+    def iter_articles(self, titles: List[str]) -> Iterator[Document]:
+        """
+        Fetch articles, yielding Documents as they arrive.
+        
+        With a single worker, articles are fetched one after another
+        through `fetch_article`. Otherwise they are fetched concurrently
+        and yielded in completion order. Titles are resolved 50 at a time
+        with batched `action=query` calls (redirects, disambiguation, url
+        and categories in one round trip), intro summaries are fetched 20
+        at a time, and full page text is fetched per page on a bounded
+        worker pool. All requests share a per-host rate limiter with
+        exponential backoff.
+        
+        Cached pages within the TTL are served without any request; older
+        ones are reused when the revision id from the batched lookup still
+        matches.
+        
+        Args:
+            titles: List of article titles
+            
+        Yields:
+            LlamaIndex Documents as their content arrives
+        """
+        if self.max_workers <= 1:
+            for title in titles:
+                print(f"Fetching article: {title}")
+                doc = self.fetch_article(title)
+                if doc:
+                    yield doc
+            return
+        
+        start = time.perf_counter()
+        requests_before = self.client.request_count
+        count = 0
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            served = set()
+            pending = []
+            for title in dict.fromkeys(titles):
+                cached = self.cache.get("wikipedia", self.language, title, count_miss=False) if self.cache else None
+                if cached:
+                    served.add(cached.metadata["title"])
+                    count += 1
+                    tracer.count("fetch", cache_hits=1)
+                    yield cached
+                else:
+                    pending.append(title)
+            
+            pages = []
+            with tracer.span("fetch.resolve"):
+                resolved = self._resolve_pages(pending, pool)
+            for page in resolved:
+                if page["title"] in served:
+                    continue
+                cached = self.cache.get(
+                    "wikipedia", self.language, page["title"], revision=page.get("lastrevid")
+                ) if self.cache else None
+                if cached:
+                    served.add(page["title"])
+                    count += 1
+                    tracer.count("fetch", cache_hits=1)
+                    yield cached
+                else:
+                    pages.append(page)
+            
+            summary_futures = {}
+            for batch in _batches([page["title"] for page in pages], MAX_EXTRACTS_PER_QUERY):
+                future = pool.submit(self.client.summaries, batch)
+                for title in batch:
+                    summary_futures[title] = future
+            
+            content_futures = {
+                pool.submit(self._fetch_content, page["title"]): page
+                for page in pages
+            }
+            for future in as_completed(content_futures):
+                page = content_futures[future]
+                try:
+                    content = future.result()
+                    summary = summary_futures[page["title"]].result().get(page["title"], "")
+                except Exception as e:
+                    print(f"Error fetching article '{page['title']}': {e}")
+                    continue
+                doc = self._page_to_document(page, content, summary)
+                if self.cache:
+                    self.cache.put("wikipedia", self.language, page["title"], page.get("lastrevid"), doc)
+                count += 1
+                yield doc
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            self._record_fetch_stats(count, start, requests_before)
+    
+    def _fetch_content(self, title: str) -> str:
+        with tracer.span("fetch.content") as span:
+            content = self.client.content(title)
+            span.add(chars=len(content))
+        return content
+    
+    def _resolve_pages(self, titles: List[str], pool: ThreadPoolExecutor) -> List[Dict]:
+        """Resolve titles to page records, following disambiguation pages."""
+        resolved: Dict[str, Dict] = {}
+        pending = list(dict.fromkeys(titles))
+        
+        for _ in range(MAX_DISAMBIGUATION_HOPS + 1):
+            if not pending:
+                break
+            futures = [
+                pool.submit(self.client.page_info, batch)
+                for batch in _batches(pending, MAX_TITLES_PER_QUERY)
+            ]
+            disambiguations = []
+            for future in futures:
+                try:
+                    pages, _ = future.result()
+                except Exception as e:
+                    print(f"Error resolving articles: {e}")
+                    continue
+                for page in pages:
+                    if page.get("missing") or page.get("invalid"):
+                        print(f"Page not found: {page['title']}")
+                    elif "disambiguation" in page.get("pageprops", {}):
+                        disambiguations.append(page["title"])
+                    else:
+                        resolved.setdefault(page["title"], page)
+            
+            pending = []
+            futures = {title: pool.submit(self.client.first_link, title) for title in disambiguations}
+            for title, future in futures.items():
+                try:
+                    option = future.result()
+                except Exception as e:
+                    print(f"Error resolving disambiguation page '{title}': {e}")
+                    continue
+                print(f"Disambiguation page for '{title}'. Using: {option}")
+                if option and option not in resolved:
+                    pending.append(option)
+        
+        return list(resolved.values())
+    
+    def _page_to_document(self, page: Dict, content: str, summary: str) -> Document:
+        """Build a Document with the same metadata as `fetch_article`."""
+        return Document(
+            id_=self.document_id(page["title"]),
+            text=content,
+            metadata={
+                "title": page["title"],
+                "url": page.get("fullurl", ""),
+                "summary": summary,
+                "categories": [c["title"].split(":", 1)[-1] for c in page.get("categories", [])],
+                "source": "wikipedia",
+                "language": self.language
+            }
+        )
+    
+    def _record_fetch_stats(self, count: int, start: float, requests_before: int):
+        elapsed = time.perf_counter() - start
+        api_requests = self.client.request_count - requests_before
+        rate = count / elapsed if elapsed > 0 else 0.0
+        tracer.record("fetch", elapsed, {"documents": count, "api_requests": api_requests})
+        self.last_fetch_stats = {
+            "articles": count,
+            "seconds": elapsed,
+            "articles_per_second": rate,
+            "api_requests": api_requests
+        }
+        print(f"Fetched {count} articles in {elapsed:.2f}s "
+              f"({rate:.1f} articles/s, {api_requests} API requests)")
@@ -0,0 +1,172 @@
+"""Tests of near-duplicate detection before embedding: documents, chunks and persistence.
+
+Builds small indexes in a temporary directory. No Ollama or internet
+connection is needed (the embedding model still has to be available locally).
+"""
+import os
+import sys
+
+import pytest
+
+# Add rag_agent to path for both PyCharm and command line
+project_root = os.path.dirname(os.path.abspath(__file__))
+rag_agent_path = os.path.join(project_root, 'rag_agent')
+if rag_agent_path not in sys.path:
+    sys.path.insert(0, rag_agent_path)
+
+from llama_index.core import Document
+from llama_index.core.schema import TextNode
+
+# Try absolute import first (PyCharm), then relative (command line)
+try:
+    from rag_agent.src.dedup import NearDuplicateDetector
+    from rag_agent.src.indexer import KnowledgeGraphIndexer
+    from rag_agent.src.ingestion import StreamingIngestion
+except ImportError:
+    from src.dedup import NearDuplicateDetector
+    from src.indexer import KnowledgeGraphIndexer
+    from src.ingestion import StreamingIngestion
+
+
+ARTICLE = (
+    "The Warp Core is the main power source of the starship. It generates the warp field "
+    "by annihilating matter and antimatter, and the reaction is regulated by Dilithium "
+    "crystals that must be replaced after every long voyage through deep space. Engineers "
+    "monitor the plasma flow from the core to the nacelles and can eject the whole core "
+    "if the containment field fails during combat or an accident on board."
+)
+# The same article reformatted with a credit line, as mirrors and reposts often are
+MIRROR = "\n\n".join(ARTICLE.split(". ")) + "\n\nMirrored from the ship archive."
+OTHER = (
+    "A sourdough starter is a culture of wild yeast and lactic acid bacteria that is fed "
+    "flour and water every day and leavens bread without any commercial yeast at all."
+)
+
+THRESHOLD = 0.8
+
+
+def test_detector():
+    """Near-identical text matches, unrelated text and a document's own earlier version do not."""
+    detector = NearDuplicateDetector(threshold=THRESHOLD)
+    assert detector.check_document("a", ARTICLE) is None
+    assert detector.check_document("b", MIRROR) == "a"
+    assert detector.check_document("c", OTHER) is None
+    # Re-checking "a" (an edited version) never matches itself
+    assert detector.check_document("a", MIRROR) is None
+    assert detector.skipped_documents == 1
+
+    nodes = [TextNode(text=ARTICLE, id_="a-0"), TextNode(text=MIRROR, id_="a-1"), TextNode(text=OTHER, id_="a-2")]
+    kept = detector.filter_chunks("a", nodes)
+    assert [node.node_id for node in kept] == ["a-0", "a-2"]
+    assert detector.skipped_chunks == 1
+    assert detector.filter_chunks("d", [TextNode(text=MIRROR, id_="d-0")]) == []
+    print("[OK] detector")
+
+
+def test_skipped_across_runs(workdir):
+    """Duplicates are skipped at build time and, from the persisted signatures, on later updates."""
+    indexer = KnowledgeGraphIndexer(dedup_threshold=THRESHOLD)
+    indexer.build_index([
+        Document(text=ARTICLE, id_="warp"),
+        Document(text=MIRROR, id_="warp-mirror"),
+        Document(text=OTHER, id_="sourdough"),
+    ])
+    assert set(indexer.index.ref_doc_info) == {"warp", "sourdough"}
+    assert indexer.dedup.skipped_documents == 1
+    assert NearDuplicateDetector.exists(indexer.storage_dir)
+
+    # A new process: the signatures come from disk
+    reloaded = KnowledgeGraphIndexer(dedup_threshold=THRESHOLD)
+    summary = reloaded.update_index([Document(text=MIRROR, id_="warp-repost")])
+    assert (summary["added"], summary["duplicates"]) == (0, 1)
+    assert "warp-repost" not in reloaded.index.ref_doc_info
+    assert reloaded.dedup.skipped_documents == 1
+
+    # Deleting the original frees its text to be indexed under another id
+    reloaded.delete_document("warp")
+    reloaded.persist()
+    reloaded.update_index([Document(text=MIRROR, id_="warp-repost")])
+    assert "warp-repost" in reloaded.index.ref_doc_info
+
+    # An edit that turns a document into a duplicate removes its old version
+    summary = reloaded.update_index([Document(text=ARTICLE, id_="sourdough")])
+    assert (summary["updated"], summary["duplicates"]) == (0, 1)
+    assert "sourdough" not in reloaded.index.ref_doc_info
+    print("[OK] skipped across runs")
+
+
+def test_lazy_load(workdir):
+    """Loading an index for queries skips the signatures; a write path loads or backfills them once."""
+    indexer = KnowledgeGraphIndexer(dedup_threshold=THRESHOLD)
+    indexer.load_index()
+    assert indexer.dedup is None
+
+    # An index built before detection existed: the first update records its chunks and persists them
+    os.remove(os.path.join(indexer.storage_dir, "dedup.npz"))
+    indexer.update_index([])
+    assert indexer.dedup is not None and len(indexer.dedup.chunks) > 0
+    assert NearDuplicateDetector.exists(indexer.storage_dir)
+    print("[OK] lazy load")
+
+
+def test_streaming(workdir):
+    """The streaming pipeline skips the same duplicates without storing them."""
+    indexer = KnowledgeGraphIndexer(shard="streamed", dedup_threshold=THRESHOLD)
+    summary = indexer.build_index_streaming([
+        Document(text=ARTICLE, id_="warp"),
+        Document(text=MIRROR, id_="warp-mirror"),
+        Document(text=OTHER, id_="sourdough"),
+    ])
+    assert (summary["added"], summary["duplicates"]) == (2, 1)
+    assert set(indexer.index.ref_doc_info) == {"warp", "sourdough"}
+    assert indexer.dedup.skipped_documents == 1
+    print("[OK] streaming")
+
+
+def test_streaming_flush(workdir):
+    """Each flush moves the new embeddings to disk and leaves an index that loads with them."""
+    indexer = KnowledgeGraphIndexer(shard="flushed", vector_store="numpy", dedup_threshold=THRESHOLD)
+    indexer.build_index_streaming([Document(text=ARTICLE, id_="warp")])
+    flushed = []
+    persist = indexer.persist
+
+    def checked_persist():
+        persist()
+        reloaded = KnowledgeGraphIndexer(shard="flushed")
+        reloaded.load_index()
+        flushed.append((len(indexer.index.storage_context.vector_store._pending), set(reloaded.index.ref_doc_info)))
+
+    indexer.persist = checked_persist
+    StreamingIngestion(indexer, flush_every=1).run([
+        Document(text=OTHER, id_="sourdough"),
+        Document(text="Dilithium crystals are mined on remote moons and shipped to every starbase.", id_="dilithium"),
+    ])
+    # One flush per document, then the final persist
+    assert flushed == [
+        (0, {"warp", "sourdough"}),
+        (0, {"warp", "sourdough", "dilithium"}),
+        (0, {"warp", "sourdough", "dilithium"}),
+    ]
+    print("[OK] streaming flush")
+
+
+def test_rebuild_replaces_files(workdir):
+    """A full rebuild with another vector store leaves none of the previous build's files behind."""
+    indexer = KnowledgeGraphIndexer(shard="rebuilt", vector_store="numpy")
+    indexer.build_index_streaming([Document(text=ARTICLE, id_="warp")])
+    assert os.path.exists(os.path.join(indexer.storage_dir, "default__vector_store.npy"))
+
+    rebuilt = KnowledgeGraphIndexer(shard="rebuilt", vector_store="simple")
+    rebuilt.build_index_streaming([Document(text=OTHER, id_="sourdough")])
+
+    files = set(os.listdir(rebuilt.storage_dir))
+    assert "default__vector_store.npy" not in files
+    assert not any(name.endswith(".rebuild") for name in os.listdir(os.path.dirname(rebuilt.storage_dir)))
+    reloaded = KnowledgeGraphIndexer(shard="rebuilt")
+    reloaded.load_index()
+    assert set(reloaded.index.ref_doc_info) == {"sourdough"}
+    print("[OK] rebuild replaces files")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q", "-s"]))
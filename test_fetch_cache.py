@@ -0,0 +1,110 @@
+"""Tests of the persistent fetch cache: ids, TTL, revision checks and older entries.
+
+No Ollama, embedding model or internet connection is needed (Wikipedia
+requests are replaced by stubs).
+"""
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+import wikipedia
+
+# Add rag_agent to path for both PyCharm and command line
+project_root = os.path.dirname(os.path.abspath(__file__))
+rag_agent_path = os.path.join(project_root, 'rag_agent')
+if rag_agent_path not in sys.path:
+    sys.path.insert(0, rag_agent_path)
+
+from llama_index.core import Document
+
+# Try absolute import first (PyCharm), then relative (command line)
+try:
+    from rag_agent.src.fetch_cache import FetchCache
+    from rag_agent.src.reader import WikiReader
+    from rag_agent.src.wikipedia_reader import WikipediaReader
+except ImportError:
+    from src.fetch_cache import FetchCache
+    from src.reader import WikiReader
+    from src.wikipedia_reader import WikipediaReader
+
+
+def test_round_trip_and_revisions(tmp_path):
+    """Pages keep their id; past the TTL only a matching revision is served."""
+    cache = FetchCache(str(tmp_path / "fetch_cache.sqlite"), ttl_seconds=60)
+    page = Document(id_="wikipedia:en:Warp drive", text="A warp drive...", metadata={"title": "Warp drive"})
+    cache.put("wikipedia", "en", "Warp drive", "101", page)
+
+    cached = cache.get("wikipedia", "en", "Warp drive")
+    assert (cached.doc_id, cached.text, cached.metadata) == (page.doc_id, page.text, page.metadata)
+
+    cache.ttl_seconds = 0
+    time.sleep(0.01)
+    assert cache.get("wikipedia", "en", "Warp drive") is None
+    assert cache.get("wikipedia", "en", "Warp drive", revision="102") is None
+    assert cache.get("wikipedia", "en", "Warp drive", revision="101").doc_id == page.doc_id
+    assert cache.stats() == {"hits": 2, "misses": 2, "revalidated": 1}
+    print("[OK] round trip and revisions")
+
+
+def test_entry_without_id(tmp_path):
+    """An entry written before pages had stable ids is a miss, and a new fetch replaces it."""
+    path = str(tmp_path / "fetch_cache.sqlite")
+    cache = FetchCache(path)
+    payload = json.dumps({"text": "A warp drive...", "metadata": {"title": "Warp drive"}})
+    cache._conn.execute(
+        "INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        ("wikipedia", "en", "Warp drive", "101", payload, len(payload), time.time(), time.time())
+    )
+    cache._conn.commit()
+
+    assert cache.get("wikipedia", "en", "Warp drive") is None
+    assert cache.get("wikipedia", "en", "Warp drive", revision="101") is None
+    assert cache.stats()["misses"] == 2
+
+    cache.put("wikipedia", "en", "Warp drive", "101",
+              Document(id_="wikipedia:en:Warp drive", text="A warp drive...", metadata={"title": "Warp drive"}))
+    assert cache.get("wikipedia", "en", "Warp drive").doc_id == "wikipedia:en:Warp drive"
+    print("[OK] entry without id")
+
+
+def test_sequential_redirect_and_revalidation(tmp_path, monkeypatch):
+    """A redirected title is served from the cache, and past the TTL only while its revision is current."""
+    cache = FetchCache(str(tmp_path / "fetch_cache.sqlite"), ttl_seconds=60)
+    reader = WikipediaReader(max_workers=1, cache=cache)
+    page = SimpleNamespace(title="Warp drive", content="A warp drive...", url="https://en.wikipedia.org/wiki/Warp_drive",
+                           summary="A warp drive...", categories=[], revision_id=101)
+    fetched = []
+    monkeypatch.setattr(wikipedia, "page", lambda title, auto_suggest: fetched.append(title) or page)
+    revision = {"lastrevid": 101}
+    monkeypatch.setattr(reader.client, "page_info", lambda titles: ([dict(title=page.title, **revision)], {}))
+
+    # "Warp Drive" redirects to "Warp drive"
+    assert reader.fetch_article("Warp Drive").doc_id == "wikipedia:en:Warp drive"
+    assert reader.fetch_article("Warp Drive").doc_id == "wikipedia:en:Warp drive"
+    assert fetched == ["Warp Drive"]
+
+    cache.ttl_seconds = 0
+    time.sleep(0.01)
+    assert reader.fetch_article("Warp Drive").doc_id == "wikipedia:en:Warp drive"
+    assert fetched == ["Warp Drive"] and cache.revalidated == 1
+
+    revision["lastrevid"] = 102
+    assert reader.fetch_article("Warp Drive").doc_id == "wikipedia:en:Warp drive"
+    assert fetched == ["Warp Drive", "Warp Drive"]
+    print("[OK] sequential redirect and revalidation")
+
+
+def test_reader_without_cache(tmp_path):
+    """Readers can be told not to use the shared page cache."""
+    assert WikipediaReader(use_cache=False).cache is None
+    assert WikiReader(use_cache=False, wiki_url="http://127.0.0.1:1").cache is None
+    cache = FetchCache(str(tmp_path / "fetch_cache.sqlite"))
+    assert WikipediaReader(cache=cache).cache is cache
+    print("[OK] reader without cache")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q", "-s"]))
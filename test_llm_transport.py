@@ -0,0 +1,194 @@
+"""Tests of the pooled LLM transport against a local fake Ollama.
+
+No Ollama, embedding model or index is needed.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+# Add rag_agent and benchmarks to path for both PyCharm and command line
+project_root = os.path.dirname(os.path.abspath(__file__))
+for path in (os.path.join(project_root, 'rag_agent'), os.path.join(project_root, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from fake_ollama import FakeOllama
+
+# Try absolute import first (PyCharm), then relative (command line)
+try:
+    from rag_agent.src.llm_transport import OllamaTransport, PooledOllama
+    from rag_agent.src.synthesis import ParallelTreeSummarize
+except ImportError:
+    from src.llm_transport import OllamaTransport, PooledOllama
+    from src.synthesis import ParallelTreeSummarize
+
+
+def chat_payload(prompt, stream=False):
+    return {"model": "fake", "messages": [{"role": "user", "content": prompt}], "stream": stream}
+
+
+def run_threads(target, args_list):
+    results = [None] * len(args_list)
+
+    def run(i, args):
+        results[i] = target(*args)
+
+    threads = [threading.Thread(target=run, args=(i, args)) for i, args in enumerate(args_list)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_parallel_limit_and_keep_alive():
+    """Requests beyond the limit wait for a slot and reuse pooled connections."""
+    fake = FakeOllama(prefill_ms=100, answer_tokens=4, parallel=8).start()
+    transport = OllamaTransport(fake.url, max_parallel=2, coalesce=False)
+    try:
+        answers = run_threads(
+            lambda prompt: transport.request("/api/chat", chat_payload(prompt)),
+            [(f"Question number {i} about warp cores",) for i in range(6)]
+        )
+        assert all(a["message"]["content"] for a in answers)
+        assert fake.stats["generations"] == 6
+        assert fake.stats["peak_active"] == 2
+        assert fake.stats["connections"] <= 2
+
+        metrics = transport.metrics()
+        assert metrics["calls"] == 6 and metrics["errors"] == 0
+        assert metrics["latency_ms"]["count"] == 6
+        # Four of the six calls had to wait for one of the two slots
+        assert metrics["queue_wait_ms"]["max"] >= 80
+        print("[OK] parallel limit and keep-alive")
+    finally:
+        transport.close()
+        fake.stop()
+
+
+def test_coalescing():
+    """Identical in-flight requests, plain and streamed, are sent once."""
+    fake = FakeOllama(prefill_ms=200, answer_tokens=6, parallel=4).start()
+    transport = OllamaTransport(fake.url, max_parallel=4)
+    try:
+        prompt = "What powers the Warp Core of Mission Alpha?"
+        answers = run_threads(lambda: transport.request("/api/chat", chat_payload(prompt)), [()] * 3)
+        assert len({a["message"]["content"] for a in answers}) == 1
+        assert fake.stats["generations"] == 1
+
+        streams = run_threads(
+            lambda: "".join(c["message"]["content"] for c in transport.stream("/api/chat", chat_payload(prompt, True))),
+            [()] * 3
+        )
+        assert len(set(streams)) == 1 and streams[0] == answers[0]["message"]["content"]
+        assert fake.stats["generations"] == 2
+
+        # Finished calls are not reused
+        transport.request("/api/chat", chat_payload(prompt))
+        assert fake.stats["generations"] == 3
+        assert transport.metrics()["coalesced"] == 4
+        print("[OK] coalescing")
+    finally:
+        transport.close()
+        fake.stop()
+
+
+def test_metrics_under_load():
+    """Metrics can be read while worker threads are recording samples."""
+    fake = FakeOllama(answer_tokens=2, parallel=8).start()
+    transport = OllamaTransport(fake.url, max_parallel=8, coalesce=False)
+    done = threading.Event()
+    reads = []
+
+    def poll():
+        while not done.is_set():
+            reads.append(transport.metrics())
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    try:
+        run_threads(
+            lambda prompt: transport.request("/api/chat", chat_payload(prompt)),
+            [(f"Question {i} about Dilithium",) for i in range(48)]
+        )
+        done.set()
+        poller.join()
+        assert reads
+        assert transport.metrics()["latency_ms"]["count"] == 48
+        print("[OK] metrics under load")
+    finally:
+        done.set()
+        transport.close()
+        fake.stop()
+
+
+def test_pooled_llm():
+    """The LlamaIndex LLM works sync and async, streamed and not, over the shared transport."""
+    fake = FakeOllama(answer_tokens=5).start()
+    llm = PooledOllama(model="fake", base_url=fake.url)
+    try:
+        assert llm.metadata.context_window == fake.context_length
+        text = llm.complete("Describe Dilithium crystals").text
+        assert len(text.split()) == 5
+        assert "".join(r.delta for r in llm.stream_complete("Describe Dilithium crystals")) == text
+
+        async def run_async():
+            response = await llm.acomplete("Describe Dilithium crystals")
+            streamed = [r.delta async for r in await llm.astream_complete("Describe Dilithium crystals")]
+            return response.text, "".join(streamed)
+
+        assert asyncio.run(run_async()) == (text, text)
+        print("[OK] pooled LLM")
+    finally:
+        llm.transport.close()
+        fake.stop()
+
+
+def test_async_context_window():
+    """The context window is asked for when the model is created, not by a blocking call from an event loop."""
+    fake = FakeOllama(answer_tokens=5).start()
+    llm = PooledOllama(model="fake", base_url=fake.url)
+    try:
+        def blocking_request(path, payload):
+            raise AssertionError(f"blocking request to {path} from the event loop")
+
+        llm.transport.request = blocking_request
+        assert llm.context_window == fake.context_length
+        assert len(asyncio.run(llm.acomplete("Describe Dilithium crystals")).text.split()) == 5
+        print("[OK] async context window")
+    finally:
+        llm.transport.close()
+        fake.stop()
+
+
+def test_parallel_tree_summarize():
+    """Sub-summaries of one query are generated concurrently."""
+    fake = FakeOllama(prefill_ms=150, answer_tokens=4, parallel=8, context_length=600).start()
+    llm = PooledOllama(model="fake", base_url=fake.url, max_parallel=8)
+    try:
+        chunks = [" ".join(f"Fact {i}.{j} about the Warp Core and Dilithium." for j in range(25)) for i in range(4)]
+        synthesizer = ParallelTreeSummarize(llm=llm, max_concurrency=4)
+        start = time.perf_counter()
+        answer = synthesizer.get_response("What does the Warp Core need?", chunks)
+        elapsed = time.perf_counter() - start
+        assert answer
+        # Several groups, summarized at once, then the final round
+        assert fake.stats["generations"] >= 3
+        assert fake.stats["peak_active"] >= 2
+        assert elapsed < 0.15 * (fake.stats["generations"] - 1)
+        print("[OK] parallel tree summarize")
+    finally:
+        llm.transport.close()
+        fake.stop()
+
+
+if __name__ == "__main__":
+    test_parallel_limit_and_keep_alive()
+    test_coalescing()
+    test_metrics_under_load()
+    test_pooled_llm()
+    test_async_context_window()
+    test_parallel_tree_summarize()
+    print("\nAll LLM transport tests passed")
@@ -0,0 +1,78 @@
+"""Tests of the batched MediaWiki path: disambiguation pages and failed lookups.
+
+No internet connection is needed (API requests are replaced by stubs).
+"""
+import os
+import sys
+
+import pytest
+
+# Add rag_agent to path for both PyCharm and command line
+project_root = os.path.dirname(os.path.abspath(__file__))
+rag_agent_path = os.path.join(project_root, 'rag_agent')
+if rag_agent_path not in sys.path:
+    sys.path.insert(0, rag_agent_path)
+
+# Try absolute import first (PyCharm), then relative (command line)
+try:
+    from rag_agent.src.mediawiki import MediaWikiClient
+    from rag_agent.src.wikipedia_reader import WikipediaReader
+except ImportError:
+    from src.mediawiki import MediaWikiClient
+    from src.wikipedia_reader import WikipediaReader
+
+
+# A rendered disambiguation page: contents box first, options not in alphabetical order
+MERCURY = """
+<div id="toc"><ul><li class="toclevel-1 tocsection-1"><a href="#Science">Science</a></li></ul></div>
+<p><b>Mercury</b> may refer to:</p>
+<ul>
+<li><a href="/wiki/Mercury_(planet)" title="Mercury (planet)">Mercury (planet)</a>, the closest planet to the Sun</li>
+<li><a href="/wiki/Mercury_(element)" title="Mercury (element)">Mercury (element)</a>, a chemical element</li>
+</ul>
+"""
+
+
+def test_first_link_in_page_order(monkeypatch):
+    """The first listed option is used, as in the sequential path, not the alphabetically first link."""
+    client = MediaWikiClient()
+    requests = []
+
+    def get(params):
+        requests.append(params)
+        return {"parse": {"title": params["page"], "text": MERCURY}}
+
+    monkeypatch.setattr(client, "get", get)
+    assert client.first_link("Mercury") == "Mercury (planet)"
+    assert requests[0]["action"] == "parse"
+    print("[OK] first link in page order")
+
+
+def test_failed_disambiguation(monkeypatch):
+    """A disambiguation page that cannot be read is skipped; the other titles are still fetched."""
+    reader = WikipediaReader(max_workers=4, use_cache=False)
+    disambiguations = {"Mercury", "Broken"}
+
+    def page_info(titles):
+        pages = [dict(title=title, fullurl=f"https://en.wikipedia.org/wiki/{title}", lastrevid=1,
+                      pageprops={"disambiguation": ""} if title in disambiguations else {})
+                 for title in titles]
+        return pages, {}
+
+    def first_link(title):
+        if title == "Broken":
+            raise Exception("MediaWiki Error: {'code': 'missingtitle'}")
+        return "Mercury (planet)"
+
+    monkeypatch.setattr(reader.client, "page_info", page_info)
+    monkeypatch.setattr(reader.client, "first_link", first_link)
+    monkeypatch.setattr(reader.client, "summaries", lambda titles: {title: "" for title in titles})
+    monkeypatch.setattr(reader.client, "content", lambda title: f"{title} text")
+
+    docs = list(reader.iter_articles(["Mercury", "Broken", "Venus"]))
+    assert sorted(doc.metadata["title"] for doc in docs) == ["Mercury (planet)", "Venus"]
+    print("[OK] failed disambiguation")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q", "-s"]))
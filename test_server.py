@@ -0,0 +1,214 @@
+"""End-to-end test of the HTTP serving mode against a local fake Ollama.
+
+Builds a small index in a temporary directory, starts `RAGServer` on a
+free port and talks to it over HTTP. No Ollama or internet connection is
+needed (the embedding model still has to be available locally).
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+import requests
+
+# Add rag_agent to path for both PyCharm and command line
+project_root = os.path.dirname(os.path.abspath(__file__))
+rag_agent_path = os.path.join(project_root, 'rag_agent')
+if rag_agent_path not in sys.path:
+    sys.path.insert(0, rag_agent_path)
+
+from llama_index.core import Document, Settings
+
+# Try absolute import first (PyCharm), then relative (command line)
+try:
+    from rag_agent.src.indexer import KnowledgeGraphIndexer
+    from rag_agent.src.query import QueryEngine
+    from rag_agent.src.semantic_cache import SemanticCache
+    from rag_agent.src.server import RAGServer
+    from rag_agent.src.sessions import SessionStore
+except ImportError:
+    from src.indexer import KnowledgeGraphIndexer
+    from src.query import QueryEngine
+    from src.semantic_cache import SemanticCache
+    from src.server import RAGServer
+    from src.sessions import SessionStore
+
+
+@pytest.fixture(scope="module")
+def engine(fake_ollama, workdir):
+    """A query engine over a tiny index, answering from the fake Ollama."""
+    indexer = KnowledgeGraphIndexer()
+    indexer.build_index([
+        Document(text="Mission Alpha is the first interstellar attempt. Its goal is Proxima Centauri.",
+                 id_="mission-alpha"),
+        Document(text="The Warp Core generates the warp field and requires Dilithium crystals.",
+                 id_="warp-core"),
+    ])
+    engine = QueryEngine(indexer=indexer, max_llm_concurrency=1, cache_answers=False, verbose=False)
+    engine.warm_up().result()
+    return engine
+
+
+def read_events(response):
+    """Parse a server-sent event stream into (event, data) pairs."""
+    events = []
+    event = "message"
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            events.append((event, json.loads(line[len("data: "):])))
+            event = "message"
+    return events
+
+
+def test_streaming_query_and_session(engine):
+    """Tokens stream over SSE and a follow-up reuses the session."""
+    server = RAGServer(engine, port=0).start()
+    try:
+        assert requests.get(f"{server.url}/health").json()["status"] == "ok"
+
+        with requests.post(f"{server.url}/query", json={"question": "What is Mission Alpha?"}, stream=True) as r:
+            assert r.status_code == 200
+            assert r.headers["Content-Type"] == "text/event-stream"
+            events = read_events(r)
+        assert events[0][0] == "session"
+        assert events[-1][0] == "done"
+        tokens = [data["token"] for event, data in events if event == "message"]
+        assert len(tokens) == 8
+        session_id = events[0][1]["session_id"]
+
+        r = requests.post(f"{server.url}/query", json={
+            "question": "What does it require?", "session_id": session_id, "stream": False
+        })
+        assert r.status_code == 200
+        assert r.json()["session_id"] == session_id
+        assert r.json()["answer"]
+        assert len(server.sessions.get(session_id).history) == 4
+
+        assert requests.delete(f"{server.url}/sessions/{session_id}").json()["deleted"]
+        print("[OK] streaming query and sessions")
+    finally:
+        server.stop()
+
+
+def test_backpressure(engine, fake_ollama):
+    """With no queue and one LLM slot, a second concurrent request gets 503."""
+    fake_ollama.tokens_per_sec = 10
+    server = RAGServer(engine, port=0, max_queue=0).start()
+    try:
+        first = threading.Thread(target=requests.post, args=(f"{server.url}/query",),
+                                 kwargs={"json": {"question": "Tell me about the warp core", "stream": False}})
+        first.start()
+        deadline = time.time() + 10
+        while server.inflight == 0 and time.time() < deadline:
+            time.sleep(0.01)
+
+        r = requests.post(f"{server.url}/query", json={"question": "What is Proxima Centauri?"})
+        assert r.status_code == 503
+        assert r.headers["Retry-After"] == "1"
+        first.join()
+        assert server.stats["rejected"] == 1
+        print("[OK] backpressure")
+    finally:
+        fake_ollama.tokens_per_sec = 0
+        server.stop()
+
+
+def test_timeout(engine, fake_ollama):
+    """A request running past the timeout is cancelled and reported."""
+    fake_ollama.tokens_per_sec = 2
+    server = RAGServer(engine, port=0, request_timeout=0.5).start()
+    try:
+        r = requests.post(f"{server.url}/query", json={"question": "Describe Dilithium crystals", "stream": False})
+        assert r.status_code == 504
+        with requests.post(f"{server.url}/query", json={"question": "Describe the warp field"}, stream=True) as r:
+            events = read_events(r)
+        assert events[-1] == ("error", {"error": "timeout"})
+        assert server.stats["timeouts"] == 2
+        print("[OK] timeouts")
+    finally:
+        fake_ollama.tokens_per_sec = 0
+        server.stop()
+
+
+def test_keep_alive_after_errors(engine):
+    """Requests rejected without being handled still consume their body, so the connection stays usable."""
+    server = RAGServer(engine, port=0).start()
+    try:
+        with requests.Session() as http:
+            for path, status in (("/unknown", 404), ("/query", 400)):
+                r = http.post(f"{server.url}{path}", json={"question": " "})
+                assert r.status_code == status
+                assert http.get(f"{server.url}/health").json()["status"] == "ok"
+        print("[OK] keep-alive after errors")
+    finally:
+        server.stop()
+
+
+def test_cache_hit_skips_speculation(engine, monkeypatch):
+    """A follow-up answered from the answer cache does not wait for the speculative retrieval."""
+    cached = QueryEngine(indexer=engine.indexer, answer_cache=SemanticCache(None), verbose=False)
+    cached.initialize()
+    store = SessionStore()
+    first, second = store.get("first"), store.get("second")
+    first.add_turn("What is Mission Alpha?", "The first interstellar attempt.")
+    second.add_turn("Tell me about the Warp Core.", "It generates the warp field.")
+    # The fake Ollama rewrites a follow-up to itself: both sessions ask the same standalone question
+    cached.query("What does it require?", first)
+
+    retrieve = cached._retrieve
+    monkeypatch.setattr(cached, "_retrieve", lambda bundle: time.sleep(2) or retrieve(bundle))
+    start = time.perf_counter()
+    cached.query("What does it require?", second)
+    assert cached.cache_stats()["hits"] == 1
+    assert time.perf_counter() - start < 1
+    print("[OK] cache hit skips speculation")
+
+
+def test_warm_up_retry(fake_ollama, tmp_path, monkeypatch):
+    """A failed warm-up is reported once; the next query tries again."""
+    monkeypatch.chdir(tmp_path)
+    engine = QueryEngine(cache_answers=False, verbose=False)
+    with pytest.raises(Exception):
+        engine.warm_up().result()
+
+    KnowledgeGraphIndexer().build_index([Document(text="Mission Alpha is the first interstellar attempt.",
+                                                  id_="mission-alpha")])
+    assert engine.query("What is Mission Alpha?")
+    print("[OK] warm-up retry")
+
+
+def test_session_store_limit():
+    """A full store keeps existing sessions' history and evicts the oldest only for a new session."""
+    store = SessionStore(max_sessions=2)
+    oldest = store.get("a")
+    oldest.add_turn("What is Mission Alpha?", "An interstellar attempt.")
+    store.get("b")
+    assert store.get("a") is oldest and len(oldest.history) == 2
+    store.get("c")
+    assert len(store) == 2
+    assert store.get("a") is oldest
+    assert len(store) == 2 and "c" in store._sessions and "b" not in store._sessions
+    print("[OK] session store limit")
+
+
+def test_stream_usage_scope(engine):
+    """LLM calls made by the consumer of a query stream between tokens are not counted for the query."""
+    store = SessionStore()
+    plain, interleaved = store.get("plain"), store.get("interleaved")
+    list(engine.query_stream("What is Mission Alpha?", plain))
+
+    tokens = engine.query_stream("What is Mission Alpha?", interleaved)
+    next(tokens)
+    Settings.llm.complete("Describe Dilithium crystals")
+    list(tokens)
+    assert plain.last_usage["llm_calls"] > 0
+    assert interleaved.last_usage == plain.last_usage
+    print("[OK] stream usage scope")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q", "-s"]))
@@ -0,0 +1,190 @@
+"""Tests of named index shards: layout, independent rebuilds, lazy loading and routing.
+
+Builds small shards in a temporary directory. No Ollama or internet
+connection is needed (the embedding model still has to be available locally).
+"""
+import os
+import sys
+
+import pytest
+
+# Add rag_agent to path for both PyCharm and command line
+project_root = os.path.dirname(os.path.abspath(__file__))
+rag_agent_path = os.path.join(project_root, 'rag_agent')
+if rag_agent_path not in sys.path:
+    sys.path.insert(0, rag_agent_path)
+
+from llama_index.core import Document, QueryBundle, Settings
+
+# Try absolute import first (PyCharm), then relative (command line)
+try:
+    from rag_agent.src import shards
+    from rag_agent.src.indexer import KnowledgeGraphIndexer
+    from rag_agent.src.query import QueryEngine
+    from rag_agent.src.semantic_cache import SemanticCache
+except ImportError:
+    from src import shards
+    from src.indexer import KnowledgeGraphIndexer
+    from src.query import QueryEngine
+    from src.semantic_cache import SemanticCache
+
+
+SPACE = [
+    "Mission Alpha is the first interstellar attempt. Its goal is Proxima Centauri.",
+    "The Warp Core generates the warp field and requires Dilithium crystals.",
+]
+COOKING = [
+    "A sourdough starter is a culture of wild yeast and lactic acid bacteria.",
+    "Risotto is cooked by adding hot stock to arborio rice a ladle at a time.",
+]
+GARDENING = [
+    "Tomatoes need full sun, deep watering and a stake or cage for support.",
+]
+ENGINES = [
+    "The Warp Core is regulated by Dilithium crystals that are replaced after each voyage.",
+    "Engineers eject the Warp Core when the containment field around it fails.",
+]
+# One shard each, sharing a word with ENGINES[0]: each is the best hit of its own shard
+DISTRACTORS = [
+    "Salt crystals form when seawater evaporates in shallow pans.",
+    "Sugar crystals grow on a string hung in syrup.",
+    "Quartz crystals keep time in watches by vibrating.",
+]
+
+
+def build(shard, texts):
+    """Build (or rebuild) shard `shard` from `texts`."""
+    indexer = KnowledgeGraphIndexer(shard=shard)
+    indexer.build_index([Document(text=text, id_=f"{shard}-{i}") for i, text in enumerate(texts)])
+    return indexer
+
+
+@pytest.fixture(scope="module")
+def storage(fake_ollama, workdir):
+    """A storage directory with the space and cooking shards."""
+    build("space", SPACE)
+    build("cooking", COOKING)
+    return "./storage"
+
+
+def test_layout_and_independent_rebuild(storage):
+    """Each shard has its own directory; rebuilding one leaves the others untouched."""
+    space_dir = shards.shard_dir(storage, "space")
+    assert space_dir == os.path.join(storage, "shards", "space")
+    assert os.path.exists(os.path.join(space_dir, shards.ROUTER_FILE))
+    assert shards.list_shards(storage) == ["cooking", "space"]
+
+    before = {name: os.stat(os.path.join(space_dir, name)).st_mtime_ns for name in os.listdir(space_dir)}
+    indexer = build("cooking", COOKING + ["Bread dough rests so the gluten can relax."])
+    assert len(indexer.index.docstore.docs) == 3
+    after = {name: os.stat(os.path.join(space_dir, name)).st_mtime_ns for name in os.listdir(space_dir)}
+    assert before == after
+
+    try:
+        shards.shard_dir(storage, "../escape")
+        raise AssertionError("expected an invalid shard name to be rejected")
+    except ValueError:
+        pass
+    print("[OK] layout and independent rebuild")
+
+
+def test_lazy_fan_out(storage):
+    """Shards load on their first query and their hits are merged."""
+
+    engine = QueryEngine(cache_answers=False, verbose=False)
+    engine.initialize()
+    assert engine.shards is not None
+    assert not any(stats["loaded"] for stats in engine.shards.stats().values())
+
+    question = "What does the Warp Core need?"
+    bundle = QueryBundle(question, embedding=Settings.embed_model.get_query_embedding(question))
+    hits = engine.query_engine.retrieve(bundle)
+    stats = engine.shards.stats()
+    assert all(stats[name]["loaded"] and stats[name]["queries"] == 1 for name in ("space", "cooking"))
+    sources = {hit.node.ref_doc_id.split("-")[0] for hit in hits}
+    assert sources == {"space", "cooking"}
+    assert len(hits) <= engine.query_engine.retriever.top_k
+    scores = [hit.score for hit in hits]
+    assert scores == sorted(scores, reverse=True)
+    print("[OK] lazy fan-out")
+
+
+def test_centroid_routing(storage):
+    """With centroid routing only the closest shard is loaded and searched."""
+    build("gardening", GARDENING)
+
+    engine = QueryEngine(cache_answers=False, verbose=False)
+    shard_set = shards.ShardSet(
+        storage, shards.list_shards(storage), engine._load_shard, engine._build_retriever,
+        routing="centroid", route_top=1
+    )
+    retriever = shards.ShardedRetriever(shard_set, top_k=3)
+    for text, expected in ((SPACE[1], "space"), (COOKING[0], "cooking"), (GARDENING[0], "gardening")):
+        assert shard_set.route(Settings.embed_model.get_text_embedding(text)) == [expected]
+
+    bundle = QueryBundle(SPACE[1], embedding=Settings.embed_model.get_text_embedding(SPACE[1]))
+    hits = retriever.retrieve(bundle)
+    assert hits and all(hit.node.ref_doc_id.startswith("space-") for hit in hits)
+    assert [name for name, stats in shard_set.stats().items() if stats["loaded"]] == ["space"]
+    print("[OK] centroid routing")
+
+
+def test_merge_across_shards(storage):
+    """The best hit overall is not outranked by the best hits of irrelevant shards."""
+    names = []
+    for i, text in enumerate(DISTRACTORS):
+        names.append(f"distractor{i}")
+        build(names[-1], [text])
+    build("engines", ENGINES)
+    names.append("engines")
+
+    engine = QueryEngine(cache_answers=False, verbose=False)
+    shard_set = shards.ShardSet(storage, names, engine._load_shard, engine._build_retriever)
+    retriever = shards.ShardedRetriever(shard_set, top_k=len(ENGINES))
+    # The chunk's own text: the top dense and BM25 hit whatever the embedding model
+    question = ENGINES[0]
+    bundle = QueryBundle(question, embedding=Settings.embed_model.get_query_embedding(question))
+    hits = retriever.retrieve(bundle)
+    assert hits[0].node.ref_doc_id == "engines-0"
+    assert hits[0].score > hits[1].score
+    print("[OK] merge across shards")
+
+
+def test_answer_cache_scope(storage):
+    """Engines over different shards do not share cached answers; a shard rebuild invalidates them."""
+    cache = SemanticCache(None)
+    space = QueryEngine(shards=["space"], answer_cache=cache, verbose=False)
+    cooking = QueryEngine(shards=["cooking"], answer_cache=cache, verbose=False)
+    question = "What does the Warp Core need?"
+    space.query(question)
+    space.query(question)
+    assert cache.hits == 1
+    cooking.query(question)
+    assert cache.hits == 1
+
+    def cache_version():
+        engine = QueryEngine(shards=["cooking"], cache_answers=False, verbose=False)
+        engine.initialize()
+        return engine._cache_version()
+
+    version = cache_version()
+    build("cooking", COOKING)
+    assert cache_version() != version
+    print("[OK] answer cache scope")
+
+
+def test_answer_cache_shared_scopes(storage):
+    """Engines over different shards keep their cached answers while taking turns on one cache."""
+    cache = SemanticCache(None)
+    space = QueryEngine(shards=["space"], answer_cache=cache, verbose=False)
+    cooking = QueryEngine(shards=["cooking"], answer_cache=cache, verbose=False)
+    question = "What does the Warp Core need?"
+    for _ in range(2):
+        space.query(question)
+        cooking.query(question)
+    assert (cache.hits, cache.stats()["entries"]) == (2, 2)
+    print("[OK] answer cache shared scopes")
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q", "-s"]))